@@ -0,0 +1,96 @@
+"""
+Room messages: written to each player versus shared through the room feed.
+
+    python benchmarks/bench_broadcast.py [--sizes 10,100,1000] [--messages 50]
+                                         [--speakers 10]
+
+A room holds N players (real Descriptors on a server that is never
+started) and N/2 mobiles. Each round is one pulse's worth of talk:
+--messages "says" from --speakers players taking turns, each speaker also
+getting its own "You say" line, and then every descriptor's output taken
+as flush_output() would. "each" is the old way, walking room.people and
+handing every player's descriptor the str to encode; "feed" is
+broadcast.send_to_room(). Queue is the sends alone, total adds taking
+the output; both are per message.
+"""
+import argparse
+import time
+
+import common  # noqa: F401
+from broadcast import send_to_room
+from network import ConnectionServer, Descriptor
+from world import CharData, World
+
+
+def send_each(room, text, skip=None):
+    for person in room.people:
+        if person is not skip and person.desc is not None:
+            person.desc.write_to_output(text)
+
+
+def build(players):
+    server = ConnectionServer("127.0.0.1", 0)
+    world = World()
+    room = world.room(3001)
+    descriptors = []
+    for i in range(players):
+        d = Descriptor(i, None, ("127.0.0.1", 0), server)
+        ch = d.character = CharData()
+        ch.name = f"Player{i}"
+        ch.desc = d
+        world.char_to_room(ch, room)
+        descriptors.append(d)
+    for i in range(players // 2):
+        world.char_to_room(world.read_mobile(i), room)
+    return server, room, descriptors
+
+
+def run(send, room, descriptors, server, messages, speakers, repeat=5):
+    """
+    Best (queue, queue + take) time per message over repeat rounds.
+    """
+    talk = []
+    for i in range(messages):
+        speaker = descriptors[i % speakers].character
+        talk.append((speaker, f"You say, 'message number {i}, héllo to everyone "
+                              f"here'\r\n",
+                     f"{speaker.name} says, 'message number {i}, héllo to "
+                     f"everyone here'\r\n"))
+    best_queue = best_total = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for speaker, own, text in talk:
+            speaker.desc.write_to_output(own)
+            send(room, text, speaker)
+        queued = time.perf_counter()
+        for d in descriptors:
+            d.take_output()
+        server.outbox.clear()
+        end = time.perf_counter()
+        if best_queue is None or queued - start < best_queue:
+            best_queue = queued - start
+        if best_total is None or end - start < best_total:
+            best_total = end - start
+    return best_queue / messages, best_total / messages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--speakers", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'players':>8} {'each queue':>11} {'feed queue':>11} "
+          f"{'each total':>11} {'feed total':>11}   (us per message)")
+    for size in [int(n) for n in args.sizes.split(",")]:
+        server, room, descriptors = build(size)
+        speakers = min(args.speakers, size)
+        each = run(send_each, room, descriptors, server, args.messages, speakers)
+        feed = run(send_to_room, room, descriptors, server, args.messages, speakers)
+        print(f"{size:>8} {each[0] * 1e6:>11.1f} {feed[0] * 1e6:>11.1f} "
+              f"{each[1] * 1e6:>11.1f} {feed[1] * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
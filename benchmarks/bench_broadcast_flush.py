@@ -0,0 +1,118 @@
+"""
+Output cost of a crowded room: one send() per message against one queued
+flush per descriptor per pulse.
+
+    python benchmarks/bench_broadcast_flush.py [--clients 1000] [--stalled 5]
+
+Every client sits in the same room while MESSAGES lines of chatter are
+broadcast to all of them each pulse. "immediate" sends each line to each
+socket as it is produced (the old Descriptor.write()); "coalesced" queues
+them with write_to_output() and sends once per descriptor from
+flush_output(). A few clients never read; with the coalesced path they
+hit the high-water mark and are cut off (or see **OVERFLOW**) while the
+rest of the room is unaffected.
+"""
+import argparse
+import socket
+import time
+
+import common  # noqa: F401
+from network import ConnectionServer
+
+PULSES = 200
+MESSAGES = 10
+LINE = b"Someone gossips, 'anyone up for a run through the sewers?'\r\n"
+
+
+def connect_clients(server, count, stalled):
+    def shrink_buffers(d):
+        # Loopback buffers would hide a stalled client for a long time;
+        # small ones make it reach the high-water mark within the run.
+        if d.desc_num <= stalled:
+            d.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    server.on_connect = shrink_buffers
+    clients = []
+    for i in range(count):
+        sock = socket.socket()
+        if i < stalled:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.connect(("127.0.0.1", server.port))
+        sock.setblocking(False)
+        clients.append(sock)
+        server.poll(0)
+    while len(server.descriptors) < count:
+        server.poll(0.1)
+    return clients[:stalled], clients[stalled:]
+
+
+def drain(readers):
+    received = 0
+    for sock in readers:
+        while True:
+            try:
+                data = sock.recv(65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            received += len(data)
+    return received
+
+
+def immediate_pulse(server):
+    for d in server.descriptors.values():
+        for _ in range(MESSAGES):
+            try:
+                d.sock.send(LINE)
+            except OSError:
+                pass
+            server.sends += 1
+
+
+def coalesced_pulse(server):
+    for d in list(server.descriptors.values()):
+        for _ in range(MESSAGES):
+            d.write_to_output(LINE)
+    server.flush_output()
+
+
+def run(mode, clients, stalled, policy):
+    server = ConnectionServer("127.0.0.1", 0, overflow_policy=policy)
+    server.start()
+    stuck, readers = connect_clients(server, clients, stalled)
+    pulse = immediate_pulse if mode == "immediate" else coalesced_pulse
+    elapsed = 0.0
+    for _ in range(PULSES):
+        start = time.perf_counter()
+        pulse(server)
+        elapsed += time.perf_counter() - start
+        drain(readers)
+    left = len(server.descriptors)
+    overflowed = sum(1 for d in server.descriptors.values() if d.overflowed)
+    sends = server.sends
+    server.shutdown()
+    for sock in stuck + readers:
+        sock.close()
+    return sends / PULSES, elapsed / PULSES, clients - left, overflowed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--stalled", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.stalled} not reading, "
+          f"{MESSAGES} lines per pulse")
+    print(f"{'mode':<24} {'sends/pulse':>12} {'ms/pulse':>10} "
+          f"{'cut off':>8} {'overflow':>9}")
+    for mode, policy in (("immediate", "drop"), ("coalesced", "drop"),
+                         ("coalesced", "disconnect")):
+        sends, seconds, cut, overflowed = run(mode, args.clients, args.stalled, policy)
+        label = mode if mode == "immediate" else f"{mode} ({policy})"
+        print(f"{label:<24} {sends:>12.0f} {seconds * 1000:>10.2f} "
+              f"{cut:>8} {overflowed:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Pulse cost of the event wheel against the number of pending timers.
+
+    python benchmarks/bench_events.py
+
+Every run fires the same timers; only the number of idle pending events
+changes. The average per-pulse time should stay flat from 10 to 100,000
+pending events, because only the events that are due are ever touched.
+"""
+import random
+import time
+
+import common  # noqa: F401
+from events import EventQueue, RL_MIN, RL_SEC
+
+PULSES = 3000
+
+
+def noop():
+    return 0
+
+
+def repeating():
+    return 10 * RL_SEC
+
+
+def run(pending):
+    rng = random.Random(pending)
+    events = EventQueue()
+    # The same amount of due work in every run: 100 repeating timers.
+    for _ in range(100):
+        events.schedule(rng.randint(1, RL_SEC * 10), repeating)
+    # Everything else is pending but not due during the run (zone resets,
+    # long mob and object timers).
+    for _ in range(pending):
+        events.schedule(rng.randint(PULSES + 1, 100 * RL_MIN), noop)
+    start = time.perf_counter()
+    for _ in range(PULSES):
+        events.process()
+    return (time.perf_counter() - start) / PULSES
+
+
+def main():
+    print(f"{'pending':>10} {'usec/pulse':>12}")
+    for pending in (10, 1000, 10000, 100000):
+        print(f"{pending:>10} {run(pending) * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Stress check for input flood control: do ordinary players still get
+answered within budget while other connections flood the server?
+
+    python benchmarks/bench_flood.py [--players 50] [--seconds 5]
+                                     [--budget-ms 250]
+
+Players send one command every PLAYER_INTERVAL and time the reply. The run
+is done once quietly and once alongside a client pasting megabytes of
+text as fast as the socket takes it, a bot spamming short commands, and a
+client sending one endless line. The exit status is 1 if the players' p99
+latency goes over --budget-ms or the server's memory grows by more than
+--max-growth-mb during the flood.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import free_port, start_server
+from telnet import TELNET_GREETING
+
+PLAYER_INTERVAL = 0.2
+COMMAND = b"inventory\r\n"
+REPLY = b"You are carrying:\r\n Nothing.\r\n"
+PASTE_CHUNK = (b"say " + b"lorem ipsum dolor sit amet " * 3 + b"\r\n") * 800
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def player(port, seconds, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readexactly(len(TELNET_GREETING))
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        writer.write(COMMAND)
+        # The flooders' says are heard too; read past them.
+        await reader.readuntil(REPLY)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PLAYER_INTERVAL)
+    writer.close()
+
+
+async def flooder(port, seconds, chunk, sent):
+    """
+    Write chunk over and over without ever reading.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        writer.write(chunk)
+        try:
+            await asyncio.wait_for(writer.drain(), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            break
+        sent[0] += len(chunk)
+    writer.transport.abort()
+
+
+async def swarm(port, players, seconds, flood):
+    latencies = []
+    sent = [0]
+    tasks = [player(port, seconds, latencies) for _ in range(players)]
+    if flood:
+        tasks.append(flooder(port, seconds, PASTE_CHUNK, sent))
+        tasks.append(flooder(port, seconds, b"n\r\n" * 1000, sent))
+        tasks.append(flooder(port, seconds, b"x" * 65536, sent))
+    await asyncio.gather(*tasks)
+    return sorted(latencies), sent[0]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--max-growth-mb", type=float, default=32.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    failed = False
+    try:
+        print(f"{'run':<8} {'p50 ms':>8} {'p99 ms':>8} {'commands':>9} "
+              f"{'flood MB':>9} {'RSS MB':>7}")
+        for flood in (False, True):
+            before = rss_mb(server.pid)
+            latencies, sent = asyncio.run(
+                swarm(port, args.players, args.seconds, flood))
+            after = rss_mb(server.pid)
+            p99 = percentile(latencies, 0.99) * 1000
+            label = "flood" if flood else "quiet"
+            print(f"{label:<8} {percentile(latencies, 0.5) * 1000:>8.1f} "
+                  f"{p99:>8.1f} {len(latencies):>9} {sent / 1e6:>9.1f} "
+                  f"{after:>7.1f}")
+            if p99 > args.budget_ms:
+                print(f"FAIL: {label} p99 {p99:.1f} ms over the "
+                      f"{args.budget_ms:.0f} ms budget")
+                failed = True
+            if flood and after - before > args.max_growth_mb:
+                print(f"FAIL: server grew {after - before:.1f} MB during the flood")
+                failed = True
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
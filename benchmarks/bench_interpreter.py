@@ -0,0 +1,118 @@
+"""
+Command lookup and dispatch speed.
+
+    python benchmarks/bench_interpreter.py [--commands 100000]
+
+A mix of abbreviated commands, weighted towards what players actually type
+(movement, look, say, score...), is resolved two ways: by the prefix tables
+the interpreter builds at startup, and by the stock CircleMUD walk down
+cmd_info comparing each entry. Both must agree for every prefix of every
+command at every level. The same mix is then run through the whole
+command_interpreter() for a lone player, output discarded; the target is
+at least 100,000 commands a second.
+"""
+import argparse
+import random
+
+import common  # noqa: F401
+from interpreter import cmd_info, command_interpreter, find_command
+from world import LVL_IMPL, POS_STANDING, CharData, Room
+
+TARGET = 100000
+
+# (line, weight)
+MIX = (
+    ("n", 8), ("e", 8), ("s", 8), ("w", 8), ("u", 2), ("d", 2),
+    ("l", 10), ("look", 3), ("sc", 4), ("sco", 1), ("i", 4), ("inv", 2),
+    ("eq", 2), ("say hello there", 4), ("'hi all", 4), ("gos anyone up for a group?", 3),
+    ("sh help!", 1), ("who", 3), ("wh", 1), ("sm", 2), ("gr", 2), ("nod", 1),
+    ("st", 2), ("sit", 1), ("re", 1), ("wa", 1), ("k rat", 3), ("get all", 2),
+    ("exa sword", 1), ("con guard", 1), (":grins", 1), ("xyzzy", 1), ("qui", 1),
+)
+
+
+class NullServer:
+    def __init__(self):
+        self.descriptors = {}
+
+
+class NullDescriptor:
+    def __init__(self, server):
+        self.server = server
+        self.character = None
+        server.descriptors[len(server.descriptors)] = self
+
+    def write_to_output(self, data):
+        pass
+
+
+def linear_find(arg, level):
+    """
+    find_command() done as interpreter.c does it.
+    """
+    for info in cmd_info:
+        if info.command.startswith(arg) and level >= info.minimum_level:
+            return info
+    return None
+
+
+def check():
+    for level in range(LVL_IMPL + 1):
+        for info in cmd_info:
+            for end in range(1, len(info.command) + 1):
+                arg = info.command[:end]
+                assert find_command(arg, level) is linear_find(arg, level), \
+                    (arg, level)
+
+
+def command_word(line):
+    if not line[0].isalpha():
+        return line[0]
+    return line.split(" ", 1)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=100000)
+    args = parser.parse_args()
+
+    check()
+    rng = random.Random(1)
+    lines, weights = zip(*MIX)
+    batch = rng.choices(lines, weights, k=args.commands)
+    words = [command_word(line) for line in batch]
+
+    print(f"{args.commands} commands, {len(cmd_info)} in the table")
+    print(f"{'':<22} {'commands/s':>12} {'ns each':>8}")
+    for label, find in (("linear scan", linear_find),
+                        ("prefix table", find_command)):
+        def lookup():
+            for word in words:
+                find(word, 1)
+        seconds = common.best_of(lookup)
+        print(f"{'lookup, ' + label:<22} {len(words) / seconds:>12,.0f} "
+              f"{seconds / len(words) * 1e9:>8.0f}")
+
+    ch = CharData()
+    ch.name = "Bench"
+    ch.level = 1
+    ch.desc = NullDescriptor(NullServer())
+    ch.desc.character = ch
+    room = Room(1)
+
+    def interpret():
+        # Reset between runs: a stray "sit" or "rest" changes what follows.
+        for line in batch:
+            ch.in_room = room
+            ch.position = POS_STANDING
+            command_interpreter(ch, line)
+    seconds = common.best_of(interpret)
+    rate = len(batch) / seconds
+    print(f"{'command_interpreter()':<22} {rate:>12,.0f} "
+          f"{seconds / len(batch) * 1e9:>8.0f}")
+    if rate < TARGET:
+        print(f"below the {TARGET:,} commands/s target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Boot time and memory: every zone loaded at boot versus lazy zones.
+
+    python benchmarks/bench_lazyzones.py [--size large] [--visit 10]
+
+A synthetic world is written to a temporary directory and its world cache
+warmed. Fresh processes then boot it the default way (every zone parsed or
+read from the cache, compiled and reset) or with lazy zones (headers only),
+and a player visits --visit percent of the zones. Each process reports the
+boot time, the private memory it grew by after boot and after the visits,
+and how many zones ended up loaded.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401
+from worldgen import SIZES, write_world
+
+
+def rss_anon_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+class NullDescriptor:
+    def write_to_output(self, data):
+        pass
+
+
+def worker(mode, root, cache_path, visits, results):
+    import db
+    import scripts
+    import zonereset
+    from world import CharData
+    db.log = scripts.log = zonereset.log = lambda message, *args: None
+    before = rss_anon_kb()
+    start = time.perf_counter()
+    if mode == "eager":
+        db.boot_zones(root, workers=1, cache_path=cache_path)
+        for z in db.zone_table:
+            db.reset_zone(z)
+    else:
+        db.boot_lazy(root)
+    booted = time.perf_counter() - start
+    after_boot = rss_anon_kb() - before
+
+    ch = CharData()
+    ch.desc = NullDescriptor()
+    start = time.perf_counter()
+    for vnum in visits:
+        db.world.char_from_room(ch)
+        db.world.char_to_room(ch, db.world.room(vnum))
+    visited = time.perf_counter() - start
+    loaded = len(db.reset_engine.programs)
+    results.put((mode, booted, after_boot, visited, rss_anon_kb() - before,
+                 loaded))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=sorted(SIZES), default="large")
+    parser.add_argument("--visit", type=int, default=10, metavar="PERCENT",
+                        help="share of the zones a player walks into")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_lazyzones_")
+    try:
+        zones, commands = SIZES[args.size]
+        root = os.path.join(tmp, "zon")
+        write_world(root, zones, commands)
+        cache_path = os.path.join(tmp, "world.cache")
+        step = max(1, 100 // max(1, args.visit))
+        visits = [number * 100 + 50 for number in range(0, zones, step)]
+
+        print(f"{args.size} world: {zones} zones, {zones * commands} commands; "
+              f"visiting {len(visits)} zones")
+        print(f"{'mode':<6} {'boot ms':>8} {'boot MB':>8} {'visit ms':>9} "
+              f"{'total MB':>9} {'loaded':>7}")
+        # Spawned, not forked, so each process starts from nothing.
+        context = multiprocessing.get_context("spawn")
+        for mode in ("warm", "eager", "lazy"):
+            results = context.Queue()
+            process = context.Process(
+                target=worker,
+                args=("eager" if mode == "warm" else mode, root, cache_path,
+                      visits, results))
+            process.start()
+            row = results.get()
+            process.join()
+            if mode == "warm":
+                continue   # only there to write the world cache
+            _, booted, after_boot, visited, total, loaded = row
+            print(f"{mode:<6} {booted * 1000:>8.1f} {after_boot / 1024:>8.1f} "
+                  f"{visited * 1000:>9.1f} {total / 1024:>9.1f} {loaded:>7}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Parse speed of load_zones() on a synthetic 50k-command zone file.
+
+    python benchmarks/bench_load_zones.py [--baseline OLD_ZONE_PY]
+
+--baseline takes the path of another copy of tools/lib/zone.py (for
+example one exported with 'git show <rev>:tools/lib/zone.py') and times it
+on the same file for comparison.
+"""
+import argparse
+import importlib.util
+import os
+import tempfile
+
+from common import best_of
+from lib.zone import load_zones
+
+
+def import_path(path):
+    spec = importlib.util.spec_from_file_location("baseline_zone", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_parser(func, path, mode):
+    def run():
+        with open(path, mode) as f:
+            func(f, path)
+    return best_of(run)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=50000)
+    parser.add_argument("--baseline", help="path to another zone.py to compare")
+    args = parser.parse_args()
+
+    from worldgen import write_zone
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.zon")
+        write_zone(path, 1, args.commands)
+
+        current = time_parser(load_zones, path, 'r')
+        print(f"load_zones (text):  {current * 1000:8.1f} ms")
+        print(f"load_zones (bytes): {time_parser(load_zones, path, 'rb') * 1000:8.1f} ms")
+        if args.baseline:
+            baseline = time_parser(import_path(args.baseline).load_zones, path, 'r')
+            print(f"baseline:           {baseline * 1000:8.1f} ms")
+            print(f"speedup:            {baseline / current:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
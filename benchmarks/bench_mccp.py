@@ -0,0 +1,143 @@
+"""
+Bytes on the wire and server CPU per player, with and without MCCP2.
+
+    python benchmarks/bench_mccp.py [--players 200] [--pulses 100]
+
+Loopback clients connect to an in-process ConnectionServer and either
+accept compression (IAC DO COMPRESS2) or refuse it. Every pulse each
+player is sent a few lines of room and combat spam, and the output is
+flushed as the game loop would. Server CPU is process time spent queueing
+and flushing (which includes compressing); the clients' decompression is
+not counted. Clients inflate what they receive, and the text they end up
+with must be the same in both modes.
+"""
+import argparse
+import random
+import socket
+import time
+import zlib
+
+import common  # noqa: F401
+from network import ConnectionServer
+from telnet import (DO, DONT, IAC, MCCP2_START, SB, SE, TELNET_GREETING,
+                    TELOPT_COMPRESS2, TELOPT_NAWS, TELOPT_TTYPE, WILL, WONT)
+
+LINES_PER_PULSE = 6
+
+NAMES = ("the cityguard", "the fido", "Grimnar", "the peacekeeper",
+         "a large rat", "Elwen", "the beastly fido", "the Grand Knight")
+VERBS = ("hit", "massacre", "barely scratch", "obliterate", "pound",
+         "slash", "miss", "tickle")
+ROOM = ("You are standing in the Temple Square of Midgaard.\r\n"
+        "[ Exits: n e s w ]\r\n")
+
+
+def spam_line(rng):
+    attacker, victim = rng.sample(NAMES, 2)
+    roll = rng.random()
+    if roll < 0.7:
+        return f"{attacker} tries to {rng.choice(VERBS)} {victim}.\r\n"
+    if roll < 0.9:
+        return f"{attacker} gossips, 'anyone got {rng.randint(1, 500)} coins?'\r\n"
+    return ROOM
+
+
+class Client:
+    def __init__(self, port, compress):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setblocking(False)
+        self.compress = compress
+        self.inflater = None
+        self.raw = bytearray()
+        self.text_bytes = 0
+        reply = DO if compress else DONT
+        self.sock.sendall(bytes((IAC, reply, TELOPT_COMPRESS2,
+                                 IAC, WILL, TELOPT_NAWS,
+                                 IAC, SB, TELOPT_NAWS, 0, 100, 0, 40, IAC, SE,
+                                 IAC, WONT, TELOPT_TTYPE)))
+
+    def drain(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            if self.inflater is not None:
+                data = self.inflater.decompress(data)
+            elif self.compress:
+                self.raw += data
+                start = self.raw.find(MCCP2_START)
+                if start < 0:
+                    continue
+                self.text_bytes += start
+                data = self.raw[start + len(MCCP2_START):]
+                self.inflater = zlib.decompressobj()
+                data = self.inflater.decompress(data)
+            self.text_bytes += len(data)
+
+
+def run(players, pulses, compress):
+    server = ConnectionServer("127.0.0.1", 0)
+    server.start()
+    clients = [Client(server.port, compress) for _ in range(players)]
+    while len(server.descriptors) < players:
+        server.poll(0.1)
+    for _ in range(10):
+        server.poll(0.01)
+    server.flush_output()
+    for client in clients:
+        client.drain()
+    if compress:
+        assert all(d.compressor is not None for d in server.descriptors.values())
+
+    rng = random.Random(1)
+    bytes_before = server.bytes_out
+    cpu = 0.0
+    text = 0
+    for _ in range(pulses):
+        batch = [[spam_line(rng) for _ in range(LINES_PER_PULSE)]
+                 for _ in range(players)]
+        text += sum(len(line) for lines in batch for line in lines)
+        start = time.process_time()
+        for d, lines in zip(server.descriptors.values(), batch):
+            for line in lines:
+                d.write_to_output(line)
+        server.flush_output()
+        cpu += time.process_time() - start
+        for client in clients:
+            client.drain()
+    wire = server.bytes_out - bytes_before
+    received = sum(c.text_bytes for c in clients) - players * len(TELNET_GREETING)
+    server.shutdown()
+    for client in clients:
+        client.sock.close()
+    per = players * pulses
+    return wire / per, text / per, cpu / per, received
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--pulses", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.players} players, {args.pulses} pulses, "
+          f"{LINES_PER_PULSE} lines per player per pulse")
+    print(f"{'mode':<10} {'wire B/pulse':>13} {'text B/pulse':>13} "
+          f"{'ratio':>6} {'CPU us/pulse':>13}")
+    received = {}
+    for compress in (False, True):
+        wire, text, cpu, received[compress] = run(args.players, args.pulses,
+                                                  compress)
+        label = "mccp2" if compress else "plain"
+        print(f"{label:<10} {wire:>13.1f} {text:>13.1f} {text / wire:>6.2f} "
+              f"{cpu * 1e6:>13.2f}")
+    if received[False] != received[True]:
+        print(f"warning: clients got {received[False]} bytes of text plain "
+              f"but {received[True]} compressed")
+
+
+if __name__ == "__main__":
+    main()
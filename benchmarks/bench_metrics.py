@@ -0,0 +1,137 @@
+"""
+Cost of the metrics subsystem on the hot path.
+
+    python benchmarks/bench_metrics.py [--players 200] [--pulses 300]
+
+Loopback players each send one command per pulse to an in-process
+server. Every pulse reads their input, runs the commands through the real
+command interpreter (the timed one every COMMAND_SAMPLE pulses), runs the
+heartbeat and flushes output, just as game_loop() does. The same run is timed with metrics off and on. The
+overhead should stay under 2%. The cost of a single Histogram.record()
+is shown as well.
+"""
+import argparse
+import socket
+import time
+
+import common  # noqa: F401
+import circlemud
+import metrics
+from events import EventQueue, PulseStats
+from network import ConnectionServer
+from world import CharData
+
+
+def run(players, pulses):
+    server = ConnectionServer("127.0.0.1", 0, cmd_rate=1e9,
+                              on_connect=circlemud.new_character,
+                              on_disconnect=circlemud.free_character)
+    server.start()
+    clients = []
+    for _ in range(players):
+        sock = socket.create_connection(("127.0.0.1", server.port))
+        sock.setblocking(False)
+        clients.append(sock)
+    while len(server.descriptors) < players:
+        server.poll(0.1)
+    if metrics.enabled:
+        metrics.watch_server(server)
+    events = EventQueue()
+    stats = PulseStats()
+    command = b"score\r\n"
+    cpu = 0.0
+    for pulse in range(pulses):
+        if metrics.enabled and pulse % metrics.COMMAND_SAMPLE == 0:
+            interpret = circlemud.timed_command_interpreter
+        else:
+            interpret = circlemud.command_interpreter
+        for sock in clients:
+            sock.send(command)
+        start = time.process_time()
+        while len(server.waiting) < players:
+            server.poll(0)
+        server.process_commands(interpret)
+        beat = time.perf_counter()
+        circlemud.heartbeat(events, stats)
+        elapsed = time.perf_counter() - beat
+        stats.record(elapsed)
+        if metrics.enabled:
+            metrics.pulse_duration.record(int(elapsed * 1e9))
+        server.flush_output()
+        cpu += time.process_time() - start
+        for sock in clients:
+            try:
+                while sock.recv(65536):
+                    pass
+            except BlockingIOError:
+                pass
+    server.shutdown()
+    for sock in clients:
+        sock.close()
+    return cpu / pulses
+
+
+class NullDescriptor:
+    def write_to_output(self, data):
+        pass
+
+
+def timing_cost(repeat=200000):
+    """
+    Extra nanoseconds the timed interpreter spends per command.
+    """
+    d = NullDescriptor()
+    ch = d.character = CharData()
+    ch.desc = d
+    costs = []
+    for func in (circlemud.command_interpreter,
+                 circlemud.timed_command_interpreter):
+        best = None
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func(d, "score")
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        costs.append(best / repeat)
+    return costs[1] - costs[0]
+
+
+def record_cost():
+    histogram = metrics.Histogram()
+    values = [i * 37 % 200000 for i in range(100000)]
+    start = time.perf_counter()
+    for value in values:
+        histogram.record(value)
+    return (time.perf_counter() - start) / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--pulses", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Alternate the two modes so drift in machine load hits both alike.
+    results = {False: float("inf"), True: float("inf")}
+    for _ in range(args.repeat):
+        for enabled in (False, True):
+            metrics.enabled = enabled
+            results[enabled] = min(results[enabled], run(args.players, args.pulses))
+    overhead = results[True] / results[False] - 1
+    print(f"{args.players} players, one command each per pulse")
+    print(f"metrics off: {results[False] * 1000:8.3f} ms CPU/pulse")
+    print(f"metrics on:  {results[True] * 1000:8.3f} ms CPU/pulse "
+          f"({overhead * 100:+.2f}%)")
+    print(f"Histogram.record(): {record_cost() * 1e9:.0f} ns")
+    # The end-to-end numbers are noisy at this size; this estimate is not.
+    extra = timing_cost() / metrics.COMMAND_SAMPLE
+    per_command = results[False] / args.players
+    print(f"timing adds {extra * 1e9:.0f} ns per command on average, "
+          f"{extra / per_command * 100:.2f}% of the {per_command * 1e6:.1f} us "
+          f"each command costs end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Deciding whether zones are empty: counters kept as players move versus
+CircleMUD's scan of the descriptor list.
+
+    python benchmarks/bench_occupancy.py [--zones 500] [--players 2000]
+
+A world of --zones zones with --players players spread over it. "scan"
+checks every zone the C way, looking through every player for one whose
+room lies in the zone; "counters" asks db.reset_check(), which reads the
+per-zone counters. The move line is what keeping the counters costs: a
+goto-style char_from_room() / char_to_room() pair, with and without the
+world's player hooks.
+"""
+import argparse
+import random
+
+import common  # noqa: F401
+import db
+import scripts
+from lib.zone import ZoneData
+from lib.zoneindex import VnumIndex
+from world import CharData
+
+
+class NullDescriptor:
+    def write_to_output(self, data):
+        pass
+
+
+def build(zones, players, seed=1):
+    index = VnumIndex()
+    for number in range(zones):
+        zone = ZoneData()
+        zone.number = number
+        zone.bot = number * 100
+        zone.top = number * 100 + 99
+        zone.lifespan = 10
+        zone.reset_mode = db.ZRESET_EMPTY
+        zone.cmd.append('S')
+        index.add_zone(zone)
+    db.log = scripts.log = lambda message, *args: None
+    db.install_zones(index, {})
+    rng = random.Random(seed)
+    chars = []
+    for i in range(players):
+        ch = CharData()
+        ch.desc = NullDescriptor()
+        db.world.char_to_room(ch, db.world.room(rng.randrange(zones * 100)))
+        chars.append(ch)
+    return chars
+
+
+def scan_check(zone, chars):
+    for ch in chars:
+        if ch.in_room is not None and zone.bot <= ch.in_room.vnum <= zone.top:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zones", type=int, default=500)
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=100000)
+    args = parser.parse_args()
+
+    chars = build(args.zones, args.players)
+    zones = db.zone_table
+    scan = common.best_of(lambda: [scan_check(zone, chars) for zone in zones], 3)
+    counters = common.best_of(lambda: [db.reset_check(zone) for zone in zones])
+    occupied = sum(1 for zone in zones if scan_check(zone, chars))
+    deferred = sum(1 for zone in zones if db.reset_check(zone) == db.RESET_DEFER)
+    assert occupied == deferred
+
+    world = db.world
+    rng = random.Random(2)
+    rooms = [world.room(rng.randrange(args.zones * 100)) for _ in range(args.moves)]
+    ch = chars[0]
+
+    def moves():
+        for room in rooms:
+            world.char_from_room(ch)
+            world.char_to_room(ch, room)
+
+    hooked = common.best_of(moves)
+    world.player_entered = world.player_left = None
+    bare = common.best_of(moves)
+    world.player_entered = db.player_entered
+    world.player_left = db.player_left
+
+    print(f"{args.zones} zones, {args.players} players, {occupied} zones occupied")
+    print(f"check every zone, scan:      {scan * 1000:9.2f} ms")
+    print(f"check every zone, counters:  {counters * 1000:9.2f} ms")
+    print(f"move, no hooks:              {bare / args.moves * 1e6:9.2f} us")
+    print(f"move, counting:              {hooked / args.moves * 1e6:9.2f} us")
+
+
+if __name__ == "__main__":
+    main()
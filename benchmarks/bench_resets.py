@@ -0,0 +1,82 @@
+"""
+Time to reset every zone of a synthetic world.
+
+    python benchmarks/bench_resets.py [--zones 500] [--commands 100]
+
+The first pass loads everything (the boot reset); later passes mostly hit
+max_existing limits, which is what a running server does every lifespan.
+A whole pass does not fit in one 100 ms pulse: at 500 zones x 100
+commands the boot reset takes about 130 ms and later passes 30-100 ms,
+most of it creating mobiles and objects. The server never runs one,
+though. The boot reset happens before the game loop starts, and
+schedule_zone_resets() spreads the timed resets over RL_MIN pulses, so
+"worst pulse" (the slowest of those batches) is what a pulse actually
+pays: 1-2 ms, or 20-25 ms when a full garbage collection lands in it.
+Without the gc.freeze() of db.end_boot(), those collections walk every
+mobile and object and took 60-110 ms. At 2000 zones the worst pulse is
+still over budget (90-160 ms), from collections of what the timed resets
+created after boot.
+"""
+import argparse
+import gc
+import time
+
+import common  # noqa: F401
+from events import RL_MIN
+from lib.zone import load_zones
+from lib.zoneindex import VnumIndex
+from world import World
+from worldgen import zone_lines
+import zonereset
+from zonereset import ResetEngine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zones", type=int, default=500)
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--passes", type=int, default=5)
+    args = parser.parse_args()
+
+    zones = [load_zones(zone_lines(n, args.commands), f"{n}.zon")
+             for n in range(args.zones)]
+    index = VnumIndex()
+    for zone in zones:
+        index.add_zone(zone)
+    world = World()
+    engine = ResetEngine(world)
+    log = zonereset.log
+    zonereset.log = lambda message, *args: None
+    start = time.perf_counter()
+    problems = engine.link(zones, index)
+    print(f"link {len(zones)} zones:         {(time.perf_counter() - start) * 1000:8.2f} ms"
+          f"  ({len(problems)} problems)")
+    zonereset.log = log
+
+    total = sum(len(program) for program in engine.programs.values())
+    # The zones each pulse resets, as schedule_zone_resets() spreads them.
+    batches = [zones[first::RL_MIN] for first in range(min(RL_MIN, len(zones)))]
+    for n in range(args.passes):
+        done = 0
+        elapsed = worst = 0.0
+        for batch in batches:
+            start = time.perf_counter()
+            for zone in batch:
+                done += engine.reset(zone)
+            took = time.perf_counter() - start
+            elapsed += took
+            worst = max(worst, took)
+        if n == 0:
+            gc.freeze()    # as db.end_boot() does
+        label = "boot reset" if n == 0 else f"reset pass {n}"
+        print(f"{label + ':':<26} {elapsed * 1000:8.2f} ms"
+              f"  (worst pulse {worst * 1000:.2f} ms; "
+              f"{done} of {total} commands did something)")
+
+    mobs = sum(len(live) for live in world.mobs_by_vnum.values())
+    objs = sum(len(live) for live in world.objs_by_vnum.values())
+    print(f"in play: {mobs} mobiles, {objs} objects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Pulse time with the world split across shard processes.
+
+    python benchmarks/bench_shard.py [--size medium] [--players 400]
+                                     [--pulses 100] [--shards 1,2,4]
+
+A synthetic world is written to a temporary directory and booted once in
+this process (no shards: what circlemud.py does by default) and then
+behind a ShardGateway with each shard count. Players are spread over the
+world with goto and then each send one command per pulse. The gateway is
+driven directly, without sockets, so the figure is the pulse itself:
+routing, the round trip to every shard, the commands and the heartbeats.
+
+Shards only pay off with a core each; on a single core this shows what
+the gateway costs instead.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401
+import circlemud
+import db
+import shard
+from events import EventQueue, PulseStats
+from interpreter import command_interpreter
+from world import LVL_IMPL, CharData
+from worldgen import SIZES, write_world
+
+COMMANDS = ("look", "score", "say anyone here?", "smile", "inventory", "n")
+
+
+class NullDescriptor:
+    """
+    Enough of a Descriptor for the gateway and the interpreter.
+    """
+    def __init__(self, desc_num):
+        self.desc_num = desc_num
+        self.server = self
+        self.descriptors = {}
+        self.character = None
+        self.bytes = 0
+
+    def write_to_output(self, data):
+        self.bytes += len(data)
+
+    def close(self):
+        pass
+
+
+def plan(players, pulses, vnums, seed=1):
+    """
+    Where each player goes, then what each types every pulse.
+    """
+    rng = random.Random(seed)
+    rooms = [rng.choice(vnums) for _ in range(players)]
+    lines = [[rng.choice(COMMANDS) for _ in range(players)]
+             for _ in range(pulses)]
+    return rooms, lines
+
+
+def run_local(root, cache_path, rooms, lines):
+    db.boot_zones(root, cache_path=cache_path)
+    for zone in db.zone_table:
+        db.reset_zone(zone)
+    events = EventQueue()
+    db.schedule_zone_resets(events)
+    stats = PulseStats()
+    players = []
+    for i, vnum in enumerate(rooms):
+        d = NullDescriptor(i)
+        ch = d.character = CharData()
+        ch.name = f"Player{i}"
+        ch.level = LVL_IMPL
+        ch.desc = d
+        db.world.char_to_room(ch, db.world.room(vnum))
+        players.append(d)
+    start = time.perf_counter()
+    for batch in lines:
+        for d, line in zip(players, batch):
+            command_interpreter(d.character, line)
+        circlemud.heartbeat(events, stats)
+    return (time.perf_counter() - start) / len(lines)
+
+
+def run_sharded(root, cache_path, image_path, shards, rooms, lines):
+    circlemud.START_LEVEL = LVL_IMPL
+    gateway = shard.start_shards(shards, circlemud.heartbeat,
+                                 circlemud.MORTAL_START_ROOM, LVL_IMPL,
+                                 root=root, cache_path=cache_path,
+                                 image_path=image_path)
+    try:
+        players = [NullDescriptor(i) for i in range(len(rooms))]
+        for d in players:
+            gateway.on_connect(d)
+        gateway.exchange()
+        for d, vnum in zip(players, rooms):
+            gateway.route(d, f"goto {vnum}")
+        # One pulse to move, one for the transfers to land.
+        gateway.exchange()
+        gateway.exchange()
+        start = time.perf_counter()
+        for batch in lines:
+            for d, line in zip(players, batch):
+                gateway.route(d, line)
+            gateway.exchange()
+        return (time.perf_counter() - start) / len(lines), len(gateway.map)
+    finally:
+        gateway.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium")
+    parser.add_argument("--players", type=int, default=400)
+    parser.add_argument("--pulses", type=int, default=100)
+    parser.add_argument("--shards", default="1,2,4")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_shard_")
+    try:
+        zones, commands = SIZES[args.size]
+        root = os.path.join(tmp, "zon")
+        write_world(root, zones, commands)
+        cache_path = os.path.join(tmp, "world.cache")
+        image_path = os.path.join(tmp, "world.img")
+        vnums = [number * 100 + 50 for number in range(zones)]
+        rooms, lines = plan(args.players, args.pulses, vnums)
+
+        print(f"{args.size} world ({zones} zones), {args.players} players, "
+              f"{args.pulses} pulses, {os.cpu_count()} CPUs")
+        print(f"{'shards':<8} {'ms/pulse':>9}")
+        # Shards are forked: start them before this process boots a world.
+        results = []
+        for count in [int(n) for n in args.shards.split(",")]:
+            results.append(run_sharded(root, cache_path, image_path, count,
+                                       rooms, lines))
+        local = run_local(root, cache_path, rooms, lines)
+        print(f"{'none':<8} {local * 1000:>9.2f}")
+        for seconds, count in results:
+            print(f"{count:<8} {seconds * 1000:>9.2f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
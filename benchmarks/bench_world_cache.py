@@ -0,0 +1,63 @@
+"""
+Cold parse against warm binary cache for the world boot.
+
+    python benchmarks/bench_world_cache.py [--zones 500] [--commands 100]
+
+Times boot_world() on the shipped data/zones tree and on a synthetic world:
+once with no cache (every file parsed), once with a fresh cache (nothing
+parsed), and once after touching one file (one zone re-parsed).
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from common import ROOT_DIR, best_of
+from lib.world import ZONE_DIR, boot_world
+from worldgen import write_world
+
+
+def bench(label, root, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "world.cache")
+        cold = best_of(lambda: boot_world(root, workers), repeat=3)
+        boot_world(root, workers, cache_path)
+        warm = best_of(lambda: boot_world(root, workers, cache_path), repeat=3)
+        zones, report = boot_world(root, workers, cache_path)
+        if zones:
+            # Rewrite one file with new content so exactly one zone misses.
+            path = report.zones[0][0]
+            with open(path, 'ab') as f:
+                f.write(b"* touched\n")
+            start = time.perf_counter()
+            boot_world(root, workers, cache_path)
+            one_changed = time.perf_counter() - start
+        else:
+            one_changed = 0.0
+    print(f"{label:<28} {len(zones):>6} {cold * 1000:>10.1f} {warm * 1000:>10.1f} "
+          f"{one_changed * 1000:>12.1f} {cold / warm if warm else 0:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zones", type=int, default=500)
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'world':<28} {'zones':>6} {'cold ms':>10} {'warm ms':>10} "
+          f"{'1 changed ms':>12} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Work on a copy so the touched-file run leaves the tree alone.
+        shipped = os.path.join(tmp, "shipped")
+        shutil.copytree(os.path.join(ROOT_DIR, ZONE_DIR), shipped)
+        bench("shipped data/zones", shipped, args.workers)
+
+        synthetic = os.path.join(tmp, "synthetic")
+        write_world(synthetic, args.zones, args.commands)
+        bench(f"synthetic {args.zones}x{args.commands} cmds", synthetic, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Worker startup time and memory: world cache versus mapped world image.
+
+    python benchmarks/bench_worldimage.py [--size large] [--workers 4]
+
+A synthetic world is parsed once, then written both as the world cache
+and as a world image. Fresh worker processes then load it one way or the
+other and walk every reset command, as compiling the reset programs does.
+Each worker reports how long that took and how much private (anonymous)
+memory it grew by. Pages of the mapped image are shared page cache, so
+they are not counted against the worker.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401
+from lib.world import boot_world
+from lib.worldimage import WorldImage, write_image
+from worldgen import SIZES, write_world
+
+
+def rss_anon_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+def walk(zones):
+    total = 0
+    for zone in zones:
+        for command, if_flag, arg1, arg2, arg3 in zone.cmd.rows():
+            total += arg1
+    return total
+
+
+def worker(mode, root, cache_path, image_path, results):
+    before = rss_anon_kb()
+    start = time.perf_counter()
+    if mode == "cache":
+        zones, report = boot_world(root, workers=1, cache_path=cache_path)
+    else:
+        zones = WorldImage(image_path).zones
+    loaded = time.perf_counter() - start
+    checksum = walk(zones)
+    elapsed = time.perf_counter() - start
+    results.put((mode, loaded, elapsed, rss_anon_kb() - before, checksum))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=sorted(SIZES), default="large")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_worldimage_")
+    try:
+        zones, commands = SIZES[args.size]
+        root = os.path.join(tmp, "zon")
+        write_world(root, zones, commands)
+        cache_path = os.path.join(tmp, "world.cache")
+        image_path = os.path.join(tmp, "world.img")
+        table, report = boot_world(root, cache_path=cache_path)
+        write_image(image_path, table, {number: path for path, number, ncmds,
+                                        seconds in report.zones})
+        print(f"{args.size} world: {zones} zones, {zones * commands} commands; "
+              f"cache {os.path.getsize(cache_path) / 1e6:.1f} MB, "
+              f"image {os.path.getsize(image_path) / 1e6:.1f} MB")
+        print(f"{'mode':<7} {'load ms':>8} {'+walk ms':>9} {'private MB':>11}")
+        checksums = set()
+        # Spawned, not forked: a forked worker would start out with this
+        # process's freed memory to reuse, which hides what it allocates.
+        context = multiprocessing.get_context("spawn")
+        for mode in ("cache", "image"):
+            results = context.Queue()
+            for _ in range(args.workers):
+                # One at a time, so each is timed on an idle machine.
+                process = context.Process(
+                    target=worker,
+                    args=(mode, root, cache_path, image_path, results))
+                process.start()
+                row = results.get()
+                process.join()
+                checksums.add(row[4])
+                _, loaded, elapsed, grown, _ = row
+                print(f"{mode:<7} {loaded * 1000:>8.1f} {elapsed * 1000:>9.1f} "
+                      f"{grown / 1024:>11.1f}")
+        if len(checksums) != 1:
+            print("warning: the cache and the image disagree")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
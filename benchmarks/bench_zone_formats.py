@@ -0,0 +1,103 @@
+"""
+Zone file formats compared for boot speed: .zon, JSON5 and YAML, each
+with every parser installed.
+
+    python benchmarks/bench_zone_formats.py [--size medium]
+
+A synthetic world (worldgen.SIZES) is written as .zon and converted to
+JSON5 and YAML. For each format the table gives the size on disk and the
+time to read every zone: "load_zone" is what boot uses (the registry's
+choice of backend), and one row per installed decoder shows what the
+others would cost. Decode is the parser alone, zone is decode plus
+zone_from_dict().
+"""
+import argparse
+import os
+import tempfile
+
+import common  # noqa: F401
+from lib.convert import convert_zones
+from lib.zone import load_zones, zone_from_dict
+from lib.zoneformat import (JSON5_DECODERS, YAML_LOADERS, ZONE_FORMATS,
+                            load_zone, yaml)
+from worldgen import SIZES, write_world
+
+
+def read_all(paths):
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    return contents
+
+
+def decoders():
+    """
+    (format, backend, decode(bytes)) for every installed parser.
+    """
+    found = [("json5", name, decode) for name, decode in JSON5_DECODERS.items()]
+    for name, loader in YAML_LOADERS.items():
+        found.append(("yaml", name,
+                      lambda data, loader=loader: yaml.load(data, Loader=loader)))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="medium", choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    zones, commands = SIZES[args.size]
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = write_world(tmp, zones, commands)
+        report = convert_zones([tmp], ("json5", "yaml"), workers=1, force=True)
+        if report.errors:
+            raise SystemExit(f"conversion failed: {report.errors[0][1]}")
+        paths = {"zon": sources,
+                 "json5": [path + ".json5" for path in sources],
+                 "yaml": [path + ".yaml" for path in sources]}
+        sizes = {fmt: sum(os.path.getsize(path) for path in files)
+                 for fmt, files in paths.items()}
+
+        print(f"{zones} zones, {zones * commands} commands ({args.size})")
+        print(f"{'format':<7} {'backend':<12} {'MB':>6} {'decode ms':>10} "
+              f"{'zone ms':>9} {'cmds/s':>11}")
+
+        def row(fmt, backend, decode, zone):
+            rate = zones * commands / zone
+            decode = f"{decode * 1000:10.1f}" if decode is not None else f"{'':>10}"
+            print(f"{fmt:<7} {backend:<12} {sizes[fmt] / 1e6:>6.2f} {decode} "
+                  f"{zone * 1000:9.1f} {rate:>11,.0f}")
+
+        for fmt, files in paths.items():
+            chosen = f"{ZONE_FORMATS[fmt].backend}*"
+            row(fmt, chosen, None,
+                common.best_of(lambda: [load_zone(path) for path in files],
+                               args.repeat))
+
+        contents = {fmt: read_all(files) for fmt, files in paths.items()}
+        for fmt, backend, decode in decoders():
+            data, files = contents[fmt], paths[fmt]
+            try:
+                decode(data[0])
+            except ValueError:
+                print(f"{fmt:<7} {backend:<12} cannot read this output")
+                continue
+            decoded = common.best_of(lambda: [decode(text) for text in data],
+                                     args.repeat)
+            built = common.best_of(
+                lambda: [zone_from_dict(decode(text), path)
+                         for text, path in zip(data, files)], args.repeat)
+            row(fmt, backend, decoded, built)
+
+        data = contents["zon"]
+        row("zon", "load_zones", None, common.best_of(
+            lambda: [load_zones(text.splitlines(), path)
+                     for text, path in zip(data, sources)], args.repeat))
+        print("* the backend load_zone() picks; its time includes opening "
+              "the files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark suite for the zone pipeline and the server.
+
+    python benchmarks/run.py [--sizes tiny,small,medium] [--out FILE]
+                             [--compare BASELINE] [--tolerance 0.25]
+                             [--clients 200] [--skip-server]
+
+For each synthetic world size (see worldgen.SIZES) it times load_zones(),
+cold and cached world boots, both converters, and booting from the JSON5
+and YAML outputs. It then starts src/circlemud.py on a free port and
+drives the command path with many concurrent clients.
+
+Results are written as JSON (--out, default stdout). With --compare the
+run is checked against an earlier results file; the exit status is 1 if
+any metric got worse by more than --tolerance (0.25 = 25%).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from common import best_of, free_port, start_server
+from lib.convert import convert_zones
+from lib.world import boot_world, discover_zone_files
+from lib.zone import load_zones
+from telnet import TELNET_GREETING
+from worldgen import SIZES, write_world
+
+# A command whose answer goes only to the player who typed it.
+COMMAND = b"inventory\r\n"
+REPLY = b"You are carrying:\r\n Nothing.\r\n"
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+        print(f"{name:<44} {value:>14.4f} {unit}", file=sys.stderr)
+
+
+def split_by_format(root):
+    """
+    Move converter output into json5/ and yaml/ beside zon/, so each
+    format can be booted on its own.
+    """
+    dirs = {ext: os.path.join(root, ext) for ext in ("zon", "json5", "yaml")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for name in os.listdir(root):
+        src = os.path.join(root, name)
+        if os.path.isfile(src):
+            ext = name.rsplit(".", 1)[1]
+            shutil.move(src, os.path.join(dirs[ext], name))
+    return dirs
+
+
+def bench_world(results, size, tmp):
+    zones, commands = SIZES[size]
+    root = os.path.join(tmp, size)
+    paths = write_world(root, zones, commands)
+    prefix = f"{size}"
+    total_cmds = zones * commands
+
+    def parse_all():
+        for path in paths:
+            with open(path, 'rb') as f:
+                load_zones(f, path)
+    seconds = best_of(parse_all, repeat=3)
+    results.add(f"{prefix}.load_zones.seconds", seconds, "s")
+    results.add(f"{prefix}.load_zones.commands_per_sec", total_cmds / seconds,
+                "cmd/s", better="higher")
+
+    cache_path = os.path.join(tmp, f"{size}.cache")
+    results.add(f"{prefix}.boot.cold.seconds",
+                best_of(lambda: boot_world(root), repeat=3), "s")
+    boot_world(root, cache_path=cache_path)
+    results.add(f"{prefix}.boot.cached.seconds",
+                best_of(lambda: boot_world(root, cache_path=cache_path), repeat=3), "s")
+
+    for fmt in ("json5", "yaml"):
+        results.add(f"{prefix}.convert.{fmt}.seconds",
+                    best_of(lambda: convert_zones([root], (fmt,), force=True),
+                            repeat=1), "s")
+
+    dirs = split_by_format(root)
+    for fmt in ("zon", "json5", "yaml"):
+        count = len(discover_zone_files(dirs[fmt]))
+        seconds = best_of(lambda: boot_world(dirs[fmt], workers=1), repeat=3)
+        results.add(f"{prefix}.boot_serial.{fmt}.seconds", seconds, "s")
+        if count != zones:
+            print(f"warning: {count} {fmt} files for {zones} zones", file=sys.stderr)
+
+
+async def echo_client(port, rounds, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await reader.readexactly(len(TELNET_GREETING))
+    for _ in range(rounds):
+        start = time.perf_counter()
+        writer.write(COMMAND)
+        await reader.readuntil(REPLY)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def echo_swarm(port, clients, rounds):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(echo_client(port, rounds, latencies)
+                           for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def bench_server(results, clients, rounds):
+    port = free_port()
+    server = start_server(port)
+    try:
+        latencies, elapsed = asyncio.run(echo_swarm(port, clients, rounds))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    latencies.sort()
+    prefix = f"server.echo.{clients}_clients"
+    results.add(f"{prefix}.messages_per_sec", len(latencies) / elapsed,
+                "msg/s", better="higher")
+    results.add(f"{prefix}.p50_ms", percentile(latencies, 0.50) * 1000, "ms")
+    results.add(f"{prefix}.p99_ms", percentile(latencies, 0.99) * 1000, "ms")
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Print metrics that regressed beyond tolerance; returns how many did.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["metrics"]
+    regressions = 0
+    for name, metric in sorted(results.metrics.items()):
+        old = baseline.get(name)
+        if old is None or not old["value"] or not metric["value"]:
+            continue
+        if metric["better"] == "lower":
+            ratio = metric["value"] / old["value"]
+        else:
+            ratio = old["value"] / metric["value"]
+        if ratio > 1 + tolerance:
+            regressions += 1
+            print(f"REGRESSION {name}: {old['value']:.4f} -> "
+                  f"{metric['value']:.4f} {metric['unit']} ({ratio:.2f}x worse)",
+                  file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="tiny,small,medium",
+                        help=f"comma-separated world sizes from {sorted(SIZES)}")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--skip-server", action="store_true")
+    args = parser.parse_args()
+
+    results = Results()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes.split(","):
+            bench_world(results, size.strip(), tmp)
+    if not args.skip_server:
+        bench_server(results, args.clients, args.rounds)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": results.metrics,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
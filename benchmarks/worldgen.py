@@ -0,0 +1,103 @@
+"""
+Seeded generator for synthetic CircleMUD zone files.
+
+The output is in the same .zon format load_zones() reads, with a realistic
+mix of commands, comments and if_flag chains. The same seed always gives
+the same file.
+"""
+import argparse
+import os
+import random
+
+# Named world sizes: (zones, commands per zone).
+SIZES = {
+    "tiny": (2, 20),          # 40 commands
+    "small": (30, 100),       # 3k, about a stock CircleMUD world
+    "medium": (300, 100),     # 30k
+    "large": (500, 400),      # 200k
+    "huge": (1000, 1000),     # 1M
+}
+
+MOB_NAMES = ("Homba", "Swordsman", "Mummy", "Giant Lizard", "Franz", "Hanz")
+OBJ_NAMES = ("Speckled Potion", "Troll Gauntlets", "Flail", "Heavy Spear",
+             "Small Chest", "Torch")
+
+
+def zone_lines(number, commands, seed=0):
+    """
+    Yield the lines (with newlines) of one zone holding about 'commands'
+    reset commands.
+    """
+    rng = random.Random(seed * 1000003 + number)
+    bot = number * 100
+    top = bot + 99
+
+    def vnum():
+        return rng.randint(bot, top)
+
+    yield f"#{number}\n"
+    yield f"Synthetic Zone {number}~\n"
+    yield f"{bot} {top} {rng.randint(5, 60)} {rng.randint(0, 2)}\n"
+    yield "*\n* Generated by benchmarks/worldgen.py\n*\n"
+    written = 0
+    while written < commands:
+        roll = rng.random()
+        if roll < 0.05:
+            yield "* Next group\n"
+            continue
+        if roll < 0.45:
+            yield f"M 0 {vnum()} {rng.randint(1, 5)} {vnum()}\t\t{rng.choice(MOB_NAMES)}\n"
+            written += 1
+            # A loaded mob usually gets some gear chained to it.
+            for _ in range(rng.randint(0, 2)):
+                if rng.random() < 0.5:
+                    yield f"E 1 {vnum()} {rng.randint(1, 20)} {rng.randint(0, 17)}\t\t\t{rng.choice(OBJ_NAMES)}\n"
+                else:
+                    yield f"G 1 {vnum()} {rng.randint(1, 20)}\t\t\t{rng.choice(OBJ_NAMES)}\n"
+                written += 1
+        elif roll < 0.7:
+            yield f"O 0 {vnum()} {rng.randint(1, 10)} {vnum()}\t\t{rng.choice(OBJ_NAMES)}\n"
+            yield f"P 1 {vnum()} {rng.randint(1, 10)} {vnum()}\t\t\t{rng.choice(OBJ_NAMES)}\n"
+            written += 2
+        elif roll < 0.9:
+            yield f"D 0 {vnum()} {rng.randint(0, 5)} {rng.randint(0, 2)}\n"
+            written += 1
+        else:
+            yield f"R 0 {vnum()} {vnum()}\n"
+            written += 1
+    yield "S\n$\n"
+
+
+def write_zone(path, number, commands, seed=0):
+    with open(path, 'w') as f:
+        f.writelines(zone_lines(number, commands, seed))
+
+
+def write_world(root, zones, commands, seed=0):
+    """
+    Write 'zones' zone files of about 'commands' commands each under root.
+    Returns the list of paths.
+    """
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for number in range(zones):
+        path = os.path.join(root, f"{number}.zon")
+        write_zone(path, number, commands, seed)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic CircleMUD world of .zon files.")
+    parser.add_argument("size", choices=sorted(SIZES))
+    parser.add_argument("root", help="output directory")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    zones, commands = SIZES[args.size]
+    write_world(args.root, zones, commands, args.seed)
+    print(f"Wrote {zones} zones x {commands} commands to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,27 @@
 class ZoneData:
     def __init__(self, number: int = 0, name: str = "", bottom: int = 0,
                  top: int = 0, lifespan: int = 0, reset_mode: int = 0,
-                 commands: list = []) -> None:
+                 commands: list | None = None) -> None:
         self.number = number
         self.name = name
         self.bottom = bottom
         self.top = top
         self.lifespan = lifespan
         self.reset_mode = reset_mode
-        self.commands = commands
+        # A fresh list per zone; a [] default would be shared by all of them.
+        self.commands = commands if commands is not None else []
     
 
 def load(zone_data: ZoneData = ZoneData()) -> ZoneData:
     # spawn_mob("Puff", 1)
     return zone_data
 
+# Handlers by event name; the server calls these directly.
+EVENTS = {
+    "load": load,
+    "reload": load,
+}
+
 def zone_event(zone_data:  ZoneData = ZoneData(), event: str = "") -> ZoneData:
     match event:
         case "load":
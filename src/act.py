@@ -0,0 +1,294 @@
+"""
+Command handlers; the parts of CircleMUD's act.*.c the server can back so
+far. Each takes (ch, argument, cmd, subcmd) like an ACMD() function: cmd
+is the CommandInfo that matched and argument is the rest of the line.
+"""
+import db
+import metrics
+from broadcast import send_to_all, send_to_room
+from network import send_to_char
+from world import (LVL_GRGOD, NUM_OF_DIRS, POS_FIGHTING, POS_RESTING,
+                   POS_SITTING, POS_SLEEPING, POS_STANDING)
+
+DIRS = ("north", "east", "south", "west", "up", "down")
+
+POSITION_NAMES = ("dead", "mortally wounded", "incapacitated", "stunned",
+                  "sleeping", "resting", "sitting", "fighting", "standing")
+
+# Subcommands of do_gen_comm.
+SCMD_HOLLER = 0
+SCMD_SHOUT = 1
+SCMD_GOSSIP = 2
+SCMD_AUCTION = 3
+SCMD_GRATZ = 4
+
+COMM_CHANNELS = ("holler", "shout", "gossip", "auction", "congrat")
+
+
+def char_name(ch):
+    if ch.name:
+        return ch.name
+    return f"mobile #{ch.vnum}"
+
+
+def do_move(ch, argument, cmd, subcmd):
+    # Rooms have no exits until the room files are loaded.
+    send_to_char(ch, "Alas, you cannot go that way...\r\n")
+
+
+def do_look(ch, argument, cmd, subcmd):
+    if ch.position < POS_SLEEPING:
+        send_to_char(ch, "You can't see anything but stars!\r\n")
+        return
+    if ch.position == POS_SLEEPING:
+        send_to_char(ch, "You can't see anything, you're sleeping!\r\n")
+        return
+    room = ch.in_room
+    if room is None:
+        send_to_char(ch, "You are floating in the void.\r\n")
+        return
+    lines = [f"Room #{room.vnum}\r\n"]
+    exits = [DIRS[door] for door in sorted(room.doors) if door < NUM_OF_DIRS]
+    lines.append(f"[ Exits: {' '.join(d[0] for d in exits) or 'None!'} ]\r\n")
+    for obj in room.contents:
+        lines.append(f"Object #{obj.vnum} lies here.\r\n")
+    for person in room.people:
+        if person is not ch:
+            lines.append(f"{char_name(person).capitalize()} is "
+                         f"{POSITION_NAMES[person.position]} here.\r\n")
+    send_to_char(ch, "".join(lines))
+
+
+def do_say(ch, argument, cmd, subcmd):
+    if not argument:
+        send_to_char(ch, "Yes, but WHAT do you want to say?\r\n")
+        return
+    if ch.in_room is not None:
+        send_to_room(ch.in_room, f"{char_name(ch)} says, '{argument}'\r\n", ch)
+    send_to_char(ch, f"You say, '{argument}'\r\n")
+
+
+def do_emote(ch, argument, cmd, subcmd):
+    if not argument:
+        send_to_char(ch, "Yes.. But what?\r\n")
+        return
+    text = f"{char_name(ch)} {argument}\r\n"
+    if ch.in_room is not None:
+        send_to_room(ch.in_room, text, ch)
+    send_to_char(ch, text)
+
+
+def do_gen_comm(ch, argument, cmd, subcmd):
+    """
+    Holler, shout, gossip, auction and congrat: everyone connected hears.
+    """
+    channel = COMM_CHANNELS[subcmd]
+    if not argument:
+        send_to_char(ch, f"Yes, {channel}, fine, {channel} we must, but WHAT???\r\n")
+        return
+    if ch.desc is None:
+        return
+    send_to_all(ch.desc.server.descriptors,
+                f"{char_name(ch)} {channel}s, '{argument}'\r\n", ch, POS_RESTING)
+    send_to_char(ch, f"You {channel}, '{argument}'\r\n")
+
+
+def do_who(ch, argument, cmd, subcmd):
+    if ch.desc is None:
+        return
+    lines = ["Players\r\n-------\r\n"]
+    count = 0
+    for d in ch.desc.server.descriptors.values():
+        other = d.character
+        if other is not None:
+            lines.append(f"[{other.level:>2}] {other.name}\r\n")
+            count += 1
+    lines.append(f"\r\n{count} characters displayed.\r\n")
+    send_to_char(ch, "".join(lines))
+
+
+def do_score(ch, argument, cmd, subcmd):
+    send_to_char(ch, f"You are {char_name(ch)}, level {ch.level}.\r\n"
+                     f"You are {POSITION_NAMES[ch.position]}.\r\n")
+
+
+def do_inventory(ch, argument, cmd, subcmd):
+    lines = ["You are carrying:\r\n"]
+    for obj in ch.carrying:
+        lines.append(f"Object #{obj.vnum}\r\n")
+    if not ch.carrying:
+        lines.append(" Nothing.\r\n")
+    send_to_char(ch, "".join(lines))
+
+
+def do_equipment(ch, argument, cmd, subcmd):
+    lines = ["You are using:\r\n"]
+    worn = [obj for obj in ch.equipment if obj is not None]
+    for obj in worn:
+        lines.append(f"Object #{obj.vnum}\r\n")
+    if not worn:
+        lines.append(" Nothing.\r\n")
+    send_to_char(ch, "".join(lines))
+
+
+def do_stand(ch, argument, cmd, subcmd):
+    if ch.position == POS_STANDING:
+        send_to_char(ch, "You are already standing.\r\n")
+    elif ch.position == POS_FIGHTING:
+        send_to_char(ch, "Do you not consider fighting as standing?\r\n")
+    elif ch.position == POS_SLEEPING:
+        send_to_char(ch, "You have to wake up first!\r\n")
+    else:
+        send_to_char(ch, "You stand up.\r\n")
+        ch.position = POS_STANDING
+
+
+def do_sit(ch, argument, cmd, subcmd):
+    if ch.position == POS_SITTING:
+        send_to_char(ch, "You're sitting already.\r\n")
+    elif ch.position == POS_FIGHTING:
+        send_to_char(ch, "Sit down while fighting? Are you MAD?\r\n")
+    elif ch.position == POS_SLEEPING:
+        send_to_char(ch, "You have to wake up first.\r\n")
+    else:
+        send_to_char(ch, "You sit down.\r\n")
+        ch.position = POS_SITTING
+
+
+def do_rest(ch, argument, cmd, subcmd):
+    if ch.position == POS_RESTING:
+        send_to_char(ch, "You are already resting.\r\n")
+    elif ch.position == POS_FIGHTING:
+        send_to_char(ch, "Rest while fighting?  Are you MAD?\r\n")
+    elif ch.position == POS_SLEEPING:
+        send_to_char(ch, "You have to wake up first.\r\n")
+    else:
+        send_to_char(ch, "You sit down and rest your tired bones.\r\n")
+        ch.position = POS_RESTING
+
+
+def do_sleep(ch, argument, cmd, subcmd):
+    if ch.position == POS_SLEEPING:
+        send_to_char(ch, "You are already sound asleep.\r\n")
+    elif ch.position == POS_FIGHTING:
+        send_to_char(ch, "Sleep while fighting?  Are you MAD?\r\n")
+    else:
+        send_to_char(ch, "You go to sleep.\r\n")
+        ch.position = POS_SLEEPING
+
+
+def do_wake(ch, argument, cmd, subcmd):
+    if ch.position > POS_SLEEPING:
+        send_to_char(ch, "You are already awake...\r\n")
+    else:
+        send_to_char(ch, "You awaken, and sit up.\r\n")
+        ch.position = POS_SITTING
+
+
+def do_quit(ch, argument, cmd, subcmd):
+    if subcmd == 0:
+        send_to_char(ch, "You have to type quit--no less, to quit!\r\n")
+    elif ch.position == POS_FIGHTING:
+        send_to_char(ch, "No way!  You're fighting for your life!\r\n")
+    elif ch.desc is not None:
+        send_to_char(ch, "Goodbye, friend.. Come back soon!\r\n")
+        ch.desc.close()
+
+
+def find_zone(ch, argument):
+    """
+    The zone a zone number names, or the one ch stands in for '.'.
+    Tells ch and returns None if there is no such zone.
+    """
+    if not argument:
+        send_to_char(ch, "You must specify a zone.\r\n")
+        return None
+    zone = None
+    if argument == ".":
+        if ch.in_room is not None:
+            zone = db.zone_index.zone_for(ch.in_room.vnum)
+    elif argument.isdigit():
+        zone = db.zone_index.real_zone(int(argument))
+    if zone is None:
+        send_to_char(ch, "Invalid zone number.\r\n")
+    return zone
+
+
+def do_zreset(ch, argument, cmd, subcmd):
+    """
+    zreset <zone number>, or '.' for the zone you are standing in.
+    """
+    zone = find_zone(ch, argument)
+    if zone is None:
+        return
+    if ch.level < LVL_GRGOD:
+        send_to_char(ch, "You do not have permission to reset this zone.\r\n")
+        return
+    db.reset_zone(zone)
+    send_to_char(ch, f"Reset zone {zone.number} ({zone.name}).\r\n")
+
+
+def do_reload(ch, argument, cmd, subcmd):
+    """
+    reload zone <zone number>|.: re-read a zone file and swap the zone in
+    without a restart. CircleMUD's other reload targets (the text files)
+    do not exist here yet.
+    """
+    args = argument.split(None, 1)
+    if not args or args[0] != "zone":
+        send_to_char(ch, "Usage: reload zone <zone number>|.\r\n")
+        return
+    zone = find_zone(ch, args[1].strip() if len(args) > 1 else "")
+    if zone is None:
+        return
+    number = zone.number
+    zone = db.reload_zone(number)
+    if zone is None:
+        send_to_char(ch, f"Zone {number} was not reloaded; see the log.\r\n")
+        return
+    send_to_char(ch, f"Reloaded zone {zone.number} ({zone.name}).\r\n")
+
+
+def do_goto(ch, argument, cmd, subcmd):
+    """
+    goto <room vnum>. A room another shard owns is left for that shard
+    to show; the character moves over at the end of the pulse.
+    """
+    if not argument.isdigit():
+        send_to_char(ch, "You must supply a room number.\r\n")
+        return
+    vnum = int(argument)
+    world = db.world
+    if ch.in_room is not None:
+        send_to_room(ch.in_room, f"{char_name(ch)} disappears in a puff of smoke.\r\n", ch)
+    world.char_from_room(ch)
+    world.char_to_room(ch, world.room(vnum))
+    if world.remote is not None and world.remote(vnum):
+        return
+    send_to_room(ch.in_room, f"{char_name(ch)} appears with an ear-splitting bang.\r\n", ch)
+    do_look(ch, "", cmd, 0)
+
+
+def do_scriptstat(ch, argument, cmd, subcmd):
+    """
+    Which zone scripts are using pulse time.
+    """
+    send_to_char(ch, "".join(line + "\r\n" for line in db.scripts.report()))
+
+
+def do_metrics(ch, argument, cmd, subcmd):
+    """
+    The latency histograms and server counters.
+    """
+    if not metrics.enabled:
+        send_to_char(ch, "Metrics are off; start the server with --metrics.\r\n")
+        return
+    send_to_char(ch, "".join(line + "\r\n" for line in metrics.registry.report()))
+
+
+def do_not_here(ch, argument, cmd, subcmd):
+    send_to_char(ch, "Sorry, but you cannot do that here!\r\n")
+
+
+def do_unimplemented(ch, argument, cmd, subcmd):
+    send_to_char(ch, f"Sorry, '{cmd.command}' is not implemented yet.\r\n")
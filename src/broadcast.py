@@ -0,0 +1,98 @@
+"""
+Messages for many players at once: a room, a zone or everyone.
+
+The text is encoded to UTF-8 once per call and the bytes are shared by
+every recipient. Recipients come from the occupant indexes kept as
+players move (Room.players, db.zone_players), so the mobiles in a room
+are never looked at. A message with variants (what the actor sees and
+what everyone else sees) is one call per variant.
+
+A room's messages go through the room's network.Feed: the first message
+of a pulse puts the feed on every player's output queue in one pass, and
+each later one is a single append however many are listening. Zone and
+global messages are appended to every descriptor's queue in one C loop
+(write_to_many()).
+
+Each descriptor still compresses its own copy when MCCP2 is on: every
+zlib stream has its own state, so compressed bytes cannot be shared.
+"""
+from operator import attrgetter
+
+import db
+from network import Feed
+from world import POS_DEAD
+
+# Fewer recipients than this are written to one by one: below it the
+# batch paths cost more to set up than they save.
+BATCH_MIN = 16
+
+_DESC = attrgetter('desc')
+
+
+def encode(text):
+    return text.encode('utf-8') if isinstance(text, str) else text
+
+
+def write_to_many(descriptors, data):
+    """
+    Queue data on every descriptor in a list. Returns how many.
+    """
+    write = getattr(type(descriptors[0]), 'write_to_many', None) if descriptors else None
+    if write is None or len(descriptors) < BATCH_MIN:
+        for d in descriptors:
+            d.write_to_output(data)
+    else:
+        write(descriptors, data)
+    return len(descriptors)
+
+
+def send_to_players(players, text, skip=None, min_position=POS_DEAD):
+    """
+    Queue text for each character in players (any collection) except
+    skip, if they are at least at min_position. Returns how many got it.
+    """
+    descriptors = [ch.desc for ch in players
+                   if ch is not skip and ch.position >= min_position
+                   and ch.desc is not None]
+    return write_to_many(descriptors, encode(text))
+
+
+def send_to_room(room, text, skip=None, min_position=POS_DEAD):
+    players = room.players
+    if not players:
+        return 0
+    feed = room.feed
+    if feed is None or feed.closed:
+        if len(players) < BATCH_MIN or min_position > POS_DEAD:
+            return send_to_players(players, text, skip, min_position)
+        descriptors = list(map(_DESC, players))
+        while None in descriptors:
+            descriptors.remove(None)
+        if not descriptors:
+            return 0
+        if not hasattr(type(descriptors[0]), 'subscribe'):
+            return send_to_players(players, text, skip)
+        feed = room.feed = Feed()
+        feed.start(descriptors)
+    elif min_position > POS_DEAD:
+        return send_to_players(players, text, skip, min_position)
+    feed.send(encode(text), skip.desc if skip is not None else None)
+    return len(players) - (skip in players)
+
+
+def send_to_zone(zone, text, skip=None, min_position=POS_DEAD):
+    players = db.zone_players.get(zone.number)
+    if not players:
+        return 0
+    return send_to_players(players, text, skip, min_position)
+
+
+def send_to_all(descriptors, text, skip=None, min_position=POS_DEAD):
+    """
+    Every playing descriptor in descriptors (a server's or a shard's
+    descriptors dict).
+    """
+    recipients = [d for d in descriptors.values()
+                  if d.character is not None and d.character is not skip
+                  and d.character.position >= min_position]
+    return write_to_many(recipients, encode(text))
@@ -1,36 +1,270 @@
-import socket
+import argparse
+import os
+import signal
+import time
 
-from pprint import pprint
+import db
+import interpreter
+import metrics
+import shard
+from events import EventQueue, PulseStats, OPT_USEC, PASSES_PER_SEC, RL_MIN
+from lib.zone import log
+from network import ConnectionServer, LISTEN_BACKLOG
+from world import CharData, LVL_IMPL
 
 HOST = '0.0.0.0'
 PORT = 7777
 
-def main():
+# Never try to catch up more than this many pulses after a stall.
+MAX_MISSED_PULSES = 30 * PASSES_PER_SEC
+
+# How often the pulse timing summary is logged.
+PULSE_STATS_INTERVAL = 5 * RL_MIN
+
+# Where new players appear, and at what level. There are no player files
+# yet: every connection gets a fresh character.
+MORTAL_START_ROOM = 3001
+START_LEVEL = 1
+
+circle_shutdown = False
+
+
+def request_shutdown(signum, frame):
+    global circle_shutdown
+    circle_shutdown = True
+
+
+def heartbeat(events, stats):
+    """
+    Everything that happens once per pulse.
+    """
+    db.scripts.begin_pulse()
+    events.process()
+    if events.pulse % PULSE_STATS_INTERVAL == 0:
+        if stats.overruns:
+            log("SYSERR: Pulse overruns: %s", stats.report())
+        stats.reset()
+
+
+def game_loop(server, events, interpret, timed_interpret=None,
+              pulse=heartbeat):
+    """
+    Fixed-rate pulse loop (comm.c game_loop()). Socket I/O is handled while
+    waiting for the next pulse; the work of each pulse, pulse(events,
+    stats), is timed so overruns show up in the log. With timed_interpret
+    given, every COMMAND_SAMPLE'th pulse runs its commands through it
+    instead of interpret.
+    """
+    pulse_length = OPT_USEC / 1000000
+    stats = PulseStats(pulse_length)
+    next_pulse = time.monotonic() + pulse_length
+    while not circle_shutdown:
+        server.poll(max(0.0, next_pulse - time.monotonic()))
+        now = time.monotonic()
+        if now < next_pulse:
+            continue
+
+        # Commands first, then the pulse, then output, as in comm.c.
+        if timed_interpret is not None and events.pulse % metrics.COMMAND_SAMPLE == 0:
+            server.process_commands(timed_interpret)
+        else:
+            server.process_commands(interpret)
+
+        missed = int((now - next_pulse) / pulse_length)
+        if missed > MAX_MISSED_PULSES:
+            log("SYSERR: Missed %d seconds worth of pulses.",
+                missed // PASSES_PER_SEC)
+            missed = MAX_MISSED_PULSES
+            next_pulse = now
+
+        for _ in range(missed + 1):
+            start = time.perf_counter()
+            pulse(events, stats)
+            elapsed = time.perf_counter() - start
+            stats.record(elapsed)
+            if metrics.enabled:
+                metrics.pulse_duration.record(int(elapsed * 1e9))
+        next_pulse += (missed + 1) * pulse_length
+
+        # Everything queued this pulse goes out in one write per descriptor.
+        server.flush_output()
+
+
+def on_connect(d):
+    print(f"Connection established: {d.addr}")
+    new_character(d)
+
+
+def new_character(d):
+    """
+    Give a new connection its character and put it in the start room.
+    """
+    ch = CharData()
+    ch.name = f"Player{d.desc_num}"
+    ch.level = START_LEVEL
+    ch.desc = d
+    d.character = ch
+    db.world.char_to_room(ch, db.world.room(MORTAL_START_ROOM))
+    return ch
+
+
+def on_disconnect(d):
+    print(f"Connection closed: {d.addr}")
+    free_character(d)
+
+
+def free_character(d):
+    """
+    Take a closed connection's character out of the world.
+    """
+    ch = d.character
+    if ch is not None:
+        db.world.char_from_room(ch)
+        ch.desc = None
+        d.character = None
+
+
+def command_interpreter(d, line):
+    """
+    Run one line of input for the descriptor's character. Returns the
+    name of the command it ran.
+    """
+    return interpreter.command_interpreter(d.character, line)
+
+
+def timed_command_interpreter(d, line, clock=time.perf_counter_ns,
+                              histograms=metrics.command_duration):
+    """
+    command_interpreter() with its time recorded per command. With metrics
+    on, the game loop uses it for one pulse in COMMAND_SAMPLE.
+    """
+    start = clock()
+    command = interpreter.command_interpreter(d.character, line)
+    if command is not None:
+        histograms[command].record(clock() - start)
+
+
+def main(host=HOST, port=PORT, backlog=LISTEN_BACKLOG, script_workers=0,
+         metrics_file=None, start_level=START_LEVEL, shards=0,
+         lazy_zones=False, evict_idle=0, skip_idle_resets=False):
+    global START_LEVEL
     print("CircleMUD-py 01.16.2025 10:30pm ET")
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT))
-    server.listen(15)
+    START_LEVEL = start_level
+    if shards:
+        return run_gateway(host, port, backlog, script_workers, metrics_file,
+                           shards)
+
+    events = EventQueue()
+    if metrics_file is not None:
+        metrics.enable()
+        events.schedule(metrics.METRICS_INTERVAL, metrics.write_event,
+                        metrics_file)
+    db.scripts.workers = script_workers
+    db.skip_idle_resets = skip_idle_resets
+    if lazy_zones:
+        db.boot_lazy()
+        if evict_idle:
+            db.schedule_zone_eviction(events, evict_idle * 60)
+    else:
+        db.boot_zones()
+        for zone in db.zone_table:
+            db.reset_zone(zone)
+    db.schedule_zone_resets(events)
+    db.scripts.schedule(events)
+    db.end_boot()
+
+    server = ConnectionServer(host, port, backlog, on_connect=on_connect,
+                              on_disconnect=on_disconnect)
+    server.start()
+
+    if metrics.enabled:
+        metrics.watch_server(server)
+
+    signal.signal(signal.SIGTERM, request_shutdown)
     try:
-        while True:
-            client_sock, client_addr = server.accept()
-            print(f"Connection established: {client_addr}")
+        game_loop(server, events, command_interpreter,
+                  timed_command_interpreter if metrics.enabled else None)
+    except KeyboardInterrupt:
+        pass
+    print("\r\nShutting down.")
+    server.shutdown()
+    db.scripts.shutdown()
+
+
+def run_gateway(host, port, backlog, script_workers, metrics_file, shards):
+    """
+    main() with the world split across shard processes (see shard.py);
+    this process only handles the connections.
+    """
+    gateway = shard.start_shards(shards, heartbeat, MORTAL_START_ROOM,
+                                 START_LEVEL, script_workers)
+    events = EventQueue()
+    if metrics_file is not None:
+        metrics.enable()
+        events.schedule(metrics.METRICS_INTERVAL, metrics.write_event,
+                        metrics_file)
 
-            while True:
-                data = client_sock.recv(1024)
-                if not data:
-                    break
+    def gateway_pulse(events, stats):
+        global circle_shutdown
+        if not gateway.exchange():
+            circle_shutdown = True
+        heartbeat(events, stats)
 
-                print(f"Recv: {client_addr}: {data.decode('utf-8')}")
-                client_sock.sendall(data)
+    server = ConnectionServer(host, port, backlog,
+                              on_connect=gateway.on_connect,
+                              on_disconnect=gateway.on_disconnect)
+    server.start()
+    if metrics.enabled:
+        metrics.watch_server(server)
+
+    def stop(signum, frame):
+        gateway.stopping = True
+        request_shutdown(signum, frame)
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        game_loop(server, events, gateway.route, pulse=gateway_pulse)
     except KeyboardInterrupt:
-        print("\r\nShutting down.")
-        server.close()
+        pass
+    print("\r\nShutting down.")
+    server.shutdown()
+    gateway.shutdown()
+
 
 if __name__ == "__main__":
-    with open('9.zon', 'r') as f:
-        zone_info = load_zones(f, 'some_zone_file.zon')
-        #pprint(zone_info.__dict__)
-        pprint(zone_info.cmd[1].__dict__)
-        print("=====")
-        pprint(zone_info.cmd[4].__dict__)
-    main()
+    parser = argparse.ArgumentParser(description="CircleMUD-py game server")
+    parser.add_argument("-p", "--port", type=int, default=PORT)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--backlog", type=int, default=LISTEN_BACKLOG,
+                        help="listen() backlog")
+    parser.add_argument("--script-workers", type=int, default=0,
+                        help="worker processes for @offload zone script handlers")
+    parser.add_argument("--metrics", nargs="?", metavar="FILE",
+                        const=os.path.join(db.ROOT_DIR, metrics.METRICS_FILE),
+                        help="record metrics and write them to FILE in "
+                             "Prometheus text format")
+    parser.add_argument("--start-level", type=int, default=START_LEVEL,
+                        choices=range(1, LVL_IMPL + 1), metavar="LEVEL",
+                        help="level new characters start at (for testing "
+                             "immortal commands)")
+    parser.add_argument("--shards", type=int, default=0, metavar="N",
+                        help="split the zones across N processes behind "
+                             "this one")
+    parser.add_argument("--lazy-zones", action="store_true",
+                        help="read only zone headers at boot; load each "
+                             "zone when it is first reset or entered")
+    parser.add_argument("--evict-idle", type=int, default=0, metavar="MINUTES",
+                        help="with --lazy-zones, unload zones nobody has "
+                             "used for MINUTES")
+    parser.add_argument("--skip-idle-resets", action="store_true",
+                        help="do not reset zones no player has entered "
+                             "since their last reset")
+    args = parser.parse_args()
+    if args.lazy_zones and args.shards:
+        parser.error("--lazy-zones does not apply to --shards, which map "
+                     "the world image")
+    if args.evict_idle and not args.lazy_zones:
+        parser.error("--evict-idle needs --lazy-zones")
+    main(args.host, args.port, args.backlog, args.script_workers, args.metrics,
+         args.start_level, args.shards, args.lazy_zones, args.evict_idle,
+         args.skip_idle_resets)
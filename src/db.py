@@ -0,0 +1,407 @@
+"""
+World loading and zone resets; the Python side of CircleMUD's db.c.
+"""
+import gc
+import os
+import sys
+import time
+
+from collections import OrderedDict
+
+import metrics
+from events import RL_MIN
+from world import NOWHERE, World
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The zone parser lives with the conversion tools; share it rather than fork it.
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+from lib.world import (ZONE_DIR, LazyZone, boot_headers, boot_world,  # noqa: E402
+                       parse_zone_file)
+from lib.worldcache import WORLD_CACHE  # noqa: E402
+from lib.worldimage import WORLD_IMAGE, WorldImage  # noqa: E402
+from lib.zone import log  # noqa: E402
+from lib.zonelink import ERROR  # noqa: E402
+from lib.zoneindex import VnumIndex, ZoneOverlapError  # noqa: E402
+from scripts import SCRIPT_DIR, ScriptManager  # noqa: E402
+from zonereset import ResetEngine  # noqa: E402
+
+
+# Zone reset modes (zone_data.reset_mode)
+ZRESET_NEVER = 0    # never reset after boot
+ZRESET_EMPTY = 1    # reset only when no players are in the zone
+ZRESET_ALWAYS = 2   # reset every time the lifespan runs out
+
+# How often lazy zones are checked for eviction.
+EVICT_CHECK_PULSES = RL_MIN
+
+# What reset_check() decides for a zone whose lifespan has run out.
+RESET_NOW = 0
+RESET_DEFER = 1     # ZRESET_EMPTY zone with players in it; ask again soon
+RESET_SKIP = 2      # nothing to reset; wait for the next lifespan
+
+# How soon a deferred reset is tried again (CircleMUD's zone_update()
+# looks at its reset queue once a minute).
+RESET_RETRY_PULSES = RL_MIN
+
+world = World()
+reset_engine = ResetEngine(world)
+zone_table = []
+zone_index = VnumIndex()
+zone_files = {}         # zone number -> source file
+zone_reset_events = {}  # zone number -> pending reset Event
+reset_queue = None      # the EventQueue those events are on
+scripts = ScriptManager(os.path.join(ROOT_DIR, SCRIPT_DIR),
+                        lambda number: zone_index.real_zone(number))
+
+# With lazy zones (boot_lazy()): zone number -> time.monotonic() of its
+# last use, for every zone whose commands and script are in memory, least
+# recently used first.
+lazy_zones = False
+loaded_zones = OrderedDict()
+
+# Kept up to date as players move (world.player_entered/player_left), so
+# no reset check ever looks for players: zone number -> the players in it
+# now ({CharData: None}), and zone number -> how many players entered it
+# since its last reset.
+zone_players = {}
+zone_visits = {}
+# With this set, a zone nobody has been in since its last reset is not
+# reset again: nothing in it can have changed.
+skip_idle_resets = False
+
+
+def boot_zones(root=os.path.join(ROOT_DIR, ZONE_DIR), workers=None,
+               cache_path=os.path.join(ROOT_DIR, WORLD_CACHE), keep=None):
+    """
+    Load every zone under root into zone_table, sorted by vnum, and build
+    zone_index. A zone that fails to parse or overlaps another is logged
+    and left out rather than stopping the boot. Unchanged zones are read
+    from the world cache at cache_path. With keep, only zones for which
+    keep(zone) is true are kept (a shard's share of the world).
+    """
+    zones, report = boot_world(root, workers, cache_path)
+    for path, message in report.errors:
+        log("SYSERR: %s", message)
+    index = report.index
+    if keep is not None:
+        index = VnumIndex()
+        for zone in zones:
+            if keep(zone):
+                index.add_zone(zone)
+        scripts.wanted = {zone.number: None for zone in index.zones}.__contains__
+    log(report.summary())
+    paths = {number: path for path, number, ncmds, seconds in report.zones}
+    return install_zones(index, paths, report.index)
+
+
+def boot_image(path=os.path.join(ROOT_DIR, WORLD_IMAGE), keep=None):
+    """
+    boot_zones() from a world image (lib/worldimage.py) instead of the
+    zone files: the image is mapped, not read, so this takes milliseconds
+    and the zone data is shared with every other process using the image.
+    """
+    start = time.perf_counter()
+    image = WorldImage(path)
+    index = VnumIndex()
+    whole = VnumIndex()
+    for zone in image.zones:
+        whole.add_zone(zone)
+        if keep is None or keep(zone):
+            index.add_zone(zone)
+    if keep is not None:
+        # Scripts of other shards' zones are theirs to load and run.
+        scripts.wanted = {zone.number: None for zone in index.zones}.__contains__
+    log("Mapped %d of %d zones from %s in %.1f ms.", len(index),
+        len(image.zones), path, (time.perf_counter() - start) * 1000)
+    return install_zones(index, {zone.number: zone.path for zone in index.zones},
+                         whole)
+
+
+def install_zones(index, paths, whole=None):
+    """
+    Make the zones in index the world's: zone_table, zone_index, their
+    compiled reset programs and their scripts. Zones are linked against
+    whole, the index of the entire world when index is only a shard's
+    share of it.
+    """
+    global zone_index
+    zone_table[:] = index.zones
+    zone_index = index
+    zone_files.clear()
+    for zone in zone_table:
+        if paths.get(zone.number):
+            zone_files[zone.number] = paths[zone.number]
+    if lazy_zones:
+        # Zones are linked one at a time as they load, without the
+        # world-wide view of which objects get loaded.
+        reset_engine.programs.clear()
+        reset_engine.index = index
+        reset_engine.loaded = None
+    else:
+        problems = reset_engine.link(zone_table, whole or index)
+        if problems:
+            log("Linked %d zones: %d errors, %d warnings.", len(zone_table),
+                sum(problem.severity == ERROR for problem in problems),
+                sum(problem.severity != ERROR for problem in problems))
+    count_players()
+    zone_visits.clear()
+    scripts.load_all()
+    return zone_table
+
+
+def boot_lazy(root=os.path.join(ROOT_DIR, ZONE_DIR)):
+    """
+    boot_zones() with only the zone headers read. A zone's commands and
+    script are loaded the first time it resets or a player enters it (see
+    touch_zone()), so boot time and memory follow the part of the world
+    in use rather than its size. Zones are not reset at boot: each is
+    reset when it is first entered.
+    """
+    global lazy_zones
+    lazy_zones = True
+    loaded_zones.clear()
+    zones, report = boot_headers(root)
+    for path, message in report.errors:
+        log("SYSERR: %s", message)
+    log(report.summary())
+    scripts.wanted = loaded_zones.__contains__
+    paths = {number: path for path, number, ncmds, seconds in report.zones}
+    return install_zones(report.index, paths)
+
+
+def touch_zone(zone):
+    """
+    Mark a lazy zone as just used, first loading its commands and script
+    if they are not in memory. Returns True if they had to be loaded.
+    """
+    number = zone.number
+    if number in loaded_zones:
+        loaded_zones.move_to_end(number)
+        loaded_zones[number] = time.monotonic()
+        return False
+    loaded_zones[number] = time.monotonic()
+    if not zone.loaded:
+        error = zone.load()
+        if error is not None:
+            log("SYSERR: %s", error)
+    reset_engine.compile(zone)
+    scripts.load_zone(number)
+    return True
+
+
+def room_zone(room):
+    """
+    The number of the zone holding room, or NOWHERE; cached on the room.
+    """
+    number = room.zone
+    if number is None:
+        zone = zone_index.zone_for(room.vnum)
+        number = room.zone = zone.number if zone is not None else NOWHERE
+    return number
+
+
+def player_entered(ch, room):
+    """
+    world.player_entered: count the player into the room's zone. With
+    lazy zones, a zone entered for the first time (or again after
+    eviction) is loaded and reset.
+    """
+    number = room_zone(room)
+    if number == NOWHERE:
+        return
+    players = zone_players.get(number)
+    if players is None:
+        players = zone_players[number] = {}
+    players[ch] = None
+    zone_visits[number] = zone_visits.get(number, 0) + 1
+    if lazy_zones:
+        zone = zone_index.real_zone(number)
+        if zone is not None and touch_zone(zone):
+            reset_zone(zone)
+
+
+def player_left(ch, room):
+    number = room.zone
+    if number is not None and number != NOWHERE:
+        zone_players[number].pop(ch, None)
+
+
+def count_players():
+    """
+    Rebuild zone_players from scratch, after zone ranges change. The only
+    place that walks the rooms looking for players.
+    """
+    zone_players.clear()
+    for room in world.rooms.values():
+        room.zone = None
+        if room.players:
+            number = room_zone(room)
+            if number != NOWHERE:
+                zone_players.setdefault(number, {}).update(room.players)
+
+
+world.player_entered = player_entered
+world.player_left = player_left
+
+
+def evict_zones(idle):
+    """
+    Let go of the commands, reset program and script of every lazy zone
+    unused for idle seconds with no player in it, least recently used
+    first. Returns how many were evicted.
+    """
+    cutoff = time.monotonic() - idle
+    evicted = 0
+    for number, used in list(loaded_zones.items()):
+        if used > cutoff:
+            break
+        zone = zone_index.real_zone(number)
+        if zone is None:
+            del loaded_zones[number]
+            continue
+        if zone_players.get(number):
+            touch_zone(zone)
+            continue
+        del loaded_zones[number]
+        zone.unload()
+        reset_engine.forget(zone)
+        scripts.unload(number)
+        evicted += 1
+    if evicted:
+        log("Evicted %d idle zones; %d still loaded.", evicted, len(loaded_zones))
+    return evicted
+
+
+def schedule_zone_eviction(events, idle):
+    """
+    Check for idle lazy zones every EVICT_CHECK_PULSES.
+    """
+    def evict_event():
+        evict_zones(idle)
+        return EVICT_CHECK_PULSES
+    return events.schedule(EVICT_CHECK_PULSES, evict_event)
+
+
+def reload_zone(number):
+    """
+    Re-read one zone from its file and swap it in while the game runs
+    (the reload command). On any problem the old zone stays in place.
+    Returns the new zone, or None.
+    """
+    path = zone_files.get(number)
+    if path is None:
+        log("SYSERR: reload_zone: no file known for zone %d", number)
+        return None
+    path, zone, seconds, error = parse_zone_file(path)
+    if error is not None:
+        log("SYSERR: %s", error)
+        return None
+    if zone.number != number:
+        log("SYSERR: %s now holds zone %d, not %d", path, zone.number, number)
+        return None
+    if lazy_zones:
+        zone = LazyZone(zone, path, zone.cmd)
+    try:
+        old = zone_index.replace_zone(zone)
+    except ZoneOverlapError as e:
+        log("SYSERR: %s in %s", e, path)
+        return None
+    zone_table[:] = zone_index.zones
+    if old is None or (zone.bot, zone.top) != (old.bot, old.top):
+        count_players()
+    if lazy_zones:
+        loaded_zones.pop(number, None)
+        touch_zone(zone)
+    else:
+        reset_engine.compile(zone)
+    if old is not None:
+        cancel_zone_reset(reset_queue, old)
+    schedule_zone_reset(reset_queue, zone)
+    log("Zone %d (%s) reloaded from %s.", zone.number, zone.name, path)
+    return zone
+
+
+def reset_zone(zone):
+    """
+    Run the zone's reset commands.
+    """
+    if lazy_zones:
+        touch_zone(zone)
+    if metrics.enabled:
+        start = time.perf_counter_ns()
+        reset_engine.reset(zone)
+        metrics.zone_reset_duration[zone.number].record(
+            time.perf_counter_ns() - start)
+    else:
+        reset_engine.reset(zone)
+    zone_visits.pop(zone.number, None)
+    scripts.dispatch(zone, "reset")
+    log("Auto zone reset: %s", zone.name)
+
+
+def reset_check(zone):
+    """
+    Whether a zone whose lifespan has run out should reset now
+    (RESET_NOW), wait until its players leave (RESET_DEFER) or let this
+    lifespan pass (RESET_SKIP). Only looks at counters, never for players.
+    """
+    number = zone.number
+    if zone.reset_mode == ZRESET_EMPTY and zone_players.get(number):
+        return RESET_DEFER
+    if lazy_zones and number not in loaded_zones:
+        return RESET_SKIP   # it resets when next entered
+    if (skip_idle_resets and not zone_players.get(number)
+            and not zone_visits.get(number)):
+        return RESET_SKIP
+    return RESET_NOW
+
+
+def zone_reset_event(zone):
+    """
+    Timer callback: reset the zone if reset_check() agrees, and reschedule
+    for the next lifespan, or in RESET_RETRY_PULSES if it was deferred.
+    """
+    action = reset_check(zone)
+    if action == RESET_DEFER:
+        return RESET_RETRY_PULSES
+    if action == RESET_NOW:
+        reset_zone(zone)
+    return zone.lifespan * RL_MIN
+
+
+def end_boot():
+    """
+    Called once the world is booted and reset. gc.freeze() puts every
+    object allocated so far out of the cyclic collector's reach: each full
+    collection would otherwise walk the whole world and every mobile and
+    object of the boot reset, a pause that grows with the world and lands
+    in whatever pulse triggers it.
+    """
+    gc.freeze()
+
+
+def schedule_zone_resets(events):
+    """
+    Queue one repeating reset event per zone. Zones that never reset, or
+    have no lifespan, get no event at all. The first resets are spread
+    over a minute of pulses, so zones with the same lifespan do not all
+    reset in one pulse (CircleMUD only looks at lifespans once a minute).
+    """
+    global reset_queue
+    reset_queue = events
+    for position, zone in enumerate(zone_table):
+        schedule_zone_reset(events, zone, position % RL_MIN)
+
+
+def schedule_zone_reset(events, zone, offset=0):
+    cancel_zone_reset(events, zone)
+    if zone.reset_mode == ZRESET_NEVER or zone.lifespan <= 0:
+        return
+    zone_reset_events[zone.number] = events.schedule(
+        zone.lifespan * RL_MIN + offset, zone_reset_event, zone)
+
+
+def cancel_zone_reset(events, zone):
+    events.cancel(zone_reset_events.pop(zone.number, None))
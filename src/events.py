@@ -0,0 +1,187 @@
+"""
+Event scheduling for the pulse loop, in the spirit of CircleMUD's events.c.
+
+Events live in a hierarchical timing wheel: four levels of slots, each level
+covering a coarser span of pulses. Scheduling appends to one slot and
+cancelling sets a flag, so both are O(1) no matter how many events are
+pending. Once per pulse the wheel runs the single slot that is due; every
+256 pulses the next level's slot is cascaded down a level. The per-pulse
+cost depends on what is due, not on how much is waiting.
+
+Wheel layout (pulses per slot / slots / span at 10 pulses per second):
+    level 0:         1 / 256 / 25.6 seconds
+    level 1:       256 /  64 / 27 minutes
+    level 2:    16,384 /  64 / 29 hours
+    level 3: 1,048,576 /  64 / 77 days
+Events further out than that wait in the last slot and are re-filed each
+time they cascade.
+"""
+import traceback
+
+# Pulse timing, as in CircleMUD's structs.h.
+OPT_USEC = 100000                    # microseconds per pulse
+PASSES_PER_SEC = 1000000 // OPT_USEC
+RL_SEC = PASSES_PER_SEC              # pulses per real-life second
+RL_MIN = 60 * RL_SEC                 # pulses per real-life minute
+
+WHEEL_BITS = (8, 6, 6, 6)
+
+
+class Event:
+    """
+    A scheduled callback. func(*args) runs when the event fires; if it
+    returns a positive integer the event is re-queued that many pulses
+    later (the same convention as CircleMUD's EVENTFUNC).
+    """
+    __slots__ = ('when', 'func', 'args', 'cancelled')
+
+    def __init__(self, when, func, args):
+        self.when = when
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"<Event {getattr(self.func, '__name__', self.func)} @{self.when}>"
+
+
+class EventQueue:
+    """
+    Hierarchical timing wheel holding every pending Event.
+    """
+    def __init__(self):
+        self.pulse = 0      # last pulse processed
+        self.pending = 0    # scheduled, not yet fired or cancelled
+        self.wheels = [[[] for _ in range(1 << bits)] for bits in WHEEL_BITS]
+        self.shifts = []
+        shift = 0
+        for bits in WHEEL_BITS:
+            self.shifts.append(shift)
+            shift += bits
+
+    def schedule(self, delay, func, *args):
+        """
+        Run func(*args) delay pulses from now (at least one). Returns the
+        Event, which is the handle for cancel().
+        """
+        event = Event(self.pulse + max(1, int(delay)), func, args)
+        self.pending += 1
+        self._file(event)
+        return event
+
+    def cancel(self, event):
+        """
+        Cancel a pending event. The slot entry is dropped lazily when its
+        slot comes due, so this never searches the wheel.
+        """
+        if event is not None and not event.cancelled:
+            event.cancelled = True
+            self.pending -= 1
+
+    def time_left(self, event):
+        """
+        Pulses until the event fires (CircleMUD's event_time()).
+        """
+        return event.when - self.pulse
+
+    def _file(self, event):
+        when = event.when
+        if when - self.pulse < len(self.wheels[0]):
+            self.wheels[0][when & (len(self.wheels[0]) - 1)].append(event)
+            return
+        for level in range(1, len(self.wheels)):
+            shift = self.shifts[level]
+            size = len(self.wheels[level])
+            if (when >> shift) - (self.pulse >> shift) < size:
+                self.wheels[level][(when >> shift) & (size - 1)].append(event)
+                return
+        # Beyond the wheel's range; park in the furthest slot and re-file later.
+        shift = self.shifts[-1]
+        size = len(self.wheels[-1])
+        self.wheels[-1][((self.pulse >> shift) - 1) & (size - 1)].append(event)
+
+    def _cascade(self, pulse):
+        # Move the due slot of each coarser level down, highest level first,
+        # so events can drop more than one level in the same pulse.
+        levels = []
+        for level in range(1, len(self.wheels)):
+            if pulse & ((1 << self.shifts[level]) - 1):
+                break
+            levels.append(level)
+        for level in reversed(levels):
+            shift = self.shifts[level]
+            slots = self.wheels[level]
+            index = (pulse >> shift) & (len(slots) - 1)
+            due = slots[index]
+            slots[index] = []
+            for event in due:
+                if not event.cancelled:
+                    self._file(event)
+
+    def process(self):
+        """
+        Advance one pulse and fire every event due on it. Returns the number
+        of events that fired.
+        """
+        self.pulse += 1
+        pulse = self.pulse
+        if not pulse & (len(self.wheels[0]) - 1):
+            self._cascade(pulse)
+        slots = self.wheels[0]
+        index = pulse & (len(slots) - 1)
+        due = slots[index]
+        if not due:
+            return 0
+        slots[index] = []
+        fired = 0
+        for event in due:
+            if event.cancelled:
+                continue
+            # No longer pending while it runs; cancel() from inside is a no-op.
+            event.cancelled = True
+            self.pending -= 1
+            fired += 1
+            try:
+                again = event.func(*event.args)
+            except Exception:
+                # One broken callback must not take the rest of the pulse
+                # (or the server) down with it.
+                print(f"SYSERR: Event {event!r} raised an exception:")
+                traceback.print_exc()
+                again = 0
+            if again and again > 0:
+                event.when = self.pulse + int(again)
+                event.cancelled = False
+                self.pending += 1
+                self._file(event)
+        return fired
+
+
+class PulseStats:
+    """
+    Tracks how long each pulse's work took against the pulse length, so the
+    game loop can report overruns.
+    """
+    def __init__(self, pulse_length=OPT_USEC / 1000000):
+        self.pulse_length = pulse_length
+        self.reset()
+
+    def reset(self):
+        self.pulses = 0
+        self.overruns = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def record(self, elapsed):
+        self.pulses += 1
+        self.total += elapsed
+        if elapsed > self.worst:
+            self.worst = elapsed
+        if elapsed > self.pulse_length:
+            self.overruns += 1
+
+    def report(self):
+        avg = self.total / self.pulses if self.pulses else 0.0
+        return (f"{self.pulses} pulses, avg {avg * 1000:.2f} ms, "
+                f"worst {self.worst * 1000:.2f} ms, "
+                f"{self.overruns} over {self.pulse_length * 1000:.0f} ms")
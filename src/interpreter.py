@@ -0,0 +1,495 @@
+"""
+The command interpreter; the Python side of CircleMUD's interpreter.c.
+
+cmd_info lists every command in priority order: when a player types an
+abbreviation, the first command in the list that it abbreviates (and that
+the player's level allows) wins, so "l" is look and "s" is south. The stock
+interpreter finds that command by walking the list with is_abbrev(); here
+every prefix of every command is worked out once at startup, per level, so
+looking up what a player typed is a single dict access however long the
+list grows. Position is checked after the lookup, as in the original, so a
+sleeping player typing "n" is told so rather than told "Huh?!?".
+"""
+from act import (SCMD_AUCTION, SCMD_GOSSIP, SCMD_GRATZ, SCMD_HOLLER,
+                 SCMD_SHOUT, char_name, do_emote, do_equipment, do_gen_comm,
+                 do_goto, do_inventory, do_look, do_metrics, do_move,
+                 do_not_here, do_quit, do_reload, do_rest, do_say,
+                 do_score, do_scriptstat, do_sit, do_sleep, do_stand,
+                 do_unimplemented, do_wake, do_who, do_zreset)
+from broadcast import send_to_room
+from network import send_to_char
+from world import (LVL_FREEZE, LVL_GOD, LVL_GRGOD, LVL_IMMORT, LVL_IMPL,
+                   POS_DEAD, POS_FIGHTING, POS_INCAP, POS_MORTALLYW,
+                   POS_RESTING, POS_SITTING, POS_SLEEPING, POS_STANDING,
+                   POS_STUNNED)
+
+# Subcommands of do_move.
+SCMD_NORTH = 0
+SCMD_EAST = 1
+SCMD_SOUTH = 2
+SCMD_WEST = 3
+SCMD_UP = 4
+SCMD_DOWN = 5
+
+# Subcommands of do_quit.
+SCMD_QUI = 0
+SCMD_QUIT = 1
+
+# Subcommands of do_commands.
+SCMD_COMMANDS = 0
+SCMD_SOCIALS = 1
+SCMD_WIZHELP = 2
+
+# What a player in too low a position is told instead.
+POSITION_MESSAGES = {
+    POS_DEAD: "Lie still; you are DEAD!!! :-(\r\n",
+    POS_INCAP: "You are in a pretty bad shape, unable to do anything!\r\n",
+    POS_MORTALLYW: "You are in a pretty bad shape, unable to do anything!\r\n",
+    POS_STUNNED: "All you can do right now is think about the stars!\r\n",
+    POS_SLEEPING: "In your dreams, or what?\r\n",
+    POS_RESTING: "Nah... You feel too relaxed to do that..\r\n",
+    POS_SITTING: "Maybe you should get on your feet first?\r\n",
+    POS_FIGHTING: "No way!  You're fighting for your life!\r\n",
+}
+
+
+class CommandInfo:
+    """
+    One row of the command table ('struct command_info').
+    """
+    __slots__ = ('command', 'minimum_position', 'command_pointer',
+                 'minimum_level', 'subcmd')
+
+    def __init__(self, command, minimum_position, command_pointer,
+                 minimum_level, subcmd):
+        self.command = command
+        self.minimum_position = minimum_position
+        self.command_pointer = command_pointer
+        self.minimum_level = minimum_level
+        self.subcmd = subcmd
+
+    def __repr__(self):
+        return f"<CommandInfo {self.command}>"
+
+
+def do_action(ch, argument, cmd, subcmd):
+    """
+    A social. There is no socials file yet, so every one reads the same.
+    """
+    send_to_char(ch, f"You {cmd.command}.\r\n")
+    if ch.in_room is not None:
+        send_to_room(ch.in_room, f"{char_name(ch)} {cmd.command}s.\r\n", ch)
+
+
+def do_commands(ch, argument, cmd, subcmd):
+    """
+    commands, socials and wizhelp: what this character can type.
+    """
+    if subcmd == SCMD_SOCIALS:
+        wanted = [info.command for info in cmd_info
+                  if info.command_pointer is do_action]
+        title = "The following social actions are available:\r\n"
+    else:
+        wizhelp = subcmd == SCMD_WIZHELP
+        wanted = [info.command for info in cmd_info
+                  if info.command[0].isalpha()
+                  and info.command_pointer is not do_action
+                  and info.minimum_level <= ch.level
+                  and (info.minimum_level >= LVL_IMMORT) == wizhelp]
+        if wizhelp:
+            title = "The following privileged commands are available:\r\n"
+        else:
+            title = "The following commands are available:\r\n"
+    lines = [title]
+    for i, name in enumerate(sorted(wanted)):
+        lines.append(f"{name:<11}")
+        if i % 7 == 6:
+            lines.append("\r\n")
+    if len(wanted) % 7:
+        lines.append("\r\n")
+    send_to_char(ch, "".join(lines))
+
+
+# command, minimum position, function, minimum level, subcommand.
+# Order matters: it decides what an abbreviation means.
+cmd_info = [CommandInfo(*entry) for entry in (
+    ("north"    , POS_STANDING, do_move         , 0, SCMD_NORTH),
+    ("east"     , POS_STANDING, do_move         , 0, SCMD_EAST),
+    ("south"    , POS_STANDING, do_move         , 0, SCMD_SOUTH),
+    ("west"     , POS_STANDING, do_move         , 0, SCMD_WEST),
+    ("up"       , POS_STANDING, do_move         , 0, SCMD_UP),
+    ("down"     , POS_STANDING, do_move         , 0, SCMD_DOWN),
+
+    ("at"       , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("advance"  , POS_DEAD    , do_unimplemented, LVL_IMPL, 0),
+    ("alias"    , POS_DEAD    , do_unimplemented, 0, 0),
+    ("accuse"   , POS_SITTING , do_action       , 0, 0),
+    ("applaud"  , POS_RESTING , do_action       , 0, 0),
+    ("assist"   , POS_FIGHTING, do_unimplemented, 1, 0),
+    ("ask"      , POS_RESTING , do_unimplemented, 0, 0),
+    ("auction"  , POS_SLEEPING, do_gen_comm     , 0, SCMD_AUCTION),
+
+    ("bounce"   , POS_STANDING, do_action       , 0, 0),
+    ("backstab" , POS_STANDING, do_unimplemented, 1, 0),
+    ("ban"      , POS_DEAD    , do_unimplemented, LVL_GRGOD, 0),
+    ("balance"  , POS_STANDING, do_not_here     , 1, 0),
+    ("bash"     , POS_FIGHTING, do_unimplemented, 1, 0),
+    ("beg"      , POS_RESTING , do_action       , 0, 0),
+    ("bleed"    , POS_RESTING , do_action       , 0, 0),
+    ("blush"    , POS_RESTING , do_action       , 0, 0),
+    ("bow"      , POS_STANDING, do_action       , 0, 0),
+    ("brb"      , POS_RESTING , do_action       , 0, 0),
+    ("burp"     , POS_RESTING , do_action       , 0, 0),
+    ("buy"      , POS_STANDING, do_not_here     , 0, 0),
+    ("bug"      , POS_DEAD    , do_unimplemented, 0, 0),
+
+    ("cast"     , POS_SITTING , do_unimplemented, 1, 0),
+    ("cackle"   , POS_RESTING , do_action       , 0, 0),
+    ("check"    , POS_STANDING, do_not_here     , 1, 0),
+    ("chuckle"  , POS_RESTING , do_action       , 0, 0),
+    ("clap"     , POS_RESTING , do_action       , 0, 0),
+    ("close"    , POS_SITTING , do_unimplemented, 0, 0),
+    ("consider" , POS_RESTING , do_unimplemented, 0, 0),
+    ("comfort"  , POS_RESTING , do_action       , 0, 0),
+    ("comb"     , POS_RESTING , do_action       , 0, 0),
+    ("commands" , POS_DEAD    , do_commands     , 0, SCMD_COMMANDS),
+    ("cough"    , POS_RESTING , do_action       , 0, 0),
+    ("cringe"   , POS_RESTING , do_action       , 0, 0),
+    ("cry"      , POS_RESTING , do_action       , 0, 0),
+    ("cuddle"   , POS_RESTING , do_action       , 0, 0),
+    ("curse"    , POS_RESTING , do_action       , 0, 0),
+    ("curtsey"  , POS_STANDING, do_action       , 0, 0),
+
+    ("dance"    , POS_STANDING, do_action       , 0, 0),
+    ("date"     , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("daydream" , POS_SLEEPING, do_action       , 0, 0),
+    ("dc"       , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("deposit"  , POS_STANDING, do_not_here     , 1, 0),
+    ("diagnose" , POS_RESTING , do_unimplemented, 0, 0),
+    ("donate"   , POS_RESTING , do_unimplemented, 0, 0),
+    ("drink"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("drop"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("drool"    , POS_RESTING , do_action       , 0, 0),
+
+    ("eat"      , POS_RESTING , do_unimplemented, 0, 0),
+    ("echo"     , POS_SLEEPING, do_unimplemented, LVL_IMMORT, 0),
+    ("emote"    , POS_RESTING , do_emote        , 1, 0),
+    (":"        , POS_RESTING , do_emote        , 1, 0),
+    ("embrace"  , POS_STANDING, do_action       , 0, 0),
+    ("enter"    , POS_STANDING, do_unimplemented, 0, 0),
+    ("equipment", POS_SLEEPING, do_equipment    , 0, 0),
+    ("exits"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("examine"  , POS_SITTING , do_unimplemented, 0, 0),
+
+    ("force"    , POS_SLEEPING, do_unimplemented, LVL_GOD, 0),
+    ("fart"     , POS_RESTING , do_action       , 0, 0),
+    ("fill"     , POS_STANDING, do_unimplemented, 0, 0),
+    ("flee"     , POS_FIGHTING, do_unimplemented, 1, 0),
+    ("flip"     , POS_STANDING, do_action       , 0, 0),
+    ("flirt"    , POS_RESTING , do_action       , 0, 0),
+    ("follow"   , POS_RESTING , do_unimplemented, 0, 0),
+    ("fondle"   , POS_RESTING , do_action       , 0, 0),
+    ("freeze"   , POS_DEAD    , do_unimplemented, LVL_FREEZE, 0),
+    ("french"   , POS_RESTING , do_action       , 0, 0),
+    ("frown"    , POS_RESTING , do_action       , 0, 0),
+    ("fume"     , POS_RESTING , do_action       , 0, 0),
+
+    ("get"      , POS_RESTING , do_unimplemented, 0, 0),
+    ("gasp"     , POS_RESTING , do_action       , 0, 0),
+    ("gecho"    , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("give"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("giggle"   , POS_RESTING , do_action       , 0, 0),
+    ("glare"    , POS_RESTING , do_action       , 0, 0),
+    ("goto"     , POS_SLEEPING, do_goto         , LVL_IMMORT, 0),
+    ("gold"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("gossip"   , POS_SLEEPING, do_gen_comm     , 0, SCMD_GOSSIP),
+    ("group"    , POS_RESTING , do_unimplemented, 1, 0),
+    ("grab"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("grats"    , POS_SLEEPING, do_gen_comm     , 0, SCMD_GRATZ),
+    ("greet"    , POS_RESTING , do_action       , 0, 0),
+    ("grin"     , POS_RESTING , do_action       , 0, 0),
+    ("groan"    , POS_RESTING , do_action       , 0, 0),
+    ("grope"    , POS_RESTING , do_action       , 0, 0),
+    ("grovel"   , POS_RESTING , do_action       , 0, 0),
+    ("growl"    , POS_RESTING , do_action       , 0, 0),
+    ("gsay"     , POS_SLEEPING, do_unimplemented, 0, 0),
+    ("gtell"    , POS_SLEEPING, do_unimplemented, 0, 0),
+
+    ("help"     , POS_DEAD    , do_unimplemented, 0, 0),
+    ("handbook" , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("hiccup"   , POS_RESTING , do_action       , 0, 0),
+    ("hide"     , POS_RESTING , do_unimplemented, 1, 0),
+    ("hit"      , POS_FIGHTING, do_unimplemented, 0, 0),
+    ("hold"     , POS_RESTING , do_unimplemented, 1, 0),
+    ("holler"   , POS_RESTING , do_gen_comm     , 1, SCMD_HOLLER),
+    ("holylight", POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("hop"      , POS_RESTING , do_action       , 0, 0),
+    ("house"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("hug"      , POS_RESTING , do_action       , 0, 0),
+
+    ("inventory", POS_DEAD    , do_inventory    , 0, 0),
+    ("idea"     , POS_DEAD    , do_unimplemented, 0, 0),
+    ("imotd"    , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("immlist"  , POS_DEAD    , do_unimplemented, 0, 0),
+    ("info"     , POS_SLEEPING, do_unimplemented, 0, 0),
+    ("insult"   , POS_RESTING , do_action       , 0, 0),
+    ("invis"    , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+
+    ("junk"     , POS_RESTING , do_unimplemented, 0, 0),
+
+    ("kill"     , POS_FIGHTING, do_unimplemented, 0, 0),
+    ("kick"     , POS_FIGHTING, do_unimplemented, 1, 0),
+    ("kiss"     , POS_RESTING , do_action       , 0, 0),
+
+    ("look"     , POS_RESTING , do_look         , 0, 0),
+    ("laugh"    , POS_RESTING , do_action       , 0, 0),
+    ("last"     , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("leave"    , POS_STANDING, do_unimplemented, 0, 0),
+    ("levels"   , POS_DEAD    , do_unimplemented, 0, 0),
+    ("list"     , POS_STANDING, do_not_here     , 0, 0),
+    ("lick"     , POS_RESTING , do_action       , 0, 0),
+    ("lock"     , POS_SITTING , do_unimplemented, 0, 0),
+    ("load"     , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("love"     , POS_RESTING , do_action       , 0, 0),
+
+    ("moan"     , POS_RESTING , do_action       , 0, 0),
+    ("motd"     , POS_DEAD    , do_unimplemented, 0, 0),
+    ("mail"     , POS_STANDING, do_not_here     , 1, 0),
+    ("massage"  , POS_RESTING , do_action       , 0, 0),
+    ("mute"     , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("murder"   , POS_FIGHTING, do_unimplemented, 0, 0),
+    ("metrics"  , POS_DEAD    , do_metrics      , LVL_GOD, 0),
+
+    ("news"     , POS_SLEEPING, do_unimplemented, 0, 0),
+    ("nibble"   , POS_RESTING , do_action       , 0, 0),
+    ("nod"      , POS_RESTING , do_action       , 0, 0),
+    ("nogossip" , POS_DEAD    , do_unimplemented, 0, 0),
+    ("nograts"  , POS_DEAD    , do_unimplemented, 0, 0),
+    ("nohassle" , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("noshout"  , POS_SLEEPING, do_unimplemented, 1, 0),
+    ("nosummon" , POS_DEAD    , do_unimplemented, 1, 0),
+    ("notell"   , POS_DEAD    , do_unimplemented, 1, 0),
+    ("nowiz"    , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+
+    ("order"    , POS_RESTING , do_unimplemented, 1, 0),
+    ("offer"    , POS_STANDING, do_not_here     , 1, 0),
+    ("open"     , POS_SITTING , do_unimplemented, 0, 0),
+
+    ("put"      , POS_RESTING , do_unimplemented, 0, 0),
+    ("pat"      , POS_RESTING , do_action       , 0, 0),
+    ("page"     , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("pardon"   , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("peer"     , POS_RESTING , do_action       , 0, 0),
+    ("pick"     , POS_STANDING, do_unimplemented, 1, 0),
+    ("point"    , POS_RESTING , do_action       , 0, 0),
+    ("poke"     , POS_RESTING , do_action       , 0, 0),
+    ("ponder"   , POS_RESTING , do_action       , 0, 0),
+    ("pour"     , POS_STANDING, do_unimplemented, 0, 0),
+    ("pout"     , POS_RESTING , do_action       , 0, 0),
+    ("prompt"   , POS_DEAD    , do_unimplemented, 0, 0),
+    ("practice" , POS_RESTING , do_unimplemented, 1, 0),
+    ("pray"     , POS_SITTING , do_action       , 0, 0),
+    ("puke"     , POS_RESTING , do_action       , 0, 0),
+    ("punch"    , POS_RESTING , do_action       , 0, 0),
+    ("purr"     , POS_RESTING , do_action       , 0, 0),
+    ("purge"    , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+
+    ("quaff"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("qui"      , POS_DEAD    , do_quit         , 0, SCMD_QUI),
+    ("quit"     , POS_DEAD    , do_quit         , 0, SCMD_QUIT),
+
+    ("reply"    , POS_SLEEPING, do_unimplemented, 0, 0),
+    ("rest"     , POS_RESTING , do_rest         , 0, 0),
+    ("read"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("reload"   , POS_DEAD    , do_reload       , LVL_IMPL, 0),
+    ("recite"   , POS_RESTING , do_unimplemented, 0, 0),
+    ("receive"  , POS_STANDING, do_not_here     , 1, 0),
+    ("remove"   , POS_RESTING , do_unimplemented, 0, 0),
+    ("rent"     , POS_STANDING, do_not_here     , 1, 0),
+    ("report"   , POS_RESTING , do_unimplemented, 0, 0),
+    ("reroll"   , POS_DEAD    , do_unimplemented, LVL_GRGOD, 0),
+    ("rescue"   , POS_FIGHTING, do_unimplemented, 1, 0),
+    ("restore"  , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("return"   , POS_DEAD    , do_unimplemented, 0, 0),
+    ("roll"     , POS_RESTING , do_action       , 0, 0),
+    ("ruffle"   , POS_STANDING, do_action       , 0, 0),
+
+    ("say"      , POS_RESTING , do_say          , 0, 0),
+    ("'"        , POS_RESTING , do_say          , 0, 0),
+    ("save"     , POS_SLEEPING, do_unimplemented, 0, 0),
+    ("score"    , POS_DEAD    , do_score        , 0, 0),
+    ("scream"   , POS_RESTING , do_action       , 0, 0),
+    ("scriptstat", POS_DEAD   , do_scriptstat   , LVL_GOD, 0),
+    ("sell"     , POS_STANDING, do_not_here     , 0, 0),
+    ("send"     , POS_SLEEPING, do_unimplemented, LVL_GOD, 0),
+    ("set"      , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("shout"    , POS_RESTING , do_gen_comm     , 0, SCMD_SHOUT),
+    ("shake"    , POS_RESTING , do_action       , 0, 0),
+    ("shiver"   , POS_RESTING , do_action       , 0, 0),
+    ("show"     , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("shrug"    , POS_RESTING , do_action       , 0, 0),
+    ("shutdown" , POS_DEAD    , do_unimplemented, LVL_IMPL, 0),
+    ("sigh"     , POS_RESTING , do_action       , 0, 0),
+    ("sing"     , POS_RESTING , do_action       , 0, 0),
+    ("sip"      , POS_RESTING , do_unimplemented, 0, 0),
+    ("sit"      , POS_RESTING , do_sit          , 0, 0),
+    ("skillset" , POS_SLEEPING, do_unimplemented, LVL_GRGOD, 0),
+    ("sleep"    , POS_SLEEPING, do_sleep        , 0, 0),
+    ("slap"     , POS_RESTING , do_action       , 0, 0),
+    ("smile"    , POS_RESTING , do_action       , 0, 0),
+    ("smirk"    , POS_RESTING , do_action       , 0, 0),
+    ("snicker"  , POS_RESTING , do_action       , 0, 0),
+    ("snap"     , POS_RESTING , do_action       , 0, 0),
+    ("snarl"    , POS_RESTING , do_action       , 0, 0),
+    ("sneeze"   , POS_RESTING , do_action       , 0, 0),
+    ("sneak"    , POS_STANDING, do_unimplemented, 1, 0),
+    ("sniff"    , POS_RESTING , do_action       , 0, 0),
+    ("snore"    , POS_SLEEPING, do_action       , 0, 0),
+    ("snoop"    , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("snuggle"  , POS_RESTING , do_action       , 0, 0),
+    ("socials"  , POS_DEAD    , do_commands     , 0, SCMD_SOCIALS),
+    ("split"    , POS_SITTING , do_unimplemented, 1, 0),
+    ("spank"    , POS_RESTING , do_action       , 0, 0),
+    ("spit"     , POS_STANDING, do_action       , 0, 0),
+    ("squeeze"  , POS_RESTING , do_action       , 0, 0),
+    ("stand"    , POS_RESTING , do_stand        , 0, 0),
+    ("stare"    , POS_RESTING , do_action       , 0, 0),
+    ("stat"     , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("steal"    , POS_STANDING, do_unimplemented, 1, 0),
+    ("steam"    , POS_RESTING , do_action       , 0, 0),
+    ("stroke"   , POS_RESTING , do_action       , 0, 0),
+    ("strut"    , POS_STANDING, do_action       , 0, 0),
+    ("sulk"     , POS_RESTING , do_action       , 0, 0),
+    ("switch"   , POS_DEAD    , do_unimplemented, LVL_GRGOD, 0),
+    ("syslog"   , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+
+    ("tell"     , POS_DEAD    , do_unimplemented, 0, 0),
+    ("tackle"   , POS_RESTING , do_action       , 0, 0),
+    ("take"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("tango"    , POS_STANDING, do_action       , 0, 0),
+    ("taunt"    , POS_RESTING , do_action       , 0, 0),
+    ("taste"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("teleport" , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("thank"    , POS_RESTING , do_action       , 0, 0),
+    ("think"    , POS_RESTING , do_action       , 0, 0),
+    ("thaw"     , POS_DEAD    , do_unimplemented, LVL_FREEZE, 0),
+    ("title"    , POS_DEAD    , do_unimplemented, 0, 0),
+    ("tickle"   , POS_RESTING , do_action       , 0, 0),
+    ("time"     , POS_DEAD    , do_unimplemented, 0, 0),
+    ("toggle"   , POS_DEAD    , do_unimplemented, 0, 0),
+    ("track"    , POS_STANDING, do_unimplemented, 0, 0),
+    ("transfer" , POS_SLEEPING, do_unimplemented, LVL_GOD, 0),
+    ("twiddle"  , POS_RESTING , do_action       , 0, 0),
+    ("typo"     , POS_DEAD    , do_unimplemented, 0, 0),
+
+    ("unlock"   , POS_SITTING , do_unimplemented, 0, 0),
+    ("ungroup"  , POS_DEAD    , do_unimplemented, 0, 0),
+    ("unban"    , POS_DEAD    , do_unimplemented, LVL_GRGOD, 0),
+    ("unaffect" , POS_DEAD    , do_unimplemented, LVL_GOD, 0),
+    ("uptime"   , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("use"      , POS_SITTING , do_unimplemented, 1, 0),
+    ("users"    , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+
+    ("value"    , POS_STANDING, do_not_here     , 0, 0),
+    ("version"  , POS_DEAD    , do_unimplemented, 0, 0),
+    ("visible"  , POS_RESTING , do_unimplemented, 1, 0),
+    ("vnum"     , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("vstat"    , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+
+    ("wake"     , POS_SLEEPING, do_wake         , 0, 0),
+    ("wave"     , POS_RESTING , do_action       , 0, 0),
+    ("wear"     , POS_RESTING , do_unimplemented, 0, 0),
+    ("weather"  , POS_RESTING , do_unimplemented, 0, 0),
+    ("who"      , POS_DEAD    , do_who          , 0, 0),
+    ("whoami"   , POS_DEAD    , do_unimplemented, 0, 0),
+    ("where"    , POS_RESTING , do_unimplemented, 1, 0),
+    ("whisper"  , POS_RESTING , do_unimplemented, 0, 0),
+    ("whine"    , POS_RESTING , do_action       , 0, 0),
+    ("whistle"  , POS_RESTING , do_action       , 0, 0),
+    ("wield"    , POS_RESTING , do_unimplemented, 0, 0),
+    ("wiggle"   , POS_STANDING, do_action       , 0, 0),
+    ("wimpy"    , POS_DEAD    , do_unimplemented, 0, 0),
+    ("wink"     , POS_RESTING , do_action       , 0, 0),
+    ("withdraw" , POS_STANDING, do_not_here     , 1, 0),
+    ("wiznet"   , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    (";"        , POS_DEAD    , do_unimplemented, LVL_IMMORT, 0),
+    ("wizhelp"  , POS_SLEEPING, do_commands     , LVL_IMMORT, SCMD_WIZHELP),
+    ("wizlist"  , POS_DEAD    , do_unimplemented, 0, 0),
+    ("wizlock"  , POS_DEAD    , do_unimplemented, LVL_IMPL, 0),
+    ("worship"  , POS_RESTING , do_action       , 0, 0),
+    ("write"    , POS_STANDING, do_unimplemented, 1, 0),
+
+    ("yawn"     , POS_RESTING , do_action       , 0, 0),
+    ("yodel"    , POS_RESTING , do_action       , 0, 0),
+
+    ("zreset"   , POS_DEAD    , do_zreset       , LVL_GRGOD, 0),
+)]
+
+
+def build_command_table(commands, level):
+    """
+    Map every prefix of every command usable at this level to the first
+    such command, in table order, that it abbreviates.
+    """
+    table = {}
+    for info in commands:
+        if info.minimum_level <= level:
+            name = info.command
+            for end in range(1, len(name) + 1):
+                table.setdefault(name[:end], info)
+    return table
+
+
+def build_command_tables(commands):
+    """
+    One prefix table per level, 0 to LVL_IMPL. Levels that can use the
+    same commands share a table.
+    """
+    thresholds = sorted({info.minimum_level for info in commands} | {0})
+    tables = []
+    table = None
+    for level in range(LVL_IMPL + 1):
+        if table is None or level in thresholds:
+            table = build_command_table(commands, level)
+        tables.append(table)
+    return tables
+
+
+command_tables = build_command_tables(cmd_info)
+
+
+def find_command(arg, level):
+    """
+    The CommandInfo that arg (lower case) abbreviates for a character of
+    this level, or None.
+    """
+    return command_tables[max(0, min(level, LVL_IMPL))].get(arg)
+
+
+def command_interpreter(ch, argument):
+    """
+    Parse and run one line typed by ch. Returns the name of the command
+    that matched ("huh" if none did, None for a blank line).
+    """
+    argument = argument.lstrip()
+    if not argument:
+        return None
+    # Non-letter commands (' : ;) need no space before their argument.
+    if not argument[0].isalpha():
+        arg = argument[0]
+        line = argument[1:]
+    else:
+        # Any whitespace ends the command word, as with half_chop().
+        parts = argument.split(None, 1)
+        arg = parts[0].lower()
+        line = parts[1] if len(parts) > 1 else ""
+
+    info = find_command(arg, ch.level)
+    if info is None:
+        send_to_char(ch, "Huh?!?\r\n")
+        return "huh"
+    if ch.position < info.minimum_position:
+        send_to_char(ch, POSITION_MESSAGES[ch.position])
+    else:
+        info.command_pointer(ch, line.strip(), info, info.subcmd)
+    return info.command
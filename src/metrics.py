@@ -0,0 +1,268 @@
+"""
+Server metrics: latency histograms, counters and gauges, shown by the
+'metrics' admin command and written out as a Prometheus text file.
+
+Histograms are log-linear in the style of HdrHistogram. Values below 32
+get a bucket each, and above that every power of two is split into 16
+buckets, so any recorded value is known to within 1/16 (about 6%).
+Recording is a couple of integer operations and one list increment.
+Durations are recorded in integer nanoseconds (time.perf_counter_ns()).
+
+Nothing is recorded until enable() is called. Call sites check the
+module-level 'enabled' flag, and the counters and gauges are read from
+numbers the server keeps anyway, so a server run without --metrics pays
+one flag test per pulse or zone reset and nothing else. Commands are timed
+through a separate interpreter entry point, and only in one pulse of
+every COMMAND_SAMPLE: reading the clock twice costs about as much as
+running a cheap command, and the other pulses then pay nothing at all.
+Counts and sums of sampled histograms are scaled back up when exported.
+"""
+import os
+
+from events import RL_SEC
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS        # values below this are exact
+SUB_HALF = SUB_COUNT >> 1
+NUM_BUCKETS = SUB_HALF * 64      # enough for any 64-bit value
+
+# Where the Prometheus file goes and how often (pulses) it is rewritten.
+METRICS_FILE = "data/metrics.prom"
+METRICS_INTERVAL = 15 * RL_SEC
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Commands are timed in one pulse out of this many.
+COMMAND_SAMPLE = 8
+
+enabled = False
+
+
+def bucket_value(index):
+    """
+    The highest value that lands in bucket index.
+    """
+    if index < SUB_COUNT:
+        return index
+    shift = (index >> (SUB_BITS - 1)) - 1
+    mantissa = (index & (SUB_HALF - 1)) + SUB_HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """
+    Log-linear histogram of non-negative integers.
+    """
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.total = 0
+
+    def record(self, value):
+        # Only the bucket and the sum are kept up to date; everything
+        # else is worked out from the buckets when someone asks.
+        if value < SUB_COUNT:
+            self.counts[value] += 1
+        else:
+            shift = value.bit_length() - SUB_BITS
+            self.counts[(shift << (SUB_BITS - 1)) + (value >> shift)] += 1
+        self.total += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def max(self):
+        """
+        The top of the highest bucket in use.
+        """
+        for index in range(NUM_BUCKETS - 1, -1, -1):
+            if self.counts[index]:
+                return bucket_value(index)
+        return 0
+
+    def quantile(self, q):
+        """
+        The value at quantile q (0..1), to within one bucket.
+        """
+        count = self.count
+        if not count:
+            return 0
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return bucket_value(index)
+        return 0
+
+    def reset(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.total = 0
+
+
+class HistogramFamily(dict):
+    """
+    Histograms of one metric told apart by a single label, e.g. one per
+    command: family["look"].record(...). Missing ones are made on use.
+    """
+    def __init__(self, name, help, label, unit_scale, sample):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.label = label
+        self.unit_scale = unit_scale
+        self.sample = sample
+
+    def __missing__(self, value):
+        histogram = self[value] = Histogram()
+        return histogram
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}   # name -> (help, Histogram, unit_scale)
+        self.families = {}     # name -> HistogramFamily
+        self.values = {}       # name -> (kind, help, func)
+
+    def histogram(self, name, help, unit_scale=1e-9):
+        """
+        A histogram; exported values are multiplied by unit_scale
+        (nanoseconds to seconds by default).
+        """
+        histogram = Histogram()
+        self.histograms[name] = (help, histogram, unit_scale)
+        return histogram
+
+    def family(self, name, help, label, unit_scale=1e-9, sample=1):
+        """
+        A family of histograms by label. sample says one event in how many
+        is recorded.
+        """
+        family = self.families[name] = HistogramFamily(name, help, label,
+                                                       unit_scale, sample)
+        return family
+
+    def counter(self, name, help, func):
+        """
+        A counter read from func() at export time.
+        """
+        self.values[name] = ("counter", help, func)
+
+    def gauge(self, name, help, func):
+        self.values[name] = ("gauge", help, func)
+
+    def all_histograms(self):
+        """
+        (name, labels, Histogram, unit_scale, sample) for every histogram.
+        """
+        for name, (help, histogram, scale) in self.histograms.items():
+            yield name, "", histogram, scale, 1
+        for name, family in self.families.items():
+            for value, histogram in sorted(family.items(), key=lambda kv: str(kv[0])):
+                yield (name, f'{family.label}="{value}"', histogram,
+                       family.unit_scale, family.sample)
+
+    def help_of(self, name):
+        if name in self.histograms:
+            return self.histograms[name][0]
+        return self.families[name].help
+
+    def prometheus_text(self):
+        """
+        Everything in Prometheus text exposition format. Histograms go out
+        as summaries (quantiles, sum, count).
+        """
+        lines = []
+        typed = set()
+        for name, labels, histogram, scale, sample in self.all_histograms():
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {self.help_of(name)}")
+                lines.append(f"# TYPE {name} summary")
+            sep = "," if labels else ""
+            for q in QUANTILES:
+                lines.append(f'{name}{{{labels}{sep}quantile="{q}"}} '
+                             f'{histogram.quantile(q) * scale:.6g}')
+            braces = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{braces} "
+                         f"{histogram.total * scale * sample:.6g}")
+            lines.append(f"{name}_count{braces} {histogram.count * sample}")
+        for name, (kind, help, func) in self.values.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {func()}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def report(self):
+        """
+        The admin view: one line per histogram, then the plain values.
+        """
+        lines = [f"{'Metric (ms)':<48} {'Count':>8} {'p50':>9} {'p99':>9} "
+                 f"{'p99.9':>9} {'Max':>9}"]
+        for name, labels, histogram, scale, sample in self.all_histograms():
+            count = histogram.count * sample
+            if not count:
+                continue
+            label = name.removeprefix("circlemud_")
+            if labels:
+                label = f"{label}{{{labels}}}"
+            ms = scale * 1000 if scale != 1 else 1
+            lines.append(f"{label:<48} {count:>8} "
+                         f"{histogram.quantile(0.5) * ms:>9.3f} "
+                         f"{histogram.quantile(0.99) * ms:>9.3f} "
+                         f"{histogram.quantile(0.999) * ms:>9.3f} "
+                         f"{histogram.max * ms:>9.3f}")
+        for name, (kind, help, func) in self.values.items():
+            lines.append(f"{name.removeprefix('circlemud_'):<48} {func():>8}")
+        return lines
+
+
+registry = Registry()
+
+pulse_duration = registry.histogram(
+    "circlemud_pulse_duration_seconds", "Time spent on the work of one pulse.")
+command_duration = registry.family(
+    "circlemud_command_duration_seconds", "Time to execute one command.",
+    "command", sample=COMMAND_SAMPLE)
+zone_reset_duration = registry.family(
+    "circlemud_zone_reset_duration_seconds", "Time to reset one zone.", "zone")
+
+
+def watch_server(server):
+    """
+    Export the connection server's own counters.
+    """
+    registry.counter("circlemud_bytes_in_total", "Bytes read from clients.",
+                     lambda: server.bytes_in)
+    registry.counter("circlemud_bytes_out_total", "Bytes sent to clients.",
+                     lambda: server.bytes_out)
+    registry.counter("circlemud_send_calls_total", "send() calls made.",
+                     lambda: server.sends)
+    registry.gauge("circlemud_descriptors", "Connected descriptors.",
+                   lambda: len(server.descriptors))
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def write_event(path):
+    """
+    Timer callback: rewrite the Prometheus file.
+    """
+    try:
+        registry.write(path)
+    except OSError as e:
+        print(f"SYSERR: Writing metrics to {path}: {e}")
+    return METRICS_INTERVAL
@@ -0,0 +1,670 @@
+"""
+Rough Python counterpart of the descriptor handling in CircleMUD's comm.c.
+
+One listening socket and every client socket are multiplexed through the
+selectors module, which picks epoll/kqueue where the platform has them.
+Nothing in here ever blocks on a single client, so one process can carry
+thousands of descriptors.
+
+Output is never sent as it is produced. Game code queues text with
+write_to_output() during a pulse, and flush_output() sends each
+descriptor's queue as a single non-blocking send() once per pulse. Text a
+slow client has not taken yet stays queued up to a high-water mark; past
+that the descriptor's new output is dropped or the client is cut off.
+
+Input goes the other way through a per-descriptor pipeline: telnet
+commands are stripped, bytes are decoded incrementally (so a multibyte
+character split across two recv() calls survives), and the text is cut
+into lines on CR/LF. Complete lines wait on a bounded queue. The game
+loop takes at most one per descriptor per pulse, and none while that
+descriptor's token bucket is empty. A descriptor whose queue is full is
+not read from until it drains, so a flooding client only fills its own
+kernel buffers.
+
+Every connection is offered MCCP2. A client that accepts gets its own zlib
+stream: each pulse's output is compressed and sync-flushed as one block,
+so the client can show everything sent so far.
+
+Capacity target (one core, default settings):
+    - at least 2,000 idle connections
+    - at least 500 connections actively echoing input
+Each connection costs one file descriptor, so the process needs an open
+file limit (ulimit -n) comfortably above the expected player count.
+"""
+import codecs
+import errno
+import selectors
+import socket
+import time
+import zlib
+
+from collections import deque
+from itertools import repeat
+from operator import attrgetter
+
+from telnet import MCCP2_START, TELNET_GREETING, TelnetOptions, TelnetParser
+
+# Backlog passed to listen(). The kernel clamps this to somaxconn.
+# 15 (the old value) overflows as soon as a crowd reconnects after a reboot.
+LISTEN_BACKLOG = 512
+
+# Bytes requested per recv() call.
+RECV_SIZE = 4096
+
+# Unsent output allowed per descriptor before OVERFLOW_POLICY applies.
+OUTPUT_HIGH_WATER = 64 * 1024
+
+# What to do with a client that stops reading:
+#   "drop"        discard its new output (it sees **OVERFLOW**)
+#   "disconnect"  close the connection
+OVERFLOW_POLICY = "drop"
+
+OVERFLOW_NOTICE = b"**OVERFLOW**\r\n"
+
+# Longest command line, as in structs.h; longer lines are truncated.
+MAX_INPUT_LENGTH = 256
+
+# Text without a line end is cut off as an over-long line past this.
+MAX_RAW_INPUT_LENGTH = 512
+
+# Complete lines queued per descriptor before reading from it stops.
+MAX_INPUT_QUEUE = 64
+
+# Raw bytes read from one descriptor per pulse; past this it is not read
+# again until the next pulse. Far above anything typed, but it keeps one
+# client streaming garbage from eating the time between pulses.
+MAX_INPUT_PER_PULSE = 8 * RECV_SIZE
+
+# Flood control: commands per second a descriptor may sustain, and how
+# many it may bank for a burst (speedwalking, a short paste).
+CMD_RATE = 5.0
+CMD_BURST = 20
+
+# MCCP2 compressor settings. A 8 KB window with memLevel 6 costs about
+# 48 KB per player (the zlib defaults cost 256 KB) and loses little on
+# MUD text, whose repeats are short-range.
+MCCP_LEVEL = 6
+MCCP_WBITS = 13
+MCCP_MEMLEVEL = 6
+
+
+_OUTPUT = attrgetter('output')
+_PENDING = attrgetter('pending')
+_CLOSED = attrgetter('closed')
+_FEED = attrgetter('feed')
+
+
+def append_to_all(queues, data):
+    """
+    queue.append(data) for every list in queues, looping in C.
+    """
+    deque(map(list.append, queues, repeat(data)), maxlen=0)
+
+
+def set_all(objects, name, value):
+    deque(map(setattr, objects, repeat(name), repeat(value)), maxlen=0)
+
+
+class FeedPart:
+    __slots__ = ('text', 'listeners')
+
+    def __init__(self, listeners):
+        self.text = bytearray()
+        self.listeners = listeners
+
+
+class Feed:
+    """
+    Output shared by the players in one room for one pulse. A message to
+    the room is appended once to each growing part of the feed, and every
+    listener's output queue holds its part's bytearray, which take_output()
+    joins like any other chunk. The first message of a pulse gives all the
+    players in the room one part in a single pass, so a message costs the
+    same however many are listening.
+
+    A listener stops listening when it gets output of its own, is left
+    out of a message (mostly its own doings) or leaves the room: its copy
+    of the part is frozen where it is, as bytes, so each client sees its
+    text in the order it was queued. The next message gives everyone who
+    stopped (or came in) meanwhile a new part.
+
+    Taking any listener's output closes the feed; the next message to the
+    room starts a new one.
+    """
+    __slots__ = ('parts', 'listening', 'waiting', 'closed')
+
+    def __init__(self):
+        self.parts = {}        # growing parts: {FeedPart: None}
+        self.listening = {}    # descriptor -> FeedPart
+        self.waiting = set()   # in the room, not listening
+        self.closed = False
+
+    def start(self, descriptors):
+        part = FeedPart(len(descriptors))
+        self.parts[part] = None
+        self.listening.update(dict.fromkeys(descriptors, part))
+        type(descriptors[0]).subscribe(descriptors, self, part.text)
+
+    def send(self, data, skip=None):
+        """
+        Add data for everyone in the room but the descriptor skip.
+        """
+        waiting = self.waiting
+        if waiting:
+            held = skip in waiting
+            if held:
+                waiting.discard(skip)
+            if waiting:
+                self.start(list(waiting))
+                waiting.clear()
+            if held:
+                waiting.add(skip)
+        if skip is not None:
+            self.interrupt(skip)
+        for part in self.parts:
+            part.text += data
+
+    def stop(self, d):
+        """
+        Freeze d's copy of its part. Returns whether it was listening.
+        """
+        part = self.listening.pop(d, None)
+        if part is None:
+            return False
+        text = part.text
+        output = d.output
+        for i in range(len(output) - 1, -1, -1):
+            if output[i] is text:
+                output[i] = bytes(text)
+                break
+        part.listeners -= 1
+        if not part.listeners:
+            del self.parts[part]
+        return True
+
+    def interrupt(self, d):
+        if not self.closed and self.stop(d):
+            self.waiting.add(d)
+
+    def enter(self, d):
+        if not self.closed:
+            self.waiting.add(d)
+
+    def leave(self, d):
+        if not self.closed:
+            self.waiting.discard(d)
+            self.stop(d)
+
+
+def send_to_char(ch, text):
+    """
+    Queue text for a character's player; mobiles have no descriptor.
+    """
+    if ch.desc is not None:
+        ch.desc.write_to_output(text)
+
+
+class Descriptor:
+    """
+    Python equivalent of 'struct descriptor_data': one per connected client.
+    """
+    def __init__(self, desc_num, sock, addr, server):
+        self.desc_num = desc_num
+        self.sock = sock
+        self.addr = addr
+        self.host = addr[0] if addr else ""
+        self.login_time = time.monotonic()
+        self.output = []            # chunks queued this pulse
+        self.output_size = 0
+        self.pending = bytearray()  # flushed bytes the socket would not take
+        self.raw_output = b""       # wire bytes that go ahead of output
+        self.compressor = None      # zlib stream while MCCP2 is on
+        self.overflowed = False
+        self.closed = False
+        self.feed = None            # the room Feed whose text is queued, if any
+        self.server = server
+        self.character = None       # the CharData playing through this
+        self.options = TelnetOptions(self)
+        self.telnet = TelnetParser(self.options.command, self.options.subneg)
+        self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self.inbuf = ""             # text after the last complete line
+        self.skip_lf = False        # last chunk ended in CR
+        self.discarding = False     # dropping the rest of an over-long line
+        self.input = deque()        # complete lines, oldest first
+        self.paused = False         # not being read for now
+        self.input_pulse = 0        # pulse that pulse_bytes counts for
+        self.pulse_bytes = 0
+        self.tokens = server.cmd_burst
+        self.last_refill = self.login_time
+
+    def write_to_output(self, data):
+        """
+        Queue text (str or bytes) for the end-of-pulse flush.
+        """
+        if self.closed:
+            return
+        if self.feed is not None:
+            self.feed.interrupt(self)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        server = self.server
+        if len(self.pending) + self.output_size + len(data) > server.output_high_water:
+            if server.overflow_policy == "disconnect":
+                self.close()
+                return
+            self.overflowed = True
+            return
+        if not self.output_size and not self.pending:
+            server.outbox.add(self)
+        self.output.append(data)
+        self.output_size += len(data)
+
+    @staticmethod
+    def write_to_many(descriptors, data):
+        """
+        write_to_output(data) for a list of descriptors on one server, the
+        same bytes object appended to every queue in one C loop. Room
+        feed listeners are interrupted first. Closed descriptors and ones
+        still holding unsent bytes take the checked path; for the rest the
+        bytes count against the high-water mark once they are flushed.
+        """
+        if any(map(_FEED, descriptors)):
+            for d in descriptors:
+                if d.feed is not None:
+                    d.feed.interrupt(d)
+        if any(map(_PENDING, descriptors)) or any(map(_CLOSED, descriptors)):
+            checked = [d for d in descriptors if d.pending or d.closed]
+            descriptors = [d for d in descriptors if not (d.pending or d.closed)]
+            for d in checked:
+                d.write_to_output(data)
+            if not descriptors:
+                return
+        append_to_all(map(_OUTPUT, descriptors), data)
+        descriptors[0].server.outbox.update(descriptors)
+
+    @staticmethod
+    def subscribe(descriptors, feed, text):
+        """
+        Queue a feed's shared text on every descriptor in a list: see Feed.
+        """
+        append_to_all(map(_OUTPUT, descriptors), text)
+        set_all(descriptors, 'feed', feed)
+        descriptors[0].server.outbox.update(descriptors)
+
+    def start_compression(self):
+        """
+        Turn MCCP2 on: output queued so far and the start sequence go out
+        as they are, everything after them through the compressor.
+        """
+        if self.feed is not None:
+            self.feed.interrupt(self)
+        self.raw_output += b"".join(self.output) + MCCP2_START
+        self.output = []
+        self.output_size += len(MCCP2_START)
+        self.compressor = zlib.compressobj(MCCP_LEVEL, zlib.DEFLATED,
+                                           MCCP_WBITS, MCCP_MEMLEVEL)
+        self.server.outbox.add(self)
+
+    def stop_compression(self):
+        """
+        Turn MCCP2 off, ending the zlib stream after what is queued.
+        """
+        compressor = self.compressor
+        if compressor is None:
+            return
+        if self.feed is not None:
+            self.feed.interrupt(self)
+        self.raw_output += (compressor.compress(b"".join(self.output))
+                            + compressor.flush(zlib.Z_FINISH))
+        self.output = []
+        self.compressor = None
+        self.server.outbox.add(self)
+
+    def take_output(self):
+        """
+        The bytes to put on the wire for everything queued since the last
+        flush, compressed if MCCP2 is on.
+        """
+        if self.overflowed and (len(self.pending) + self.output_size
+                                + len(OVERFLOW_NOTICE)
+                                <= self.server.output_high_water):
+            self.output.append(OVERFLOW_NOTICE)
+            self.overflowed = False
+        output = self.output
+        feed = self.feed
+        if feed is None:
+            data = output[0] if len(output) == 1 else b"".join(output)
+        else:
+            feed.closed = True
+            self.feed = None
+            data = b"".join(output)
+            # Room text is not counted as it is queued; a client that has
+            # stopped reading loses this pulse's output here instead.
+            if (len(self.pending) + len(data) > self.server.output_high_water
+                    and self.server.overflow_policy == "drop"):
+                data = b""
+                self.overflowed = True
+        if self.compressor is not None and data:
+            data = (self.compressor.compress(data)
+                    + self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        if self.raw_output:
+            data = self.raw_output + data
+            self.raw_output = b""
+        self.output = []
+        self.output_size = 0
+        return data
+
+    def add_input(self, data):
+        """
+        Run raw bytes from the socket through the input pipeline.
+        """
+        text = self.decoder.decode(self.telnet.feed(data))
+        if not text:
+            return
+        if self.skip_lf and text[0] == '\n':
+            text = text[1:]
+        self.skip_lf = text.endswith('\r')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if '\0' in text:
+            text = text.replace('\0', '')
+        self.inbuf += text
+        self.split_lines()
+
+    def split_lines(self):
+        """
+        Move complete lines from inbuf to the input queue, stopping when
+        the queue is full. What is left waits in inbuf.
+        """
+        buf = self.inbuf
+        queue = self.input
+        start = 0
+        while len(queue) < MAX_INPUT_QUEUE:
+            nl = buf.find('\n', start)
+            if nl < 0:
+                break
+            line = buf[start:nl]
+            start = nl + 1
+            if self.discarding:
+                self.discarding = False
+                continue
+            queue.append(self.truncate(line))
+        buf = buf[start:]
+        if '\n' not in buf:
+            if self.discarding:
+                buf = ""
+            elif len(buf) > MAX_RAW_INPUT_LENGTH and len(queue) < MAX_INPUT_QUEUE:
+                queue.append(self.truncate(buf))
+                self.discarding = True
+                buf = ""
+        self.inbuf = buf
+
+    def truncate(self, line):
+        if len(line) < MAX_INPUT_LENGTH:
+            return line
+        line = line[:MAX_INPUT_LENGTH - 1]
+        self.write_to_output(f"Line too long.  Truncated to:\r\n{line}\r\n")
+        return line
+
+    def get_command(self, now):
+        """
+        The next queued line, or None if there is none or the flood
+        control bucket is empty.
+        """
+        if not self.input:
+            return None
+        server = self.server
+        tokens = self.tokens + (now - self.last_refill) * server.cmd_rate
+        self.last_refill = now
+        if tokens > server.cmd_burst:
+            tokens = server.cmd_burst
+        if tokens < 1:
+            self.tokens = tokens
+            return None
+        self.tokens = tokens - 1
+        return self.input.popleft()
+
+    def close(self):
+        """
+        Mark the descriptor for closing at the end of the current poll.
+        """
+        self.closed = True
+        self.server.dirty.add(self)
+
+    def __repr__(self):
+        return f"<Descriptor #{self.desc_num} {self.addr}>"
+
+
+class ConnectionServer:
+    """
+    Event-driven listener. Callers hook in through two callbacks:
+
+        on_connect(d)         a new descriptor was accepted
+        on_disconnect(d)      d is gone (closed by either side)
+
+    poll() runs a single pass of input handling and returns, so the game
+    loop stays in charge of timing. Once per pulse the loop calls
+    process_commands() to run queued input and flush_output() to send.
+    """
+    def __init__(self, host, port, backlog=LISTEN_BACKLOG,
+                 on_connect=None, on_disconnect=None,
+                 output_high_water=OUTPUT_HIGH_WATER,
+                 overflow_policy=OVERFLOW_POLICY,
+                 cmd_rate=CMD_RATE, cmd_burst=CMD_BURST):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.output_high_water = output_high_water
+        self.overflow_policy = overflow_policy
+        self.cmd_rate = cmd_rate
+        self.cmd_burst = cmd_burst
+        self.selector = selectors.DefaultSelector()
+        self.listener = None
+        self.descriptors = {}  # fileno -> Descriptor
+        self.dirty = set()     # descriptors to close at the end of the pass
+        self.outbox = set()    # descriptors with queued or pending output
+        self.waiting = set()   # descriptors with queued input
+        self.throttled = set() # paused until the next pulse
+        self.pulse = 0         # process_commands() calls so far
+        self.last_desc = 0
+        self.sends = 0         # send() calls made, for benchmarks and stats
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def start(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(self.backlog)
+        listener.setblocking(False)
+        self.listener = listener
+        self.port = listener.getsockname()[1]
+        self.selector.register(listener, selectors.EVENT_READ, None)
+
+    def poll(self, timeout=None):
+        """
+        Wait up to timeout seconds for input and handle all of it.
+        """
+        for key, mask in self.selector.select(timeout):
+            d = key.data
+            if d is None:
+                self.accept_new()
+            else:
+                self.process_input(d)
+        self.close_dirty()
+
+    def accept_new(self):
+        # Drain the accept queue; with a large backlog many may be waiting.
+        while True:
+            try:
+                sock, addr = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if e.errno in (errno.EMFILE, errno.ENFILE):
+                    print(f"SYSERR: Out of file descriptors accepting connection: {e}")
+                    return
+                raise
+            sock.setblocking(False)
+            self.last_desc += 1
+            d = Descriptor(self.last_desc, sock, addr, self)
+            self.descriptors[sock.fileno()] = d
+            self.selector.register(sock, selectors.EVENT_READ, d)
+            d.write_to_output(TELNET_GREETING)
+            if self.on_connect:
+                self.on_connect(d)
+
+    def process_input(self, d):
+        try:
+            data = d.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            d.close()
+            return
+        self.bytes_in += len(data)
+        d.add_input(data)
+        if d.input:
+            self.waiting.add(d)
+            if len(d.input) >= MAX_INPUT_QUEUE:
+                self.pause_input(d)
+                return
+        if d.input_pulse != self.pulse:
+            d.input_pulse = self.pulse
+            d.pulse_bytes = 0
+        d.pulse_bytes += len(data)
+        if d.pulse_bytes >= MAX_INPUT_PER_PULSE:
+            self.pause_input(d)
+            self.throttled.add(d)
+
+    def pause_input(self, d):
+        """
+        Stop reading from d until its input queue drains or, if it was
+        throttled, until the next pulse.
+        """
+        self.selector.unregister(d.sock)
+        d.paused = True
+
+    def resume_input(self, d):
+        d.paused = False
+        self.selector.register(d.sock, selectors.EVENT_READ, d)
+        d.split_lines()
+        if d.input:
+            self.waiting.add(d)
+
+    def process_commands(self, interpret):
+        """
+        Hand queued lines to interpret(d, line): one per descriptor per
+        pulse, as in CircleMUD's game_loop(), and only while the
+        descriptor's flood control allows it.
+        """
+        self.pulse += 1
+        if self.throttled:
+            throttled = self.throttled
+            self.throttled = set()
+            for d in throttled:
+                if d.paused and not d.closed and len(d.input) < MAX_INPUT_QUEUE:
+                    self.resume_input(d)
+        now = time.monotonic()
+        waiting = self.waiting
+        for d in list(waiting):
+            if d.closed:
+                waiting.discard(d)
+                continue
+            line = d.get_command(now)
+            if line is None:
+                continue
+            if d.paused and len(d.input) <= MAX_INPUT_QUEUE // 2:
+                self.resume_input(d)
+            if not d.input:
+                waiting.discard(d)
+            interpret(d, line)
+        self.close_dirty()
+
+    def flush_output(self):
+        """
+        Send everything queued this pulse: one send() per descriptor that
+        has output. Bytes the socket will not take are kept for the next
+        pulse and count against the high-water mark.
+        """
+        outbox = self.outbox
+        self.outbox = set()
+        for d in outbox:
+            if d.closed:
+                continue
+            data = d.take_output()
+            if d.pending:
+                d.pending += data
+                data = d.pending
+            if not data:
+                continue
+            try:
+                sent = d.sock.send(data)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                d.close()
+                continue
+            self.sends += 1
+            self.bytes_out += sent
+            if sent < len(data):
+                if data is d.pending:
+                    del d.pending[:sent]
+                else:
+                    d.pending = bytearray(data[sent:])
+                self.outbox.add(d)
+                if (len(d.pending) > self.output_high_water
+                        and self.overflow_policy == "disconnect"):
+                    d.close()
+            elif d.pending:
+                d.pending = bytearray()
+        self.close_dirty()
+
+    def close_dirty(self):
+        dirty = self.dirty
+        self.dirty = set()
+        for d in dirty:
+            self.close_descriptor(d)
+
+    def close_descriptor(self, d):
+        fileno = d.sock.fileno()
+        if self.descriptors.get(fileno) is not d:
+            return
+        del self.descriptors[fileno]
+        if not d.paused:
+            self.selector.unregister(d.sock)
+        if d.output or d.pending or d.raw_output:
+            # Last words (quit's goodbye): whatever the socket takes now.
+            try:
+                d.sock.send(bytes(d.pending) + d.take_output())
+            except OSError:
+                pass
+        self.outbox.discard(d)
+        self.waiting.discard(d)
+        self.throttled.discard(d)
+        d.closed = True
+        try:
+            d.sock.close()
+        except OSError:
+            pass
+        if self.on_disconnect:
+            self.on_disconnect(d)
+
+    def shutdown(self):
+        """
+        Flush what can be flushed, then close every descriptor and the
+        listener. Safe to call more than once.
+        """
+        if self.listener is None:
+            return
+        self.flush_output()
+        for d in list(self.descriptors.values()):
+            self.close_descriptor(d)
+        self.selector.unregister(self.listener)
+        self.listener.close()
+        self.listener = None
+        self.selector.close()
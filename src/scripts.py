@@ -0,0 +1,500 @@
+"""
+Zone scripts: data/zones/scripts/<zone number>.zon.py, loaded while the
+game runs.
+
+A script declares its handlers in a module-level dict,
+
+    EVENTS = {"load": on_load, "reset": on_reset}
+
+and each handler is called as handler(zone, *args). Older scripts that
+only define zone_event(zone, event) still work; that function gets every
+event the dict does not name.
+
+Every SCRIPT_CHECK_PULSES the script directory is scanned, and any script
+whose size or mtime changed is loaded again. A new version replaces the
+old one only once it has been compiled, run and checked. A script that
+fails to load is logged and the old version (if any) stays in use, so a
+bad deploy never takes the game down.
+
+Handlers run under a time budget. Every call is timed into HandlerStats
+(calls, total and worst time) for report(). Once the scripts have used
+SCRIPT_PULSE_BUDGET in a pulse, further events wait for the next pulse. A
+handler that alone runs past the budget SCRIPT_MAX_STRIKES times in a row
+is disabled until its script is reloaded or an admin enables it again.
+CPU-heavy handlers can be marked with @offload to run in a worker process
+pool instead (see offload()).
+"""
+import os
+import sys
+import time
+import traceback
+import types
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from events import OPT_USEC, RL_SEC
+from lib.zone import ZoneData, log
+
+SCRIPT_DIR = "data/zones/scripts"
+SCRIPT_SUFFIX = ".zon.py"
+
+# How often the script directory is checked for changes.
+SCRIPT_CHECK_PULSES = 5 * RL_SEC
+
+# Script time allowed per pulse (seconds); a tenth of the pulse.
+SCRIPT_PULSE_BUDGET = OPT_USEC / 1000000 / 10
+
+# Consecutive over-budget calls before a handler is disabled.
+SCRIPT_MAX_STRIKES = 3
+
+# Events waiting for budget; past this the oldest are dropped.
+MAX_DEFERRED_EVENTS = 1000
+
+# Worker processes for @offload handlers; 0 runs them in the game loop.
+SCRIPT_WORKERS = 0
+
+
+class ScriptError(Exception):
+    pass
+
+
+class ZoneScript:
+    """
+    One loaded version of a zone script.
+    """
+    __slots__ = ('number', 'path', 'module', 'handlers', 'default', 'stamp')
+
+    def __init__(self, number, path, module, handlers, default, stamp):
+        self.number = number
+        self.path = path
+        self.module = module
+        self.handlers = handlers   # event name -> callable
+        self.default = default     # zone_event(zone, event), or None
+        self.stamp = stamp         # (mtime_ns, size) of the loaded file
+
+
+class HandlerStats:
+    """
+    Profile of one zone's handler for one event.
+    """
+    __slots__ = ('calls', 'total', 'worst', 'deferred', 'dropped', 'strikes',
+                 'disabled')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.deferred = 0    # calls that had to wait for a later pulse
+        self.dropped = 0     # calls lost because the deferred queue was full
+        self.strikes = 0     # consecutive calls over budget
+        self.disabled = False
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.worst:
+            self.worst = elapsed
+
+
+def offload(func=None, *, apply=None):
+    """
+    Decorator for script handlers that are heavy on CPU and do not touch
+    the world. The handler runs in a worker process with a copy of the
+    zone (a ZoneData built from zone_snapshot()); apply(zone, result), if
+    given, is then called back in the game
+    loop to act on what it returned. Without workers configured the
+    handler simply runs inline.
+
+        @offload(apply=place_loot)
+        def plan_loot(zone): ...
+    """
+    def mark(handler):
+        handler.offload = True
+        handler.offload_apply = apply
+        return handler
+    return mark(func) if func is not None else mark
+
+
+def module_name(number):
+    return f"zone_script_{number}"
+
+
+def load_script(number, path):
+    """
+    Compile and run one script file. Raises ScriptError (or whatever the
+    script raised) if it cannot be used.
+    """
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        source = f.read()
+    # Compiled here rather than imported: an edit within the same second
+    # that keeps the size would otherwise be served a stale .pyc.
+    code = compile(source, path, 'exec')
+    name = module_name(number)
+    module = types.ModuleType(name)
+    module.__file__ = path
+    old = sys.modules.get(name)
+    sys.modules[name] = module
+    try:
+        exec(code, module.__dict__)
+        handlers = getattr(module, "EVENTS", {})
+        if not isinstance(handlers, dict):
+            raise ScriptError("EVENTS is not a dict")
+        for event, handler in handlers.items():
+            if not isinstance(event, str) or not callable(handler):
+                raise ScriptError(f"EVENTS[{event!r}] is not a callable")
+        default = getattr(module, "zone_event", None)
+        if default is not None and not callable(default):
+            raise ScriptError("zone_event is not callable")
+    except BaseException:
+        # A script that fails, or fails the checks, leaves the previous
+        # version registered.
+        if old is not None:
+            sys.modules[name] = old
+        else:
+            del sys.modules[name]
+        raise
+    return ZoneScript(number, path, module, dict(handlers), default,
+                      (st.st_mtime_ns, st.st_size))
+
+
+def zone_snapshot(zone):
+    """
+    What is sent to a worker for an @offload handler: the zone's header
+    fields and reset commands as plain tuples. The live zone cannot always
+    be pickled; a shard's ImageZone reads its commands out of memoryviews.
+    """
+    return ((zone.number, zone.name, zone.bot, zone.top, zone.lifespan,
+             zone.reset_mode), list(zone.cmd.rows()))
+
+
+def zone_from_snapshot(snapshot):
+    header, rows = snapshot
+    zone = ZoneData()
+    (zone.number, zone.name, zone.bot, zone.top, zone.lifespan,
+     zone.reset_mode) = header
+    append = zone.cmd.append
+    for row in rows:
+        append(*row)
+    return zone
+
+
+def resolve_handler(script, event, args):
+    """
+    The handler for event and the arguments it is called with after the
+    zone: EVENTS[event] gets args, the zone_event default gets (event,).
+    Returns (None, args) if the script handles neither.
+    """
+    handler = script.handlers.get(event)
+    if handler is not None:
+        return handler, args
+    if script.default is not None:
+        return script.default, (event,)
+    return None, args
+
+
+# Scripts loaded inside a worker process: path -> ZoneScript.
+worker_scripts = {}
+
+
+def run_offloaded(number, path, stamp, event, snapshot, args):
+    """
+    Worker side of an @offload handler. Returns (result, seconds).
+    """
+    script = worker_scripts.get(path)
+    if script is None or script.stamp != stamp:
+        script = worker_scripts[path] = load_script(number, path)
+    handler, call_args = resolve_handler(script, event, args)
+    if handler is None:
+        raise ScriptError(f"no handler for '{event}'")
+    zone = zone_from_snapshot(snapshot)
+    start = time.perf_counter()
+    result = handler(zone, *call_args)
+    return result, time.perf_counter() - start
+
+
+class ScriptManager:
+    """
+    Holds the current script of every zone that has one. real_zone(number)
+    finds the live zone a script belongs to. With wanted set, only scripts
+    of zones for which wanted(number) is true are loaded; the others wait
+    for load_zone().
+    """
+    def __init__(self, root, real_zone, check_pulses=SCRIPT_CHECK_PULSES,
+                 budget=SCRIPT_PULSE_BUDGET, workers=SCRIPT_WORKERS):
+        self.root = root
+        self.real_zone = real_zone
+        self.wanted = None
+        self.check_pulses = check_pulses
+        self.budget = budget
+        self.workers = workers
+        self.pool = None
+        self.scripts = {}   # zone number -> ZoneScript
+        self.failed = {}    # zone number -> stamp of a file that would not load
+        self.stats = {}     # (zone number, event) -> HandlerStats
+        self.deferred = deque()   # (zone number, event, args)
+        self.offloaded = []       # (future, zone number, event, apply)
+        self.pulse_used = 0.0     # script time spent this pulse
+
+    def scan(self):
+        """
+        Script files on disk: zone number -> (path, (mtime_ns, size)).
+        """
+        found = {}
+        try:
+            entries = os.scandir(self.root)
+        except OSError:
+            return found
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith(SCRIPT_SUFFIX):
+                    continue
+                number = name[:-len(SCRIPT_SUFFIX)]
+                if not number.isdigit():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found[int(number)] = (entry.path, (st.st_mtime_ns, st.st_size))
+        return found
+
+    def load(self, number, path):
+        """
+        Load (or reload) one zone's script and swap it in. On failure the
+        previous version is kept. Returns the new ZoneScript or None.
+        """
+        try:
+            script = load_script(number, path)
+        except (Exception, SystemExit):
+            log("SYSERR: zone script %s failed to load; %s:\n%s", path,
+                "keeping the old version" if number in self.scripts
+                else "zone runs without it",
+                traceback.format_exc().rstrip())
+            try:
+                st = os.stat(path)
+                self.failed[number] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+            return None
+        old = self.scripts.get(number)
+        self.scripts[number] = script
+        self.failed.pop(number, None)
+        # New code gets a fresh chance.
+        for (zone_number, event), stats in self.stats.items():
+            if zone_number == number:
+                stats.disabled = False
+                stats.strikes = 0
+        zone = self.real_zone(number)
+        if old is None:
+            log("Zone script %s loaded.", path)
+            if zone is not None:
+                self.dispatch(zone, "load")
+        else:
+            log("Zone script %s reloaded.", path)
+            if zone is not None:
+                self.dispatch(zone, "reload")
+        return script
+
+    def load_all(self):
+        for number, (path, stamp) in sorted(self.scan().items()):
+            if self.wanted is None or self.wanted(number):
+                self.load(number, path)
+
+    def load_zone(self, number):
+        """
+        Load one zone's script, if it has one and it is not loaded yet.
+        """
+        if number in self.scripts:
+            return self.scripts[number]
+        path = os.path.join(self.root, f"{number}{SCRIPT_SUFFIX}")
+        if not os.path.exists(path):
+            return None
+        return self.load(number, path)
+
+    def unload(self, number):
+        """
+        Drop a zone's script; load_zone() brings it back.
+        """
+        script = self.scripts.pop(number, None)
+        if script is None:
+            return False
+        self.failed.pop(number, None)
+        if sys.modules.get(module_name(number)) is script.module:
+            del sys.modules[module_name(number)]
+        log("Zone script %s unloaded.", script.path)
+        return True
+
+    def check(self):
+        """
+        Reload scripts that changed on disk, load new ones, and drop
+        those whose file is gone (along with the failure record of a
+        broken script that was deleted). Returns how many were (re)loaded.
+        """
+        found = self.scan()
+        loaded = 0
+        for number, (path, stamp) in sorted(found.items()):
+            script = self.scripts.get(number)
+            if script is not None and script.stamp == stamp:
+                continue
+            if script is None and self.wanted is not None and not self.wanted(number):
+                continue
+            if self.failed.get(number) == stamp:
+                continue   # already reported; wait for the next edit
+            if self.load(number, path) is not None:
+                loaded += 1
+        for number in [n for n in self.scripts if n not in found]:
+            log("Zone script %s removed.", self.scripts.pop(number).path)
+        for number in [n for n in self.failed if n not in found]:
+            del self.failed[number]
+        return loaded
+
+    def check_event(self):
+        self.check()
+        return self.check_pulses
+
+    def schedule(self, events):
+        return events.schedule(self.check_pulses, self.check_event)
+
+    def dispatch(self, zone, event, *args):
+        """
+        Run the zone script's handler for event, if it has one. Errors in
+        the handler are logged, never raised. Returns the handler's result,
+        or None if the call was deferred, offloaded or disabled.
+        """
+        script = self.scripts.get(zone.number)
+        if script is None:
+            return None
+        handler, call_args = resolve_handler(script, event, args)
+        if handler is None:
+            return None
+        key = (zone.number, event)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = HandlerStats()
+        if stats.disabled:
+            return None
+        if self.pulse_used >= self.budget:
+            self.defer(zone.number, event, args, stats)
+            return None
+        if self.workers and getattr(handler, 'offload', False):
+            self.submit(script, zone, event, args, handler.offload_apply)
+            return None
+        return self.run(script, handler, zone, event, call_args, stats)
+
+    def run(self, script, handler, zone, event, args, stats):
+        start = time.perf_counter()
+        try:
+            result = handler(zone, *args)
+        except Exception:
+            log("SYSERR: zone script %s, event '%s':\n%s", script.path, event,
+                traceback.format_exc().rstrip())
+            result = None
+        elapsed = time.perf_counter() - start
+        self.pulse_used += elapsed
+        stats.record(elapsed)
+        if elapsed > self.budget:
+            stats.strikes += 1
+            if stats.strikes >= SCRIPT_MAX_STRIKES:
+                stats.disabled = True
+                log("SYSERR: zone script %s: '%s' handler disabled after %d "
+                    "calls over the %.1f ms budget (last %.1f ms).",
+                    script.path, event, stats.strikes, self.budget * 1000,
+                    elapsed * 1000)
+        else:
+            stats.strikes = 0
+        return result
+
+    def defer(self, number, event, args, stats):
+        if len(self.deferred) >= MAX_DEFERRED_EVENTS:
+            dropped_number, dropped_event, dropped_args = self.deferred.popleft()
+            dropped = self.stats.get((dropped_number, dropped_event))
+            if dropped is not None:
+                dropped.dropped += 1
+        self.deferred.append((number, event, args))
+        stats.deferred += 1
+
+    def submit(self, script, zone, event, args, apply):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        future = self.pool.submit(run_offloaded, zone.number, script.path,
+                                  script.stamp, event, zone_snapshot(zone),
+                                  args)
+        self.offloaded.append((future, zone.number, event, apply))
+
+    def begin_pulse(self):
+        """
+        Start a new pulse's budget: collect finished offloaded handlers,
+        then run events deferred from earlier pulses while budget lasts.
+        """
+        self.pulse_used = 0.0
+        if self.offloaded:
+            self.collect_offloaded()
+        deferred = self.deferred
+        for _ in range(len(deferred)):
+            if self.pulse_used >= self.budget:
+                break
+            number, event, args = deferred.popleft()
+            zone = self.real_zone(number)
+            if zone is not None:
+                self.dispatch(zone, event, *args)
+
+    def collect_offloaded(self):
+        running = []
+        for future, number, event, apply in self.offloaded:
+            if not future.done():
+                running.append((future, number, event, apply))
+                continue
+            stats = self.stats[(number, event)]
+            script = self.scripts.get(number)
+            path = script.path if script is not None else f"for zone {number}"
+            try:
+                result, elapsed = future.result()
+            except Exception:
+                log("SYSERR: zone script %s, offloaded event '%s':\n%s", path,
+                    event, traceback.format_exc().rstrip())
+                continue
+            stats.record(elapsed)
+            zone = self.real_zone(number)
+            if apply is not None and zone is not None and script is not None:
+                key = (number, event + "/apply")
+                apply_stats = self.stats.get(key)
+                if apply_stats is None:
+                    apply_stats = self.stats[key] = HandlerStats()
+                self.run(script, apply, zone, event, (result,), apply_stats)
+        self.offloaded = running
+
+    def enable(self, number, event):
+        stats = self.stats.get((number, event))
+        if stats is None or not stats.disabled:
+            return False
+        stats.disabled = False
+        stats.strikes = 0
+        return True
+
+    def report(self, top=10):
+        """
+        The admin view: the handlers that used the most time, worst first.
+        """
+        lines = [f"Script budget {self.budget * 1000:.1f} ms/pulse; "
+                 f"{len(self.scripts)} scripts, {len(self.deferred)} events "
+                 f"waiting, {len(self.offloaded)} offloaded running.",
+                 f"{'Zone':>5} {'Event':<12} {'Calls':>8} {'Total ms':>10} "
+                 f"{'Avg us':>9} {'Worst ms':>9} {'Defer':>6} {'Drop':>5}  State"]
+        ranked = sorted(self.stats.items(), key=lambda item: item[1].total,
+                        reverse=True)
+        for (number, event), stats in ranked[:top]:
+            avg = stats.total / stats.calls if stats.calls else 0.0
+            lines.append(f"{number:>5} {event:<12} {stats.calls:>8} "
+                         f"{stats.total * 1000:>10.2f} {avg * 1e6:>9.1f} "
+                         f"{stats.worst * 1000:>9.2f} {stats.deferred:>6} "
+                         f"{stats.dropped:>5}  "
+                         f"{'DISABLED' if stats.disabled else 'ok'}")
+        return lines
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
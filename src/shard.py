@@ -0,0 +1,406 @@
+"""
+Zone sharding: the world split across several processes behind one
+connection gateway, so a big world can use more than one core.
+
+Zones are handed out in contiguous vnum ranges, balanced by reset commands
+(partition_zones()). Every vnum has exactly one owner: a shard owns
+everything from the bottom of its first zone up to where the next shard's
+range starts, gaps between zones included.
+
+The gateway is the ordinary game loop with its ConnectionServer: it owns
+every client socket, telnet, MCCP and flood control. Instead of running
+commands itself it forwards each player's lines to the shard that holds
+the player. Once per pulse it sends every shard its batch over a local
+Unix socket (multiprocessing.Pipe) and waits for all of them to answer, so
+all shards run the same pulse in step with the gateway: they work in
+parallel, and no shard ever gets ahead of the others.
+
+Shards boot from a world image the gateway writes (lib/worldimage.py):
+they map it rather than parse anything, and share its pages.
+
+In a shard, a player's Descriptor is a ShardDescriptor that collects
+output for the gateway to deliver. When a command leaves a player in a room
+the shard does not own, the shard packs the character up (objects go as
+vnums) and the gateway sends it to the owning shard in the next pulse.
+
+Who and the global channels (gossip, shout, ...) only reach players on
+the same shard for now.
+"""
+import multiprocessing
+import os
+import signal
+import time
+
+from bisect import bisect_right
+
+import db
+from broadcast import send_to_room
+from events import EventQueue, PulseStats
+from interpreter import command_interpreter
+from lib.world import ZONE_DIR, boot_world
+from lib.worldcache import WORLD_CACHE
+from lib.worldimage import WORLD_IMAGE, write_image
+from lib.zone import log
+from world import CharData, POS_STANDING
+
+# Gateway -> shard messages, in order, within one pulse's batch.
+MSG_ENTER = 0    # (MSG_ENTER, desc_num, state, arrival message)
+MSG_INPUT = 1    # (MSG_INPUT, desc_num, line)
+MSG_LEAVE = 2    # (MSG_LEAVE, desc_num)
+
+
+class ShardMap:
+    """
+    Which shard owns which vnum. starts[i] is the lowest vnum of shard i
+    (shard 0 also owns everything below its start); zones[i] holds the
+    numbers of its zones.
+    """
+    def __init__(self, starts, zones):
+        self.starts = starts
+        self.zones = zones
+
+    def __len__(self):
+        return len(self.starts)
+
+    def shard_for(self, vnum):
+        return max(0, bisect_right(self.starts, vnum) - 1)
+
+
+def partition_zones(zones, shards):
+    """
+    Split zones (sorted by vnum, as in zone_table) into at most shards
+    contiguous runs with about the same number of reset commands each.
+    """
+    shards = max(1, min(shards, len(zones)))
+    weights = [len(zone.cmd) + 1 for zone in zones]
+    total = sum(weights)
+    groups = [[]]
+    done = 0
+    for i, (zone, weight) in enumerate(zip(zones, weights)):
+        filled = len(groups)
+        # Start the next shard once this one has its share, as long as
+        # there are zones left for the shards after it.
+        if (groups[-1] and filled < shards and done >= total * filled / shards
+                or len(zones) - i == shards - filled):
+            groups.append([])
+        groups[-1].append(zone)
+        done += weight
+    if not groups[0]:
+        return ShardMap([0], [[]])
+    starts = [group[0].bot for group in groups]
+    starts[0] = 0
+    return ShardMap(starts, [[zone.number for zone in group]
+                             for group in groups])
+
+
+def new_character_state(name, level, room):
+    return {"name": name, "level": level, "position": POS_STANDING,
+            "room": room, "carrying": [], "equipment": []}
+
+
+def pack_character(ch):
+    """
+    Take ch and everything on it out of this shard's world, as a dict
+    the next shard can rebuild it from.
+    """
+    world = db.world
+    state = new_character_state(ch.name, ch.level, ch.in_room.vnum)
+    state["position"] = ch.position
+    state["carrying"] = [obj.vnum for obj in ch.carrying]
+    state["equipment"] = [(pos, obj.vnum) for pos, obj in enumerate(ch.equipment)
+                          if obj is not None]
+    room = ch.in_room
+    world.extract_char(ch)
+    # The room was only made to hold ch on the way out.
+    if not room.people and not room.contents:
+        world.rooms.pop(room.vnum, None)
+    return state
+
+
+def unpack_character(state, desc=None):
+    world = db.world
+    ch = CharData()
+    ch.desc = desc
+    ch.name = state["name"]
+    ch.level = state["level"]
+    ch.position = state["position"]
+    for vnum in state["carrying"]:
+        world.obj_to_char(world.read_object(vnum), ch)
+    for pos, vnum in state["equipment"]:
+        world.equip_char(ch, world.read_object(vnum), pos)
+    world.char_to_room(ch, world.room(state["room"]))
+    return ch
+
+
+class ShardDescriptor:
+    """
+    Stands in for a player's Descriptor inside a shard. Output is kept for
+    the gateway to deliver at the end of the pulse.
+    """
+    __slots__ = ('desc_num', 'server', 'character', 'output', 'feed', 'closed')
+
+    def __init__(self, desc_num, server):
+        self.desc_num = desc_num
+        self.server = server
+        self.character = None
+        self.output = []
+        self.feed = None
+        self.closed = False
+
+    def write_to_output(self, data):
+        if not self.closed:
+            if self.feed is not None:
+                self.feed.interrupt(self)
+            self.output.append(data)
+
+    @staticmethod
+    def subscribe(descriptors, feed, text):
+        for d in descriptors:
+            d.output.append(text)
+            d.feed = feed
+
+    def take_output(self):
+        output = self.output
+        self.output = []
+        if self.feed is not None:
+            self.feed.closed = True
+            self.feed = None
+        return output
+
+    def close(self):
+        self.closed = True
+        self.server.dirty.add(self)
+
+    def __repr__(self):
+        return f"<ShardDescriptor #{self.desc_num}>"
+
+
+class Shard:
+    """
+    One shard's side of the game loop: its zones, its players, and the
+    pulse it runs each time the gateway says so.
+    """
+    def __init__(self, index, shard_map, heartbeat):
+        self.index = index
+        self.map = shard_map
+        self.heartbeat = heartbeat
+        self.descriptors = {}   # desc_num -> ShardDescriptor
+        self.dirty = set()      # descriptors closed this pulse
+        self.events = EventQueue()
+        self.stats = PulseStats()
+
+    def remote(self, vnum):
+        return self.map.shard_for(vnum) != self.index
+
+    def boot(self, image_path):
+        owned = set(self.map.zones[self.index])
+        db.boot_image(image_path, keep=lambda zone: zone.number in owned)
+        db.world.remote = self.remote
+        for zone in db.zone_table:
+            db.reset_zone(zone)
+        db.schedule_zone_resets(self.events)
+        db.scripts.schedule(self.events)
+        db.end_boot()
+        log("Shard %d owns vnums from %d: %d zones.", self.index,
+            self.map.starts[self.index], len(db.zone_table))
+
+    def enter(self, desc_num, state, arrival):
+        d = ShardDescriptor(desc_num, self)
+        ch = d.character = unpack_character(state, d)
+        self.descriptors[desc_num] = d
+        send_to_room(ch.in_room, f"{ch.name} {arrival}\r\n", ch)
+        command_interpreter(ch, "look")
+
+    def leave(self, desc_num):
+        d = self.descriptors.pop(desc_num, None)
+        if d is not None:
+            db.world.extract_char(d.character)
+            d.character = None
+
+    def pulse(self, batch):
+        """
+        Run one pulse: the gateway's messages first (so commands come
+        before the heartbeat, as in game_loop()), then the heartbeat.
+        Returns (output, transfers, closed) for the gateway. The time it
+        takes goes into self.stats, which the heartbeat reports.
+        """
+        start = time.perf_counter()
+        for message in batch:
+            kind = message[0]
+            if kind == MSG_INPUT:
+                d = self.descriptors.get(message[1])
+                if d is not None and not d.closed:
+                    command_interpreter(d.character, message[2])
+            elif kind == MSG_ENTER:
+                self.enter(message[1], message[2], message[3])
+            else:
+                self.leave(message[1])
+        self.heartbeat(self.events, self.stats)
+
+        output = []
+        for d in self.descriptors.values():
+            if d.output:
+                output.append((d.desc_num, d.take_output()))
+        transfers = []
+        for d in list(self.descriptors.values()):
+            room = d.character.in_room
+            if room is not None and not d.closed and self.remote(room.vnum):
+                del self.descriptors[d.desc_num]
+                transfers.append((d.desc_num, self.map.shard_for(room.vnum),
+                                  pack_character(d.character)))
+                d.character = None
+        closed = []
+        for d in self.dirty:
+            closed.append(d.desc_num)
+            if self.descriptors.pop(d.desc_num, None) is d:
+                db.world.extract_char(d.character)
+        self.dirty.clear()
+        self.stats.record(time.perf_counter() - start)
+        return output, transfers, closed
+
+
+def shard_main(index, shard_map, conn, heartbeat, script_workers, image_path):
+    """
+    Entry point of a shard process. Runs pulses until the gateway sends
+    None or goes away.
+    """
+    # ^C is for the gateway, which then shuts the shards down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    shard = Shard(index, shard_map, heartbeat)
+    db.scripts.workers = script_workers
+    shard.boot(image_path)
+    conn.send(True)
+    try:
+        while True:
+            batch = conn.recv()
+            if batch is None:
+                break
+            conn.send(shard.pulse(batch))
+    except (EOFError, OSError):
+        log("SYSERR: Shard %d lost the gateway.", index)
+    db.scripts.shutdown()
+
+
+class ShardGateway:
+    """
+    The gateway's side: routes players' input to their shards and carries
+    output and transfers back. Hook on_connect/on_disconnect into the
+    ConnectionServer, pass route() to the game loop as the interpreter,
+    and call exchange() once per pulse.
+    """
+    def __init__(self, shard_map, conns, processes, start_room, start_level):
+        self.map = shard_map
+        self.conns = conns
+        self.processes = processes
+        self.start_room = start_room
+        self.start_level = start_level
+        self.players = {}   # desc_num -> [Descriptor, shard index]
+        self.outgoing = [[] for _ in conns]
+        self.failed = False
+        self.stopping = False   # set once shutdown has been asked for
+
+    def on_connect(self, d):
+        shard = self.map.shard_for(self.start_room)
+        self.players[d.desc_num] = [d, shard]
+        state = new_character_state(f"Player{d.desc_num}", self.start_level,
+                                    self.start_room)
+        self.outgoing[shard].append((MSG_ENTER, d.desc_num, state,
+                                     "has entered the game."))
+
+    def on_disconnect(self, d):
+        player = self.players.pop(d.desc_num, None)
+        if player is not None:
+            self.outgoing[player[1]].append((MSG_LEAVE, d.desc_num))
+
+    def route(self, d, line):
+        player = self.players.get(d.desc_num)
+        if player is not None:
+            self.outgoing[player[1]].append((MSG_INPUT, d.desc_num, line))
+
+    def exchange(self):
+        """
+        Run one pulse on every shard and deliver what comes back. Returns
+        False if a shard has died. Once stopping is set that is expected
+        (a SIGTERM to the process group reaches the shards too), and is
+        not logged.
+        """
+        outgoing = self.outgoing
+        self.outgoing = [[] for _ in self.conns]
+        try:
+            # Send everything before waiting on anyone: the shards work
+            # in parallel and the wait is for the slowest.
+            for conn, batch in zip(self.conns, outgoing):
+                conn.send(batch)
+            replies = [conn.recv() for conn in self.conns]
+        except (EOFError, OSError) as e:
+            if not self.stopping:
+                log("SYSERR: Lost a shard (%s); shutting down.", e)
+                self.failed = True
+            return False
+        players = self.players
+        for output, transfers, closed in replies:
+            for desc_num, chunks in output:
+                player = players.get(desc_num)
+                if player is not None:
+                    for chunk in chunks:
+                        player[0].write_to_output(chunk)
+            for desc_num, target, state in transfers:
+                player = players.get(desc_num)
+                if player is not None:
+                    player[1] = target
+                    self.outgoing[target].append((MSG_ENTER, desc_num, state,
+                                                  "has arrived."))
+            for desc_num in closed:
+                player = players.pop(desc_num, None)
+                if player is not None:
+                    player[0].close()
+        return True
+
+    def shutdown(self):
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(10)
+            if process.is_alive():
+                process.terminate()
+
+
+def start_shards(count, heartbeat, start_room, start_level, script_workers=0,
+                 root=os.path.join(db.ROOT_DIR, ZONE_DIR),
+                 cache_path=os.path.join(db.ROOT_DIR, WORLD_CACHE),
+                 image_path=os.path.join(db.ROOT_DIR, WORLD_IMAGE)):
+    """
+    Read the zones, split them up, start one process per shard and wait
+    for them all to boot. Call before the gateway starts listening, so
+    the shards do not inherit client sockets. Returns the ShardGateway.
+
+    The zones are written to a world image that every shard maps, so they
+    boot without parsing anything and share one copy of the zone data.
+    """
+    zones, report = boot_world(root, cache_path=cache_path)
+    for path, message in report.errors:
+        log("SYSERR: %s", message)
+    write_image(image_path, zones, {number: path for path, number, ncmds,
+                                    seconds in report.zones})
+    shard_map = partition_zones(zones, count)
+    if len(shard_map) < count:
+        log("Only %d zones; running %d shards.", len(zones), len(shard_map))
+    conns = []
+    processes = []
+    for index in range(len(shard_map)):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=shard_main, name=f"shard-{index}",
+            args=(index, shard_map, child, heartbeat, script_workers,
+                  image_path))
+        process.start()
+        child.close()
+        conns.append(parent)
+        processes.append(process)
+    for conn in conns:
+        conn.recv()
+    return ShardGateway(shard_map, conns, processes, start_room, start_level)
@@ -0,0 +1,177 @@
+"""
+Telnet protocol bytes (arpa/telnet.h) and an incremental parser that
+separates them from the text a client types.
+
+Clients and proxies send IAC sequences mixed into ordinary input, and a
+sequence can be split across recv() calls, so the parser keeps its state
+between chunks.
+
+TelnetOptions holds what one connection has agreed to. The server offers
+MCCP2 (compressed output), and asks for NAWS (window size) and TTYPE
+(terminal type). Anything else the client offers is refused.
+"""
+
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+GA = 249
+NOP = 241
+SE = 240
+
+TELOPT_TTYPE = 24
+TELOPT_NAWS = 31
+TELOPT_COMPRESS2 = 86
+
+TELQUAL_IS = 0
+TELQUAL_SEND = 1
+
+IAC_BYTE = bytes((IAC,))
+
+# Sent to every new connection.
+TELNET_GREETING = bytes((IAC, WILL, TELOPT_COMPRESS2,
+                         IAC, DO, TELOPT_NAWS,
+                         IAC, DO, TELOPT_TTYPE))
+
+# Everything after this sequence is part of the zlib stream.
+MCCP2_START = bytes((IAC, SB, TELOPT_COMPRESS2, IAC, SE))
+
+TTYPE_SEND = bytes((IAC, SB, TELOPT_TTYPE, TELQUAL_SEND, IAC, SE))
+
+DEFAULT_WIDTH = 80
+DEFAULT_HEIGHT = 24
+
+# Parser states.
+TS_DATA = 0
+TS_IAC = 1       # saw IAC
+TS_OPT = 2       # saw IAC WILL/WONT/DO/DONT, option byte next
+TS_SB = 3        # inside a subnegotiation
+TS_SB_IAC = 4    # saw IAC inside a subnegotiation
+
+# A subnegotiation longer than this is a broken or hostile client.
+MAX_SUBNEG_LENGTH = 1024
+
+
+class TelnetParser:
+    """
+    Strips telnet commands out of a client's byte stream.
+
+        on_command(command, option)   IAC WILL/WONT/DO/DONT option
+        on_subneg(option, data)       IAC SB option data IAC SE
+
+    Both callbacks are optional; without them the commands are dropped.
+    IAC IAC is passed through as a literal 255 byte.
+    """
+    def __init__(self, on_command=None, on_subneg=None):
+        self.state = TS_DATA
+        self.command = 0
+        self.subneg = bytearray()
+        self.on_command = on_command
+        self.on_subneg = on_subneg
+
+    def feed(self, data):
+        """
+        Parse one chunk; returns the plain data bytes in it.
+        """
+        if self.state == TS_DATA and IAC not in data:
+            return data
+        out = bytearray()
+        state = self.state
+        i = 0
+        end = len(data)
+        while i < end:
+            if state == TS_DATA:
+                j = data.find(IAC_BYTE, i)
+                if j < 0:
+                    out += data[i:]
+                    break
+                out += data[i:j]
+                i = j + 1
+                state = TS_IAC
+                continue
+            byte = data[i]
+            i += 1
+            if state == TS_IAC:
+                if byte == IAC:
+                    out.append(IAC)
+                    state = TS_DATA
+                elif byte in (WILL, WONT, DO, DONT):
+                    self.command = byte
+                    state = TS_OPT
+                elif byte == SB:
+                    self.subneg.clear()
+                    state = TS_SB
+                else:
+                    state = TS_DATA  # GA, NOP, AYT, ...: nothing to do
+            elif state == TS_OPT:
+                if self.on_command:
+                    self.on_command(self.command, byte)
+                state = TS_DATA
+            elif state == TS_SB:
+                if byte == IAC:
+                    state = TS_SB_IAC
+                elif len(self.subneg) < MAX_SUBNEG_LENGTH:
+                    self.subneg.append(byte)
+            else:  # TS_SB_IAC
+                if byte == SE:
+                    if self.subneg and self.on_subneg:
+                        self.on_subneg(self.subneg[0], bytes(self.subneg[1:]))
+                    self.subneg.clear()
+                    state = TS_DATA
+                else:
+                    if byte == IAC and len(self.subneg) < MAX_SUBNEG_LENGTH:
+                        self.subneg.append(IAC)
+                    state = TS_SB
+        self.state = state
+        return bytes(out)
+
+
+class TelnetOptions:
+    """
+    Option negotiation for one connection. conn is the Descriptor: replies
+    go through its write_to_output(), and it is told to start or stop
+    compressing its output.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.mccp = False
+        self.naws = False
+        self.ttype = False
+        self.width = DEFAULT_WIDTH
+        self.height = DEFAULT_HEIGHT
+        self.term_type = ""
+        self.refused = set()   # options already turned down once
+
+    def command(self, command, option):
+        if option == TELOPT_COMPRESS2:
+            if command == DO and not self.mccp:
+                self.mccp = True
+                self.conn.start_compression()
+            elif command == DONT and self.mccp:
+                self.mccp = False
+                self.conn.stop_compression()
+        elif option == TELOPT_NAWS:
+            self.naws = command == WILL
+        elif option == TELOPT_TTYPE:
+            if command == WILL and not self.ttype:
+                self.ttype = True
+                self.conn.write_to_output(TTYPE_SEND)
+            elif command == WONT:
+                self.ttype = False
+        elif command in (WILL, DO) and option not in self.refused:
+            # Refuse once; answering every repeat could loop forever.
+            self.refused.add(option)
+            self.conn.write_to_output(
+                bytes((IAC, DONT if command == WILL else WONT, option)))
+
+    def subneg(self, option, data):
+        if option == TELOPT_NAWS and len(data) >= 4:
+            width = data[0] << 8 | data[1]
+            height = data[2] << 8 | data[3]
+            # Zero means the client does not know; keep the default.
+            self.width = width or DEFAULT_WIDTH
+            self.height = height or DEFAULT_HEIGHT
+        elif option == TELOPT_TTYPE and data[:1] == bytes((TELQUAL_IS,)):
+            self.term_type = data[1:65].decode('ascii', 'replace')
@@ -0,0 +1,246 @@
+"""
+Live game objects: rooms, mobiles and objects in play, roughly the parts
+of CircleMUD's structs.h and handler.c the zone resets need.
+
+Every mobile and object in play is registered under its vnum, in insertion
+order. The number of live instances of a vnum is len() of its registry, so
+max_existing checks never count anything, and "the first object with this
+vnum" (CircleMUD's get_obj_num) is the first key.
+"""
+
+NOWHERE = -1
+NUM_WEARS = 18   # equipment positions, WEAR_LIGHT .. WEAR_HOLD
+NUM_OF_DIRS = 6
+
+# Positions
+POS_DEAD = 0        # dead
+POS_MORTALLYW = 1   # mortally wounded
+POS_INCAP = 2       # incapacitated
+POS_STUNNED = 3     # stunned
+POS_SLEEPING = 4    # sleeping
+POS_RESTING = 5     # resting
+POS_SITTING = 6     # sitting
+POS_FIGHTING = 7    # fighting
+POS_STANDING = 8    # standing
+
+# Levels
+LVL_IMPL = 34
+LVL_GRGOD = 33
+LVL_GOD = 32
+LVL_IMMORT = 31
+LVL_FREEZE = LVL_GRGOD
+
+
+class Room:
+    def __init__(self, vnum):
+        self.vnum = vnum
+        self.people = []
+        self.players = {}   # the players among people: {CharData: None}
+        self.feed = None    # this pulse's broadcast.send_to_room() messages
+        self.contents = []
+        self.doors = {}   # direction -> door state (0 open, 1 closed, 2 locked)
+        self.zone = None  # number of the zone holding it (NOWHERE if none),
+                          # filled in by db.room_zone() on first use
+
+
+class CharData:
+    """
+    A mobile instance (vnum >= 0) or a player (vnum -1).
+    """
+    def __init__(self, vnum=-1):
+        self.vnum = vnum
+        self.name = ""
+        self.level = 0
+        self.position = POS_STANDING
+        self.desc = None     # the player's Descriptor, if connected
+        self.in_room = None
+        self.carrying = []
+        self.equipment = [None] * NUM_WEARS
+
+
+class ObjData:
+    def __init__(self, vnum):
+        self.vnum = vnum
+        self.in_room = None
+        self.carried_by = None
+        self.worn_by = None
+        self.in_obj = None
+        self.contains = []
+
+
+class Prototype:
+    """
+    A mobile or object vnum as the reset engine holds it: the vnum and its
+    live instances (the World registry entry), so a reset finds both
+    without a lookup.
+    """
+    __slots__ = ('vnum', 'live')
+
+    def __init__(self, vnum, live):
+        self.vnum = vnum
+        self.live = live
+
+    def __repr__(self):
+        return f"<Prototype {self.vnum}: {len(self.live)} in play>"
+
+
+class World:
+    """
+    Rooms and everything in play, with per-vnum instance registries.
+    """
+    def __init__(self):
+        self.rooms = {}         # vnum -> Room
+        self.mobs_by_vnum = {}  # vnum -> {CharData: None}, oldest first
+        self.objs_by_vnum = {}  # vnum -> {ObjData: None}, oldest first
+        self.mob_prototypes = {}   # vnum -> Prototype
+        self.obj_prototypes = {}   # vnum -> Prototype
+        # With the world split across shards: remote(vnum) is true for
+        # rooms another process owns. None means every room is here.
+        self.remote = None
+        # player_entered(ch, room) and player_left(ch, room), if set, are
+        # called whenever a player (a character with a connection) is put
+        # in or taken out of a room.
+        self.player_entered = None
+        self.player_left = None
+
+    def room(self, vnum):
+        """
+        The room with this vnum. Rooms have no data files yet, so they are
+        created on first use.
+        """
+        room = self.rooms.get(vnum)
+        if room is None:
+            room = self.rooms[vnum] = Room(vnum)
+        return room
+
+    def mob_count(self, vnum):
+        live = self.mobs_by_vnum.get(vnum)
+        return len(live) if live else 0
+
+    def obj_count(self, vnum):
+        live = self.objs_by_vnum.get(vnum)
+        return len(live) if live else 0
+
+    def get_obj_num(self, vnum):
+        """
+        The oldest object in play with this vnum, or None.
+        """
+        live = self.objs_by_vnum.get(vnum)
+        return next(iter(live)) if live else None
+
+    def mob_prototype(self, vnum):
+        proto = self.mob_prototypes.get(vnum)
+        if proto is None:
+            proto = self.mob_prototypes[vnum] = Prototype(
+                vnum, self.mobs_by_vnum.setdefault(vnum, {}))
+        return proto
+
+    def obj_prototype(self, vnum):
+        proto = self.obj_prototypes.get(vnum)
+        if proto is None:
+            proto = self.obj_prototypes[vnum] = Prototype(
+                vnum, self.objs_by_vnum.setdefault(vnum, {}))
+        return proto
+
+    def read_mobile(self, vnum):
+        mob = CharData(vnum)
+        self.mobs_by_vnum.setdefault(vnum, {})[mob] = None
+        return mob
+
+    def read_object(self, vnum):
+        obj = ObjData(vnum)
+        self.objs_by_vnum.setdefault(vnum, {})[obj] = None
+        return obj
+
+    def spawn_mobile(self, proto):
+        """
+        read_mobile() from a Prototype handle.
+        """
+        mob = CharData(proto.vnum)
+        proto.live[mob] = None
+        return mob
+
+    def spawn_object(self, proto):
+        obj = ObjData(proto.vnum)
+        proto.live[obj] = None
+        return obj
+
+    def char_to_room(self, ch, room):
+        room.people.append(ch)
+        ch.in_room = room
+        if ch.desc is not None:
+            room.players[ch] = None
+            if room.feed is not None:
+                room.feed.enter(ch.desc)
+            if self.player_entered is not None:
+                self.player_entered(ch, room)
+
+    def char_from_room(self, ch):
+        room = ch.in_room
+        if room is not None:
+            room.people.remove(ch)
+            ch.in_room = None
+            if room.players:
+                room.players.pop(ch, None)
+            if ch.desc is not None:
+                if room.feed is not None:
+                    room.feed.leave(ch.desc)
+                if self.player_left is not None:
+                    self.player_left(ch, room)
+
+    def obj_to_room(self, obj, room):
+        room.contents.append(obj)
+        obj.in_room = room
+
+    def obj_to_char(self, obj, ch):
+        ch.carrying.append(obj)
+        obj.carried_by = ch
+
+    def obj_to_obj(self, obj, container):
+        container.contains.append(obj)
+        obj.in_obj = container
+
+    def equip_char(self, ch, obj, pos):
+        """
+        Wear obj at pos. Returns False (and leaves obj alone) if the
+        position is already taken.
+        """
+        if ch.equipment[pos] is not None:
+            return False
+        ch.equipment[pos] = obj
+        obj.worn_by = ch
+        return True
+
+    def extract_obj(self, obj):
+        """
+        Remove obj, and everything inside it, from play.
+        """
+        if obj.in_room is not None:
+            obj.in_room.contents.remove(obj)
+        elif obj.carried_by is not None:
+            obj.carried_by.carrying.remove(obj)
+        elif obj.worn_by is not None:
+            equipment = obj.worn_by.equipment
+            equipment[equipment.index(obj)] = None
+        elif obj.in_obj is not None:
+            obj.in_obj.contains.remove(obj)
+        obj.in_room = obj.carried_by = obj.worn_by = obj.in_obj = None
+        for inner in list(obj.contains):
+            self.extract_obj(inner)
+        live = self.objs_by_vnum.get(obj.vnum)
+        if live is not None:
+            live.pop(obj, None)
+
+    def extract_char(self, ch):
+        """
+        Remove a mobile and everything it carries or wears from play.
+        """
+        for obj in list(ch.carrying):
+            self.extract_obj(obj)
+        for obj in ch.equipment:
+            if obj is not None:
+                self.extract_obj(obj)
+        self.char_from_room(ch)
+        live = self.mobs_by_vnum.get(ch.vnum)
+        if live is not None:
+            live.pop(ch, None)
@@ -0,0 +1,182 @@
+"""
+Zone reset execution (CircleMUD's reset_zone() in db.c).
+
+Each zone's command table is linked (lib/zonelink.py) and compiled once
+into a flat program of (handler, arg1, arg2, arg3, on_fail) steps, so a
+reset is one tight loop with no per-command decoding, vnum lookups or
+if_flag checks: a step that fails jumps straight past the steps that
+depend on it. max_existing limits are checked against the live instance
+registries the Prototype handles share with the World, which are kept up
+to date as things enter and leave play, so no reset ever counts anything.
+"""
+from lib.zone import log
+from lib.zonelink import ERROR, link_zone, loaded_objects
+
+
+class ResetState:
+    """
+    The 'mob' and 'obj' locals of reset_zone(): what the last M and O/P
+    commands loaded, for the G/E/P commands that follow them.
+    """
+    __slots__ = ('mob', 'obj')
+
+    def __init__(self):
+        self.mob = None
+        self.obj = None
+
+
+def zone_problem(zone, problem):
+    log("%s: zone file: %s (zone %d, line %d)",
+        "SYSERR" if problem.severity == ERROR else "WARNING", problem.message,
+        zone.number, problem.line)
+
+
+def reset_mob(world, state, proto, max_existing, room):
+    if len(proto.live) >= max_existing:
+        return False
+    state.mob = mob = world.spawn_mobile(proto)
+    world.char_to_room(mob, room)
+    return True
+
+
+def reset_obj(world, state, proto, max_existing, room):
+    if len(proto.live) >= max_existing:
+        return False
+    state.obj = obj = world.spawn_object(proto)
+    world.obj_to_room(obj, room)
+    return True
+
+
+def reset_put(world, state, proto, max_existing, container_proto):
+    if len(proto.live) >= max_existing or not container_proto.live:
+        return False
+    container = next(iter(container_proto.live))
+    state.obj = obj = world.spawn_object(proto)
+    world.obj_to_obj(obj, container)
+    return True
+
+
+def reset_give(world, state, proto, max_existing, unused):
+    if state.mob is None or len(proto.live) >= max_existing:
+        return False
+    world.obj_to_char(world.spawn_object(proto), state.mob)
+    return True
+
+
+def reset_equip(world, state, proto, max_existing, pos):
+    if state.mob is None or len(proto.live) >= max_existing:
+        return False
+    obj = world.spawn_object(proto)
+    if not world.equip_char(state.mob, obj, pos):
+        # Slot taken; CircleMUD would leak the object, keep it carried.
+        world.obj_to_char(obj, state.mob)
+    return True
+
+
+def reset_remove(world, state, room, vnum, unused):
+    for obj in room.contents:
+        if obj.vnum == vnum:
+            world.extract_obj(obj)
+            break
+    return True
+
+
+def reset_door(world, state, room, direction, door_state):
+    room.doors[direction] = door_state
+    return True
+
+
+RESET_HANDLERS = {
+    'M': reset_mob,
+    'O': reset_obj,
+    'P': reset_put,
+    'G': reset_give,
+    'E': reset_equip,
+    'R': reset_remove,
+    'D': reset_door,
+}
+
+
+def resolvers(world):
+    """
+    What link_zone() turns vnums into: rooms and prototype handles out of
+    world.
+    """
+    return {'room': world.room, 'mob': world.mob_prototype,
+            'obj': world.obj_prototype}
+
+
+def compile_zone(zone, world, index, loaded=None):
+    """
+    Turn a zone's command table into a reset program of (handler, arg1,
+    arg2, arg3, on_fail) steps. The linker (lib/zonelink.py) has already
+    resolved rooms and prototypes to handles, left out commands that can
+    never run and worked out where each step goes when it fails. Returns
+    (program, problems).
+    """
+    steps, problems = link_zone(zone, index, resolvers(world), loaded)
+    program = tuple((RESET_HANDLERS[command], arg1, arg2, arg3, on_fail)
+                    for command, arg1, arg2, arg3, on_fail in steps)
+    return program, problems
+
+
+class ResetEngine:
+    """
+    Holds the compiled program of every zone and runs resets against a
+    World. index is the VnumIndex zones are linked against; loaded, if
+    set, is every object vnum the world's zones load (see link()).
+    """
+    def __init__(self, world):
+        self.world = world
+        self.programs = {}   # zone number -> compiled program
+        self.index = None
+        self.loaded = None
+
+    def link(self, zones, index):
+        """
+        Compile zones, logging all of their problems in one go; index
+        holds every zone in the world. Returns the problems. Zones
+        compiled later (reloads) are checked against the objects loaded
+        as of this call.
+        """
+        self.index = index
+        self.loaded = loaded_objects(index.zones)
+        self.programs.clear()
+        problems = []
+        for zone in zones:
+            problems.extend(self.compile(zone))
+        return problems
+
+    def compile(self, zone):
+        program, problems = compile_zone(zone, self.world, self.index,
+                                         self.loaded)
+        self.programs[zone.number] = program
+        for problem in problems:
+            zone_problem(zone, problem)
+        return problems
+
+    def forget(self, zone):
+        self.programs.pop(zone.number, None)
+
+    def reset(self, zone):
+        """
+        Run one zone's reset program. Returns the number of steps that
+        succeeded.
+        """
+        program = self.programs.get(zone.number)
+        if program is None:
+            self.compile(zone)
+            program = self.programs[zone.number]
+        world = self.world
+        state = ResetState()
+        done = 0
+        i = 0
+        end = len(program)
+        while i < end:
+            handler, arg1, arg2, arg3, on_fail = program[i]
+            if handler(world, state, arg1, arg2, arg3):
+                done += 1
+                i += 1
+            else:
+                i = on_fail
+        return done
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+from lib.convert import FORMATS, convert_zones
+from lib.world import boot_world, discover_zone_files
+
+STOCK_ZONES = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data", "zones", "zon")
+
+
+def test_convert_then_boot(tmp_path):
+    for name in os.listdir(STOCK_ZONES):
+        shutil.copy(os.path.join(STOCK_ZONES, name), tmp_path)
+    report = convert_zones([str(tmp_path)], FORMATS, workers=1)
+    assert not report.errors
+    assert len(report.converted) == 2
+
+    paths = discover_zone_files(str(tmp_path))
+    assert [os.path.basename(path) for path in paths] == ["0.zon", "9.zon"]
+    zone_table, report = boot_world(str(tmp_path), workers=1)
+    assert not report.errors
+    assert [zone.number for zone in zone_table] == [0, 9]
+
+
+def test_converted_zone_boots_without_its_source(tmp_path):
+    shutil.copy(os.path.join(STOCK_ZONES, "9.zon"), tmp_path)
+    convert_zones([str(tmp_path)], ("json5",), workers=1)
+    os.remove(tmp_path / "9.zon")
+
+    zone_table, report = boot_world(str(tmp_path), workers=1)
+    assert not report.errors
+    assert report.zones[0][0].endswith("9.zon.json5")
+    assert [zone.number for zone in zone_table] == [9]
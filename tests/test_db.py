@@ -0,0 +1,87 @@
+import os
+import shutil
+
+import pytest
+
+import db
+from events import RL_MIN, EventQueue
+from interpreter import command_interpreter
+from lib.zone import ZoneData
+from world import LVL_IMPL, CharData
+
+STOCK_ZONES = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data", "zones", "zon")
+
+
+@pytest.fixture
+def zones(monkeypatch):
+    table = []
+    for number in range(3):
+        zone = ZoneData()
+        zone.number = number
+        zone.lifespan = 10
+        zone.reset_mode = db.ZRESET_ALWAYS
+        table.append(zone)
+    monkeypatch.setattr(db, "zone_table", table)
+    monkeypatch.setattr(db, "zone_reset_events", {})
+    return table
+
+
+def test_zone_resets_are_spread_over_pulses(zones):
+    events = EventQueue()
+    db.schedule_zone_resets(events)
+    due = [events.time_left(db.zone_reset_events[zone.number])
+           for zone in zones]
+    assert due == [10 * RL_MIN, 10 * RL_MIN + 1, 10 * RL_MIN + 2]
+
+
+class Output:
+    """
+    Stands in for a Descriptor: collects what the character is sent.
+    """
+    def __init__(self):
+        self.text = []
+
+    def write_to_output(self, data):
+        self.text.append(data)
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    for name in os.listdir(STOCK_ZONES):
+        shutil.copy(os.path.join(STOCK_ZONES, name), tmp_path)
+    monkeypatch.setattr(db, "zone_table", [])
+    monkeypatch.setattr(db, "zone_index", None)
+    monkeypatch.setattr(db, "zone_reset_events", {})
+    monkeypatch.setattr(db, "reset_queue", None)
+    monkeypatch.setattr(db.scripts, "wanted", lambda number: False)
+    db.boot_zones(str(tmp_path), workers=1, cache_path=None)
+    db.schedule_zone_resets(EventQueue())
+    return tmp_path
+
+
+def implementor():
+    ch = CharData()
+    ch.level = LVL_IMPL
+    ch.desc = Output()
+    return ch
+
+
+def test_reload_zone_command(world):
+    path = world / "9.zon"
+    path.write_text(path.read_text().replace("Island Of Minos~", "Isle~"))
+    ch = implementor()
+    command_interpreter(ch, "reload zone 9")
+    assert ch.desc.text == ["Reloaded zone 9 (River Isle).\r\n"]
+    assert db.zone_index.real_zone(9).name == "River Isle"
+    assert db.zone_index.zone_for(950).name == "River Isle"
+    assert 9 in db.zone_reset_events
+
+
+def test_reload_zone_keeps_old_zone_on_error(world):
+    old = db.zone_index.real_zone(9)
+    (world / "9.zon").write_text("#9\nbroken~\n")
+    ch = implementor()
+    command_interpreter(ch, "reload zone 9")
+    assert ch.desc.text == ["Zone 9 was not reloaded; see the log.\r\n"]
+    assert db.zone_index.real_zone(9) is old
@@ -0,0 +1,51 @@
+import sys
+
+import pytest
+
+from lib.zone import ZoneData
+from scripts import (ScriptError, load_script, module_name, run_offloaded,
+                     worker_scripts, zone_snapshot)
+
+NUMBER = 30999
+
+
+@pytest.fixture
+def script_path(tmp_path):
+    path = tmp_path / f"{NUMBER}.zon.py"
+    yield path
+    sys.modules.pop(module_name(NUMBER), None)
+    worker_scripts.pop(str(path), None)
+
+
+@pytest.mark.parametrize("source", ["EVENTS = 5\n",
+                                    "EVENTS = {'load': 5}\n",
+                                    "zone_event = 5\n"])
+def test_invalid_script_is_not_registered(script_path, source):
+    script_path.write_text(source)
+    with pytest.raises(ScriptError):
+        load_script(NUMBER, str(script_path))
+    assert module_name(NUMBER) not in sys.modules
+
+
+def test_invalid_script_keeps_previous_module(script_path):
+    script_path.write_text("EVENTS = {'load': lambda zone: 'old'}\n")
+    old = load_script(NUMBER, str(script_path))
+    script_path.write_text("EVENTS = 5\n")
+    with pytest.raises(ScriptError):
+        load_script(NUMBER, str(script_path))
+    assert sys.modules[module_name(NUMBER)] is old.module
+
+
+def test_offloaded_default_handler_gets_the_event(script_path):
+    script_path.write_text(
+        "from scripts import offload\n"
+        "@offload\n"
+        "def zone_event(zone, event):\n"
+        "    return (zone.number, event)\n")
+    script = load_script(NUMBER, str(script_path))
+    zone = ZoneData()
+    zone.number = NUMBER
+    zone.cmd.append('S')
+    result, seconds = run_offloaded(NUMBER, script.path, script.stamp,
+                                    "reset", zone_snapshot(zone), ())
+    assert result == (NUMBER, "reset")
@@ -0,0 +1,80 @@
+import json
+import marshal
+
+import pytest
+
+from lib.world import parse_zone_file
+from lib.worldcache import CACHE_VERSION, WorldCache
+from lib.zone import ZoneFormatError, load_zones, zone_from_dict
+
+ZON = """#30
+Test Zone~
+3000 3099 15 2
+M 0 3001 {max} 3001   the mob
+S
+$
+"""
+
+HEADER = {"number": 30, "name": "Test Zone", "bot": 3000, "top": 3099,
+          "lifespan": 15, "reset_mode": 2}
+
+
+def zone_dict(**cmd):
+    entry = {"command": "spawn_mob", "if_flag": 0, "mob": 3001,
+             "max_existing": 1, "room": 3001}
+    entry.update(cmd)
+    return dict(HEADER, cmd=[entry])
+
+
+def test_load_zones():
+    zone = load_zones(ZON.format(max=1).splitlines(), "30.zon")
+    assert (zone.number, zone.bot, zone.top) == (30, 3000, 3099)
+    assert list(zone.cmd.rows()) == [("M", 0, 3001, 1, 3001), ("S", 0, 0, 0, 0)]
+
+
+def test_load_zones_argument_out_of_range():
+    with pytest.raises(ZoneFormatError) as info:
+        load_zones(ZON.format(max=99999999999).splitlines(), "30.zon")
+    assert "30.zon" in str(info.value)
+    assert info.value.line_num == 4
+
+
+@pytest.mark.parametrize("value", [99999999999, 1e20])
+def test_zone_from_dict_argument_out_of_range(value):
+    with pytest.raises(ZoneFormatError) as info:
+        zone_from_dict(zone_dict(max_existing=value), "30.zon.json5")
+    assert info.value.line_num == 1
+
+
+def test_parse_zone_file_reports_out_of_range(tmp_path):
+    path = tmp_path / "30.zon.json5"
+    path.write_text(json.dumps(zone_dict(max_existing=99999999999)))
+    _, zone, _, error = parse_zone_file(str(path))
+    assert zone is None
+    assert "out of range" in error
+
+
+@pytest.mark.parametrize("commands", [5, "M 0 3001 1 3001", {"command": "M"}])
+def test_zone_from_dict_commands_not_a_list(commands):
+    with pytest.raises(ZoneFormatError) as info:
+        zone_from_dict(dict(HEADER, cmd=commands), "30.zon.json5")
+    assert info.value.line_num == 0
+
+
+@pytest.mark.parametrize("entry", [5, None, ["M", 0, 3001, 1, 3001]])
+def test_zone_from_dict_command_not_a_mapping(entry):
+    with pytest.raises(ZoneFormatError) as info:
+        zone_from_dict(dict(HEADER, cmd=[entry]), "30.zon.json5")
+    assert info.value.line_num == 1
+
+
+def test_zone_from_dict_no_commands():
+    zone = zone_from_dict(dict(HEADER, cmd=None), "30.zon.json5")
+    assert list(zone.cmd.rows()) == [("S", 0, 0, 0, 0)]
+
+
+def test_world_cache_ignores_other_versions(tmp_path):
+    path = tmp_path / "world.cache"
+    path.write_bytes(marshal.dumps({"version": CACHE_VERSION - 1,
+                                    "zones": {"30.zon": None}}))
+    assert not WorldCache(str(path)).load().entries
@@ -0,0 +1,17 @@
+import os
+
+from lib.world import boot_world
+from lib.worldimage import WorldImage, write_image
+from lib.zonelink import loaded_objects
+
+STOCK_ZONES = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data", "zones")
+
+
+def test_loaded_objects_reads_image_zones(tmp_path):
+    zones, report = boot_world(STOCK_ZONES, workers=1)
+    path = str(tmp_path / "world.img")
+    write_image(path, zones)
+    image = WorldImage(path)
+    assert loaded_objects(zones)
+    assert loaded_objects(image.zones) == loaded_objects(zones)
@@ -0,0 +1,33 @@
+import argparse
+import sys
+
+from lib.world import ZONE_DIR, boot_world
+from lib.worldcache import WORLD_CACHE
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse every zone under a directory and report timings.")
+    parser.add_argument("root", nargs="?", default=ZONE_DIR)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="parser processes (default: one per CPU)")
+    parser.add_argument("--cache", nargs="?", const=WORLD_CACHE, default=None,
+                        help=f"use a binary world cache (default file: {WORLD_CACHE})")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="list per-zone parse times")
+    args = parser.parse_args()
+
+    print("CircleMUD World Boot")
+    zone_table, report = boot_world(args.root, args.workers, args.cache)
+    if args.verbose:
+        for line in report.lines():
+            print(line)
+    else:
+        for path, message in report.errors:
+            print(f"SYSERR: {message}")
+    print(report.summary())
+    if report.errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
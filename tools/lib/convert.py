@@ -0,0 +1,191 @@
+"""
+Zone file conversion (.zon -> .json5 / .yaml), shared by the converter
+CLIs. Files are converted in parallel, skipped when their output is newer
+than the source, and written as UTF-8.
+"""
+import glob
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.world import PARALLEL_MIN_FILES
+from lib.zone import COMMAND_ARG_KEYS, COMMAND_NAMES, ZoneFormatError
+from lib.zoneformat import ZONE_FORMATS, load_zone
+
+FORMATS = ("json5", "yaml")
+
+
+def zone_header(zone):
+    return {
+        "number": zone.number,
+        "name": zone.name,
+        "bot": zone.bot,
+        "top": zone.top,
+        "lifespan": zone.lifespan,
+        "reset_mode": zone.reset_mode,
+    }
+
+
+def command_dict(command, if_flag, arg1, arg2, arg3, long_names):
+    """
+    One reset command as converter output: named arguments instead of
+    arg1..arg3, and the long command name (spawn_mob, ...) for YAML.
+    """
+    entry = {
+        "command": COMMAND_NAMES[command] if long_names else command,
+        "if_flag": if_flag,
+    }
+    keys = COMMAND_ARG_KEYS[command]
+    if keys[1] != "max_existing":
+        # D and R have no max_existing; keep the key order of old output.
+        entry[keys[0]] = arg1
+        entry[keys[1]] = arg2
+    else:
+        entry["max_existing"] = arg2
+        entry[keys[0]] = arg1
+    if keys[2] is not None:
+        entry[keys[2]] = arg3
+    return entry
+
+
+def zone_to_json5_dict(zone):
+    data = zone_header(zone)
+    cmds = data["cmd"] = []
+    for command, if_flag, arg1, arg2, arg3 in zone.cmd.rows():
+        if command == 'S':
+            cmds.append({"command": "S", "if_flag": if_flag, "max_existing": arg2})
+            break
+        cmds.append(command_dict(command, if_flag, arg1, arg2, arg3, False))
+    return data
+
+
+# The YAML converter has always written command keys in this order.
+YAML_KEY_ORDER = ("command", "if_flag", "max_existing", "mob", "obj", "room",
+                  "eq_pos", "container", "exit", "state")
+
+
+def zone_to_yaml_dict(zone):
+    data = zone_header(zone)
+    data["script"] = None
+    cmds = data["cmd"] = []
+    for command, if_flag, arg1, arg2, arg3 in zone.cmd.rows():
+        if command == 'S':
+            break
+        entry = command_dict(command, if_flag, arg1, arg2, arg3, True)
+        cmds.append({key: entry[key] for key in YAML_KEY_ORDER if key in entry})
+    return data
+
+
+def validate(fmt, text):
+    """
+    Decode freshly encoded output again; raises ValueError if it is bad.
+    """
+    ZONE_FORMATS[fmt].decode(text.encode('utf-8'))
+
+
+TO_DICT = {
+    "json5": zone_to_json5_dict,
+    "yaml": zone_to_yaml_dict,
+}
+
+
+def output_path(source, fmt):
+    return source + "." + fmt
+
+
+def is_up_to_date(source, target):
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def find_sources(patterns):
+    """
+    Expand files, directories (searched recursively) and glob patterns
+    into a sorted list of .zon files.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.zon")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path):
+                found.add(path)
+    return sorted(found)
+
+
+def convert_file(source, formats, check=False):
+    """
+    Convert one .zon file to every format in formats. Runs in a worker
+    process, so errors come back as text. Returns (source, written, error).
+    """
+    written = []
+    try:
+        zone = load_zone(source)
+        for fmt in formats:
+            text = ZONE_FORMATS[fmt].encode(TO_DICT[fmt](zone))
+            if check:
+                validate(fmt, text)
+            target = output_path(source, fmt)
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(text)
+            written.append(target)
+    except (OSError, ZoneFormatError, ValueError, TypeError) as e:
+        return source, written, str(e)
+    return source, written, None
+
+
+class ConvertReport:
+    def __init__(self):
+        self.converted = []   # (source, [targets])
+        self.skipped = []     # sources whose outputs were up to date
+        self.errors = []      # (source, message)
+        self.workers = 1
+        self.total = 0.0
+
+    def summary(self):
+        return (f"Converted {len(self.converted)} zones, skipped "
+                f"{len(self.skipped)} up to date, {len(self.errors)} errors "
+                f"in {self.total:.2f} s ({self.workers} workers)")
+
+
+def convert_zones(patterns, formats=("json5",), workers=None, force=False,
+                  check=False):
+    """
+    Convert every .zon file matched by patterns. Sources whose outputs are
+    all newer than they are are skipped unless force is set.
+    """
+    for fmt in formats:
+        if ZONE_FORMATS[fmt].backend is None:
+            raise RuntimeError(ZONE_FORMATS[fmt].missing)
+    start = time.perf_counter()
+    report = ConvertReport()
+    todo = []
+    for source in find_sources(patterns):
+        if not force and all(is_up_to_date(source, output_path(source, fmt))
+                             for fmt in formats):
+            report.skipped.append(source)
+        else:
+            todo.append(source)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(todo)))
+    if workers == 1 or len(todo) < PARALLEL_MIN_FILES:
+        results = [convert_file(source, formats, check) for source in todo]
+    else:
+        report.workers = workers
+        chunksize = max(1, len(todo) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert_file, todo, [formats] * len(todo),
+                                    [check] * len(todo), chunksize=chunksize))
+
+    for source, written, error in results:
+        if error is not None:
+            report.errors.append((source, error))
+        else:
+            report.converted.append((source, written))
+    report.total = time.perf_counter() - start
+    return report
@@ -0,0 +1,381 @@
+"""
+Client swarm for load-testing a running server: many simulated telnet
+players on one asyncio loop, each sending a weighted mix of commands at a
+fixed rate and timing the reply to every one.
+
+A reply is recognised by a marker only that command's own output holds
+(say, gossip and emote carry a token unique to the client and command).
+A descriptor's commands run in the order they were sent, so each client
+matches replies to its outstanding commands first in, first out, reading
+past whatever the rest of the swarm says meanwhile. Sending is open-loop:
+a slow server makes commands queue, and the wait shows in the latencies
+instead of lowering the load.
+
+Every SAMPLE_INTERVAL the swarm records the connected clients, replies,
+latency and (given its pid) the server's resident memory, so a run can be
+read as a timeline as well as a summary.
+"""
+import asyncio
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from collections import deque, namedtuple
+
+HOST = "127.0.0.1"
+PORT = 7777              # src/circlemud.py
+SERVER = os.path.join("src", "circlemud.py")
+
+# What the server sends every new connection (TELNET_GREETING in
+# src/telnet.py): offer MCCP2, ask for NAWS and TTYPE. The swarm never
+# answers, so its output is never compressed.
+TELNET_GREETING = bytes((255, 251, 86, 255, 253, 31, 255, 253, 24))
+
+CONNECT_TIMEOUT = 10.0
+SAMPLE_INTERVAL = 1.0
+
+# Seconds to wait for outstanding replies once sending stops.
+DRAIN_TIMEOUT = 5.0
+
+
+class Command(namedtuple("Command", "text reply")):
+    """
+    A command line and the marker its reply is found by; "{token}" in
+    either is replaced with a token unique to the client and command.
+    """
+    __slots__ = ()
+
+    def render(self, token):
+        if "{token}" not in self.text:
+            return self.text.encode() + b"\r\n", self.reply.encode()
+        return (self.text.format(token=token).encode() + b"\r\n",
+                self.reply.format(token=token).encode())
+
+
+COMMANDS = {
+    "look": Command("look", "[ Exits: "),
+    "score": Command("score", ", level "),
+    "inventory": Command("inventory", "You are carrying:"),
+    "equipment": Command("equipment", "You are using:"),
+    "who": Command("who", " characters displayed."),
+    "say": Command("say {token}", "You say, '{token}'"),
+    "emote": Command("emote waves {token}", " waves {token}\r\n"),
+    "gossip": Command("gossip {token}", "You gossip, '{token}'"),
+}
+
+# Named command mixes: command -> weight.
+MIXES = {
+    "explore": {"look": 4, "score": 2, "inventory": 2, "equipment": 1, "who": 1},
+    "social": {"say": 4, "look": 2, "emote": 1, "gossip": 1, "who": 1, "score": 1},
+    "chat": {"say": 6, "gossip": 2, "look": 1},
+}
+
+
+def parse_mix(spec):
+    """
+    A mix name from MIXES, or "command=weight,..." (a bare command has
+    weight 1). Returns {command: weight}; raises ValueError.
+    """
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in COMMANDS:
+            raise ValueError(f"unknown mix or command '{name}' (mixes: "
+                             f"{', '.join(MIXES)}; commands: "
+                             f"{', '.join(sorted(COMMANDS))})")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"bad weight '{weight}' for {name}") from None
+        if mix[name] < 0:
+            raise ValueError(f"negative weight for {name}")
+    if not any(mix.values()):
+        raise ValueError("mix has no weight")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(values):
+    """
+    Count, p50/p99/p999, max and mean of values (seconds), the times in
+    milliseconds.
+    """
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.5) * 1000, 3),
+        "p99": round(percentile(values, 0.99) * 1000, 3),
+        "p999": round(percentile(values, 0.999) * 1000, 3),
+        "max": round(values[-1] * 1000, 3),
+        "mean": round(sum(values) / len(values) * 1000, 3),
+    }
+
+
+def rss_mb(pid):
+    """
+    Resident memory of a process in MB, or None if it cannot be read
+    (no such process, or no /proc).
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def raise_file_limit(wanted):
+    """
+    Raise the soft open-file limit toward wanted (as far as the hard limit
+    allows). Returns the limit now in force.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, args=(), timeout=60.0):
+    """
+    Start src/circlemud.py on the loopback (from the top of the tree) and
+    wait until it takes connections. Returns the Popen.
+    """
+    server = subprocess.Popen(
+        [sys.executable, SERVER, "--host", HOST, "--port", str(port), *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with status {server.returncode}")
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+class SwarmStats:
+    """
+    Everything the clients of one run measure.
+    """
+    def __init__(self, mix):
+        self.connect = []          # seconds from connect() to the greeting
+        self.connect_failed = 0
+        self.connected = 0         # clients connected now
+        self.disconnected = 0      # closed by the server mid-run
+        self.sent = 0
+        self.unanswered = 0
+        self.bytes_in = 0
+        self.latencies = {name: [] for name in mix}
+        self.recent = []           # latencies since the last sample
+        self.timeline = []
+
+    def answered(self, name, seconds):
+        self.latencies[name].append(seconds)
+        self.recent.append(seconds)
+
+    def sample(self, elapsed, pid):
+        recent, self.recent = self.recent, []
+        latency = summarize(recent)
+        self.timeline.append({
+            "t": round(elapsed, 1),
+            "clients": self.connected,
+            "answered": len(recent),
+            "p50_ms": latency.get("p50"),
+            "p99_ms": latency.get("p99"),
+            "rss_mb": rss_mb(pid) if pid else None,
+        })
+
+
+class Client:
+    """
+    One simulated player: sends commands on a fixed schedule and matches
+    the replies as they come.
+    """
+    def __init__(self, number, stats, mix, rate, rng):
+        self.number = number
+        self.stats = stats
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.interval = 1.0 / rate
+        self.rng = rng
+        self.outstanding = deque()   # (time sent, command name, reply marker)
+        self.sequence = 0
+        self.done = False            # sending has stopped
+
+    async def run(self, host, port, stop_at):
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            stats.connect_failed += 1
+            return
+        try:
+            await asyncio.wait_for(reader.readexactly(len(TELNET_GREETING)),
+                                   CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            stats.connect_failed += 1
+            writer.close()
+            return
+        stats.connect.append(time.perf_counter() - start)
+        stats.connected += 1
+        receiver = asyncio.ensure_future(self.receive(reader))
+        try:
+            await self.send(writer, stop_at)
+            self.done = True
+            if self.outstanding:
+                await asyncio.wait((receiver,), timeout=DRAIN_TIMEOUT)
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            stats.connected -= 1
+            stats.unanswered += len(self.outstanding)
+            self.outstanding.clear()
+            receiver.cancel()
+            writer.close()
+
+    async def send(self, writer, stop_at):
+        loop = asyncio.get_running_loop()
+        # A random phase, so a swarm started at once does not send in step.
+        next_send = loop.time() + self.rng.random() * self.interval
+        while next_send < stop_at:
+            await asyncio.sleep(next_send - loop.time())
+            name = self.rng.choices(self.names, self.weights)[0]
+            self.sequence += 1
+            line, reply = COMMANDS[name].render(f"c{self.number}n{self.sequence}")
+            self.outstanding.append((time.perf_counter(), name, reply))
+            writer.write(line)
+            self.stats.sent += 1
+            await writer.drain()
+            next_send += self.interval
+
+    async def receive(self, reader):
+        """
+        Read until the server closes the connection or, once sending has
+        stopped, nothing is outstanding.
+        """
+        buffer = bytearray()
+        outstanding = self.outstanding
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                self.stats.disconnected += 1
+                return
+            now = time.perf_counter()
+            self.stats.bytes_in += len(data)
+            if not outstanding:
+                continue    # the rest of the swarm talking
+            buffer += data
+            while outstanding:
+                sent, name, reply = outstanding[0]
+                found = buffer.find(reply)
+                if found < 0:
+                    # Keep only what could be the start of the marker.
+                    del buffer[:max(0, len(buffer) - len(reply) + 1)]
+                    break
+                del buffer[:found + len(reply)]
+                outstanding.popleft()
+                self.stats.answered(name, now - sent)
+            if not outstanding:
+                buffer.clear()
+                if self.done:
+                    return
+
+
+async def swarm(host, port, clients, seconds, rate, mix, ramp=0.0, seed=1,
+                pid=None, sample_interval=SAMPLE_INTERVAL):
+    """
+    Run clients players for ramp + seconds: they connect evenly over ramp
+    seconds and send rate commands a second each until the end. Returns
+    (SwarmStats, wall seconds).
+    """
+    loop = asyncio.get_running_loop()
+    stats = SwarmStats(mix)
+    start = loop.time()
+    stop_at = start + ramp + seconds
+    rng = random.Random(seed)
+    members = [Client(n, stats, mix, rate, random.Random(rng.random()))
+               for n in range(clients)]
+
+    async def launch(client, delay):
+        await asyncio.sleep(delay)
+        await client.run(host, port, stop_at)
+
+    async def sampler():
+        while True:
+            await asyncio.sleep(sample_interval)
+            stats.sample(loop.time() - start, pid)
+
+    tasks = [asyncio.ensure_future(launch(client, ramp * n / clients))
+             for n, client in enumerate(members)]
+    sampling = asyncio.ensure_future(sampler())
+    await asyncio.gather(*tasks)
+    sampling.cancel()
+    stats.sample(loop.time() - start, pid)
+    return stats, loop.time() - start
+
+
+def report(stats, wall, cpu, pid, config):
+    """
+    The results of a run as a JSON-ready dict.
+    """
+    every = [value for values in stats.latencies.values() for value in values]
+    answered = len(every)
+    rss = [sample["rss_mb"] for sample in stats.timeline
+           if sample["rss_mb"] is not None]
+    return {
+        "config": config,
+        "connect": {
+            "attempted": config["clients"],
+            "connected": len(stats.connect),
+            "failed": stats.connect_failed,
+            "disconnected": stats.disconnected,
+            "ms": summarize(stats.connect),
+        },
+        "commands": {
+            "sent": stats.sent,
+            "answered": answered,
+            "unanswered": stats.unanswered,
+            "per_second": round(answered / wall, 1) if wall else None,
+        },
+        "latency_ms": {
+            "all": summarize(every),
+            **{name: summarize(values)
+               for name, values in sorted(stats.latencies.items())},
+        },
+        "bytes_in": stats.bytes_in,
+        "seconds": round(wall, 3),
+        "client_cpu_seconds": round(cpu, 3),
+        "server": {
+            "pid": pid,
+            "rss_mb": {"start": rss[0], "end": rss[-1], "max": max(rss)}
+                      if rss else None,
+        },
+        "timeline": stats.timeline,
+    }
@@ -0,0 +1,261 @@
+"""
+World boot: find every zone file under a directory, parse them in parallel
+and merge the results into one zone table.
+"""
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.worldcache import WorldCache
+from lib.zone import ResetCommandTable, ZoneFormatError
+from lib.zoneformat import ZONE_EXTENSIONS, ZONE_FORMATS, load_zone
+from lib.zoneindex import VnumIndex, ZoneOverlapError
+
+ZONE_DIR = os.path.join("data", "zones")
+
+# Below this many files a process pool costs more than it saves.
+PARALLEL_MIN_FILES = 8
+
+
+def zone_file_key(path):
+    """
+    A zone file's directory and name without its zone extensions, so that
+    0.zon and the 0.zon.json5 and 0.zon.yaml converted from it share a key.
+    """
+    head, name = os.path.split(path)
+    base, ext = os.path.splitext(name)
+    while ext in ZONE_EXTENSIONS:
+        name = base
+        base, ext = os.path.splitext(name)
+    return head, name
+
+
+def discover_zone_files(root=ZONE_DIR):
+    """
+    Every zone file under root, in sorted order. Empty files (placeholders
+    such as data/zones/yaml/0.zon.yaml) hold no zone and are left out.
+    The converters write next to their source, so of the files sharing a
+    zone_file_key() only one is kept: the format registered first, i.e.
+    .zon, then .json5, then .yaml.
+    """
+    ranks = {name: rank for rank, name in enumerate(ZONE_FORMATS)}
+    chosen = {}    # zone_file_key -> (rank, path)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            fmt = ZONE_EXTENSIONS.get(os.path.splitext(name)[1])
+            if fmt is None:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getsize(path) == 0:
+                    continue
+            except OSError:
+                pass    # gone already; the parse will report it
+            key = zone_file_key(path)
+            rank = ranks[fmt.name]
+            if key not in chosen or rank < chosen[key][0]:
+                chosen[key] = (rank, path)
+    return sorted(path for rank, path in chosen.values())
+
+
+def parse_zone_file(path):
+    """
+    Parse one zone file. Runs in a worker process, so errors come back as
+    text instead of being raised. Returns (path, zone, seconds, error).
+    """
+    start = time.perf_counter()
+    try:
+        zone = load_zone(path)
+        error = None
+    except (OSError, ZoneFormatError) as e:
+        zone = None
+        error = str(e)
+    return path, zone, time.perf_counter() - start, error
+
+
+class BootReport:
+    """
+    Timings and problems from one boot_world() run.
+    """
+    def __init__(self):
+        self.zones = []    # (path, zone number, command count, seconds)
+        self.errors = []   # (path, message)
+        self.workers = 1
+        self.cache_hits = 0
+        self.index = None  # VnumIndex of the booted zones
+        self.total = 0.0
+
+    def summary(self):
+        parse_time = sum(entry[3] for entry in self.zones)
+        return (f"Booted {len(self.zones)} zones in {self.total * 1000:.1f} ms "
+                f"({parse_time * 1000:.1f} ms parsing, {self.workers} workers, "
+                f"{self.cache_hits} cached, {len(self.errors)} errors)")
+
+    def lines(self):
+        for path, number, ncmds, seconds in sorted(self.zones, key=lambda e: -e[3]):
+            yield f"{seconds * 1000:8.2f} ms  zone {number:<5} {ncmds:>7} cmds  {path}"
+        for path, message in self.errors:
+            yield f"SYSERR: {message}"
+
+
+def boot_world(root=ZONE_DIR, workers=None, cache_path=None):
+    """
+    Parse every zone under root, using a process pool when there are enough
+    files to be worth it. Returns (zone_table, report); the table is sorted
+    by vnum range and indexed in report.index. Zones that fail to parse,
+    reuse a zone number or overlap another zone's vnum range are left out
+    and listed in report.errors.
+
+    With cache_path, unchanged zones come from the binary world cache and
+    only new or modified files are parsed; the cache is then rewritten.
+    """
+    start = time.perf_counter()
+    report = BootReport()
+    paths = discover_zone_files(root)
+
+    cache = None
+    cached = []
+    if cache_path is not None:
+        cache = WorldCache(cache_path).load()
+        cache.prune(paths)
+        misses = []
+        for path in paths:
+            lookup_start = time.perf_counter()
+            zone = cache.lookup(path)
+            if zone is None:
+                misses.append(path)
+            else:
+                cached.append((path, zone, time.perf_counter() - lookup_start, None))
+        report.cache_hits = len(cached)
+        paths = misses
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+    if workers == 1 or len(paths) < PARALLEL_MIN_FILES:
+        report.workers = 1
+        results = [parse_zone_file(path) for path in paths]
+    else:
+        report.workers = workers
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(parse_zone_file, paths, chunksize=chunksize))
+
+    if cache is not None:
+        for path, zone, seconds, error in results:
+            if error is None:
+                cache.store(path, zone)
+        cache.save()
+    results = sorted(cached + results, key=lambda r: r[0])
+    zone_table = index_zones(results, report)
+    report.total = time.perf_counter() - start
+    return zone_table, report
+
+
+def index_zones(results, report, count=lambda zone: len(zone.cmd)):
+    """
+    Merge parse_zone_file() results into report.index, listing problems
+    in report.errors. Returns the zones in vnum order.
+    """
+    index = VnumIndex()
+    loaded_from = {}   # zone number -> path
+    for path, zone, seconds, error in results:
+        if error is not None:
+            report.errors.append((path, error))
+            continue
+        if zone.number in loaded_from:
+            report.errors.append(
+                (path, f"Zone {zone.number} in {path} is already loaded from "
+                       f"{loaded_from[zone.number]}; ignoring it"))
+            continue
+        try:
+            index.add_zone(zone)
+        except ZoneOverlapError as e:
+            report.errors.append((path, f"{e} in {path}; ignoring it"))
+            continue
+        loaded_from[zone.number] = path
+        report.zones.append((path, zone.number, count(zone), seconds))
+    report.index = index
+    return list(index.zones)
+
+
+class LazyZone:
+    """
+    A zone booted from its header alone. The reset commands are read from
+    path the first time cmd is used, and unload() lets them go again.
+    """
+    __slots__ = ('number', 'name', 'bot', 'top', 'lifespan', 'reset_mode',
+                 'path', '_cmd')
+
+    def __init__(self, zone, path, cmd=None):
+        self.number = zone.number
+        self.name = zone.name
+        self.bot = zone.bot
+        self.top = zone.top
+        self.lifespan = zone.lifespan
+        self.reset_mode = zone.reset_mode
+        self.path = path
+        self._cmd = cmd
+
+    def __repr__(self):
+        state = "loaded" if self._cmd is not None else "header"
+        return f"<LazyZone {self.number} {self.bot}-{self.top} {state}>"
+
+    @property
+    def loaded(self):
+        return self._cmd is not None
+
+    @property
+    def cmd(self):
+        if self._cmd is None:
+            self.load()
+        return self._cmd
+
+    def load(self):
+        """
+        Read the reset commands from the file. Returns None, or the error
+        if the file no longer holds this zone; the zone then has no
+        commands until it is loaded again.
+        """
+        path, zone, seconds, error = parse_zone_file(self.path)
+        if error is None and zone.number != self.number:
+            error = f"{path} now holds zone {zone.number}, not {self.number}"
+        if error is not None:
+            self._cmd = ResetCommandTable()
+            self._cmd.append('S')
+            return error
+        self._cmd = zone.cmd
+        return None
+
+    def unload(self):
+        self._cmd = None
+
+
+def parse_zone_header(path):
+    """
+    parse_zone_file() for lazy boots: the result is a LazyZone.
+    """
+    start = time.perf_counter()
+    try:
+        zone = LazyZone(load_zone(path, header_only=True), path)
+        error = None
+    except (OSError, ZoneFormatError) as e:
+        zone = None
+        error = str(e)
+    return path, zone, time.perf_counter() - start, error
+
+
+def boot_headers(root=ZONE_DIR):
+    """
+    boot_world() without the reset commands: every zone under root as a
+    LazyZone, in vnum order. Reading headers is cheap enough that there is
+    no process pool and no cache.
+    """
+    start = time.perf_counter()
+    report = BootReport()
+    results = [parse_zone_header(path) for path in discover_zone_files(root)]
+    zone_table = index_zones(results, report, count=lambda zone: 0)
+    report.total = time.perf_counter() - start
+    return zone_table, report
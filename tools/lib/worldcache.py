@@ -0,0 +1,137 @@
+"""
+Binary snapshot of the parsed world, so a boot only re-parses the zone
+files that changed since the last one.
+
+The cache is a single marshal blob mapping each source path to its stat
+signature, content hash and parsed zone. Reset command columns are stored
+as raw array bytes, so loading a zone is a handful of memcpy calls. An
+entry is used as-is when the file's size and mtime are unchanged; when
+they differ the file is hashed, and only a real content change sends it
+back to the parser.
+
+The cache is only a shortcut: one that cannot be written (a read-only
+checkout, say) is logged and the boot goes on without it.
+"""
+import hashlib
+import marshal
+import os
+import sys
+
+from lib.zone import ZoneData, log
+
+WORLD_CACHE = os.path.join("data", "world.cache")
+
+# Bump whenever the snapshot layout or what the parser puts in it changes;
+# older caches are then ignored. 3: names decoded as UTF-8, not latin-1.
+CACHE_VERSION = 3
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def zone_to_record(zone):
+    cmd = zone.cmd
+    cmds = (bytes(cmd.command), cmd.if_flag.tobytes(), cmd.arg1.tobytes(),
+            cmd.arg2.tobytes(), cmd.arg3.tobytes(), cmd.line.tobytes(),
+            cmd.comment.tobytes(), tuple(cmd.comments))
+    return (zone.number, zone.name, zone.bot, zone.top, zone.lifespan,
+            zone.reset_mode, cmds)
+
+
+def zone_from_record(record):
+    zone = ZoneData()
+    (zone.number, zone.name, zone.bot, zone.top, zone.lifespan,
+     zone.reset_mode, cmds) = record
+    cmd = zone.cmd
+    cmd.command[:] = cmds[0]
+    cmd.if_flag.frombytes(cmds[1])
+    cmd.arg1.frombytes(cmds[2])
+    cmd.arg2.frombytes(cmds[3])
+    cmd.arg3.frombytes(cmds[4])
+    cmd.line.frombytes(cmds[5])
+    cmd.comment.frombytes(cmds[6])
+    cmd.comments = [sys.intern(c) for c in cmds[7]]
+    cmd.comment_ids = {c: i for i, c in enumerate(cmd.comments)}
+    return zone
+
+
+class WorldCache:
+    """
+    In-memory view of the cache file: path -> (mtime_ns, size, digest, record).
+    """
+    def __init__(self, path=WORLD_CACHE):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+
+    def load(self):
+        """
+        Read the cache file. A missing, stale-version or corrupt cache just
+        means starting empty.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                # One read and loads(); load(f) makes many small reads.
+                data = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return self
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            self.entries = data["zones"]
+        return self
+
+    def lookup(self, path):
+        """
+        The cached zone for path if the file is unchanged, else None.
+        """
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        mtime_ns, size, digest, record = entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_mtime_ns != mtime_ns or st.st_size != size:
+            # Touched but maybe not changed (checkout, copy); trust the hash.
+            if file_digest(path) != digest:
+                return None
+            self.entries[path] = (st.st_mtime_ns, st.st_size, digest, record)
+            self.dirty = True
+        return zone_from_record(record)
+
+    def store(self, path, zone):
+        try:
+            st = os.stat(path)
+            digest = file_digest(path)
+        except OSError:
+            return
+        self.entries[path] = (st.st_mtime_ns, st.st_size, digest,
+                              zone_to_record(zone))
+        self.dirty = True
+
+    def prune(self, keep):
+        """
+        Drop entries for files that no longer exist in the world.
+        """
+        for path in set(self.entries) - set(keep):
+            del self.entries[path]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(marshal.dumps({"version": CACHE_VERSION, "zones": self.entries}))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log("SYSERR: Cannot write world cache %s: %s", self.path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.dirty = False
@@ -0,0 +1,229 @@
+"""
+Memory-mapped world image: every zone and its reset commands in one
+immutable file of fixed-layout records.
+
+Where the world cache (worldcache.py) is unpacked into each process's own
+arrays, the image is mapped and read in place. The command columns handed
+out by ImageCommandTable are memoryview slices of the mapping, so a
+process that maps the image copies nothing, and every process mapping the
+same file shares the same page cache pages. Opening an image only reads
+the header and the zone records.
+
+Layout (native byte order, which the header records):
+
+    header       HEADER
+    zones        ZONE_RECORD x zone_count
+    commands     command letters, 1 byte x cmd_count, padded to 4;
+                 then if_flag, arg1, arg2, arg3, line, comment columns,
+                 int32 x cmd_count each
+    strings      end offsets, uint32 x string_count; then UTF-8 text
+
+Zone names, source paths and command comments are string ids. There is
+no prototype section: with no mob or object files yet, prototypes are
+the handles World makes on first use, and the reset programs that need
+them are linked in each process.
+"""
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+
+from lib.zone import ResetCommandTable
+
+WORLD_IMAGE = os.path.join("data", "world.img")
+
+MAGIC = b"CMWI"
+IMAGE_VERSION = 2
+
+# magic, version, byte order (1 little, 2 big), zone_count, cmd_count,
+# string_count, then the offset of each section.
+HEADER = struct.Struct("=4sIIIIIIII")
+# number, bot, top, lifespan, reset_mode, name id, path id, first command,
+# command count.
+ZONE_RECORD = struct.Struct("=iiiiiIIII")
+
+COLUMNS = ('if_flag', 'arg1', 'arg2', 'arg3', 'line', 'comment')
+
+BYTE_ORDER = 1 if sys.byteorder == "little" else 2
+
+
+class WorldImageError(Exception):
+    """
+    Raised for a file that is not a world image this code can read.
+    """
+
+
+class StringPool:
+    """
+    Strings while writing: text -> id, first come first numbered.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+
+def write_image(path, zones, paths=None):
+    """
+    Write zones (sorted by vnum, as in zone_table) to an image at path.
+    paths maps zone number -> source file, kept so a zone can be reloaded.
+    """
+    paths = paths or {}
+    strings = StringPool()
+    strings.add("")
+    zone_records = []
+    command = bytearray()
+    columns = {name: array('i') for name in COLUMNS}
+    for zone in zones:
+        cmd = zone.cmd
+        zone_records.append(ZONE_RECORD.pack(
+            zone.number, zone.bot, zone.top, zone.lifespan, zone.reset_mode,
+            strings.add(zone.name), strings.add(paths.get(zone.number, "")),
+            len(command), len(cmd)))
+        command += cmd.command
+        for name in COLUMNS[:-1]:
+            columns[name].extend(getattr(cmd, name))
+        columns['comment'].extend(strings.add(cmd.comments[i])
+                                  for i in cmd.comment)
+
+    text = bytearray()
+    ends = array('I')
+    for string in strings.strings:
+        text += string.encode('utf-8')
+        ends.append(len(text))
+
+    zone_offset = HEADER.size
+    cmd_offset = zone_offset + ZONE_RECORD.size * len(zone_records)
+    padded = len(command) + (-len(command) % 4)
+    string_offset = cmd_offset + padded + 4 * len(COLUMNS) * len(command)
+    header = HEADER.pack(MAGIC, IMAGE_VERSION, BYTE_ORDER, len(zone_records),
+                         len(command), len(strings.strings), zone_offset,
+                         cmd_offset, string_offset)
+
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(header)
+        f.write(b"".join(zone_records))
+        f.write(command)
+        f.write(bytes(padded - len(command)))
+        for name in COLUMNS:
+            f.write(columns[name])
+        f.write(ends)
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class ImageStrings:
+    """
+    The image's string table, decoded on access.
+    """
+    __slots__ = ('ends', 'text')
+
+    def __init__(self, ends, text):
+        self.ends = ends
+        self.text = text
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, string_id):
+        start = self.ends[string_id - 1] if string_id else 0
+        return str(self.text[start:self.ends[string_id]], 'utf-8')
+
+
+class ImageCommandTable(ResetCommandTable):
+    """
+    A zone's reset commands read straight out of the image. Same interface
+    as ResetCommandTable, but read-only: the columns are memoryviews.
+    """
+    __slots__ = ()
+
+    def __init__(self, command, columns, comments):
+        self.command = command
+        (self.if_flag, self.arg1, self.arg2, self.arg3, self.line,
+         self.comment) = columns
+        self.comments = comments
+        self.comment_ids = None
+
+    def append(self, *args, **kwargs):
+        raise TypeError("a world image is read-only")
+
+    def rows(self):
+        return zip(str(self.command, 'latin-1'), self.if_flag,
+                   self.arg1, self.arg2, self.arg3)
+
+
+class ImageZone:
+    """
+    A zone out of the image, in place of ZoneData.
+    """
+    __slots__ = ('number', 'name', 'bot', 'top', 'lifespan', 'reset_mode',
+                 'path', 'cmd')
+
+    def __repr__(self):
+        return f"<ImageZone {self.number} {self.bot}-{self.top}>"
+
+
+class WorldImage:
+    """
+    A mapped world image. zones lists ImageZones in vnum order.
+    """
+    def __init__(self, path=WORLD_IMAGE):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:   # empty file
+                raise WorldImageError(f"{path} is empty")
+        buf = self.buf = memoryview(self.map)
+        if len(buf) < HEADER.size:
+            raise WorldImageError(f"{path} is truncated")
+        (magic, version, byte_order, zone_count, cmd_count, string_count,
+         zone_offset, cmd_offset, string_offset) = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != IMAGE_VERSION:
+            raise WorldImageError(f"{path} is not a version {IMAGE_VERSION} "
+                                  f"world image")
+        if byte_order != BYTE_ORDER:
+            raise WorldImageError(f"{path} was written on a machine with the "
+                                  f"other byte order")
+
+        def ints(offset, count, code='i'):
+            return buf[offset:offset + 4 * count].cast(code)
+
+        ends = ints(string_offset, string_count, 'I')
+        text_start = string_offset + 4 * string_count
+        if string_count and text_start + ends[-1] > len(buf):
+            raise WorldImageError(f"{path} is truncated")
+        self.strings = ImageStrings(ends, buf[text_start:])
+
+        command = buf[cmd_offset:cmd_offset + cmd_count]
+        column_offset = cmd_offset + cmd_count + (-cmd_count % 4)
+        columns = [ints(column_offset + 4 * cmd_count * i, cmd_count)
+                   for i in range(len(COLUMNS))]
+
+        self.zones = []
+        for i in range(zone_count):
+            (number, bot, top, lifespan, reset_mode, name_id, path_id,
+             first, count) = ZONE_RECORD.unpack_from(
+                buf, zone_offset + i * ZONE_RECORD.size)
+            zone = ImageZone()
+            zone.number = number
+            zone.name = self.strings[name_id]
+            zone.bot = bot
+            zone.top = top
+            zone.lifespan = lifespan
+            zone.reset_mode = reset_mode
+            zone.path = self.strings[path_id]
+            end = first + count
+            zone.cmd = ImageCommandTable(
+                command[first:end], [column[first:end] for column in columns],
+                self.strings)
+            self.zones.append(zone)
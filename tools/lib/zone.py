@@ -1,25 +1,6 @@
-# TODO: Implement or import these utilities as needed
-def get_line(file_obj):
-    """
-    Mimic the get_line(FILE *fl, char *buf) behavior:
-    - Reads a single line from file_obj.
-    - Returns the line stripped of trailing newline.
-    - Returns None or empty if EOF is reached.
-    - For convenience, might also return the number of lines read (1 or 0).
-    """
-    # Example stub implementation:
-    line = file_obj.readline()
-    if not line:
-        return None, 0
-    return line.rstrip('\n'), 1
-
+import sys
 
-def skip_spaces(line):
-    """
-    Mimic skip_spaces(&ptr) by returning the string with leading
-    whitespace removed.
-    """
-    return line.lstrip() if line else line
+from array import array
 
 
 def log(message, *args):
@@ -31,26 +12,123 @@ def log(message, *args):
     print(message % args if args else message)
 
 
-def exit_with_error(code=1):
+class ZoneFormatError(Exception):
+    """
+    Raised when a zone file cannot be parsed. Carries the file name and
+    line number so the caller can report it (or skip the zone) instead of
+    the whole process exiting.
+    """
+    def __init__(self, zonename, line_num, message):
+        self.zonename = zonename
+        self.line_num = line_num
+        self.message = message
+        super().__init__(f"{message} in {zonename}, line {line_num}")
+
+
+class ResetCommandTable:
     """
-    Mimic exit(1) from C.
+    A zone's reset commands ('struct reset_com' array) stored as columns:
+    one typed array per field instead of one Python object per command.
+    Comments are interned and kept in a side pool, referenced by index.
+    Indexing or iterating yields ResetCommand views, so code written for
+    the old per-command objects keeps working.
     """
-    import sys
-    sys.exit(code)
+    __slots__ = ('command', 'if_flag', 'arg1', 'arg2', 'arg3', 'line',
+                 'comment', 'comments', 'comment_ids')
+
+    def __init__(self):
+        self.command = bytearray()    # command letter, as a byte
+        self.if_flag = array('i')
+        self.arg1 = array('i')
+        self.arg2 = array('i')
+        self.arg3 = array('i')
+        self.line = array('i')
+        self.comment = array('i')     # index into self.comments
+        self.comments = [""]
+        self.comment_ids = {"": 0}
+
+    def append(self, command, if_flag=0, arg1=0, arg2=0, arg3=0, line=0,
+               comment=""):
+        self.command.append(ord(command))
+        self.if_flag.append(if_flag)
+        self.arg1.append(arg1)
+        self.arg2.append(arg2)
+        self.arg3.append(arg3)
+        self.line.append(line)
+        comment_id = self.comment_ids.get(comment)
+        if comment_id is None:
+            comment_id = self.comment_ids[comment] = len(self.comments)
+            self.comments.append(sys.intern(comment))
+        self.comment.append(comment_id)
+
+    def __len__(self):
+        return len(self.command)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.command)
+        if not 0 <= index < len(self.command):
+            raise IndexError("reset command index out of range")
+        return ResetCommand(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.command)):
+            yield ResetCommand(self, index)
+
+    def rows(self):
+        """
+        Iterate plain (command, if_flag, arg1, arg2, arg3) tuples straight
+        off the columns; the fast path for code that walks every command.
+        A walk that needs only some fields is faster zipping just those
+        columns: building five-field rows costs more than reading the
+        attributes of per-command objects did.
+        """
+        return zip(self.command.decode('latin-1'), self.if_flag,
+                   self.arg1, self.arg2, self.arg3)
+
+
+def _column(name, doc):
+    def get(self):
+        return getattr(self.table, name)[self.index]
+
+    def set(self, value):
+        getattr(self.table, name)[self.index] = value
+
+    return property(get, set, doc=doc)
 
 
 class ResetCommand:
     """
     Python equivalent of 'struct reset_com' with the fields used in the code.
+    A lightweight view of one row in a ResetCommandTable.
     """
-    def __init__(self):
-        self.command = None
-        self.if_flag = 0
-        self.arg1 = 0
-        self.arg2 = 0
-        self.arg3 = 0
-        self.line = 0
-        self.command_comment = ""
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def command(self):
+        return chr(self.table.command[self.index])
+
+    @command.setter
+    def command(self, value):
+        self.table.command[self.index] = ord(value)
+
+    if_flag = _column('if_flag', "Run only if the previous command succeeded.")
+    arg1 = _column('arg1', "First argument, usually a mob/obj/room vnum.")
+    arg2 = _column('arg2', "Second argument, usually max_existing.")
+    arg3 = _column('arg3', "Third argument, usually a room or position.")
+    line = _column('line', "Source line (or command index) for diagnostics.")
+
+    @property
+    def command_comment(self):
+        return self.table.comments[self.table.comment[self.index]]
+
+    def __repr__(self):
+        return (f"<ResetCommand {self.command} {self.if_flag} {self.arg1} "
+                f"{self.arg2} {self.arg3}>")
 
 
 class ZoneData:
@@ -64,124 +142,58 @@ class ZoneData:
         self.top = 0
         self.lifespan = 0
         self.reset_mode = 0
-        self.cmd = []  # Will hold a list of ResetCommand objects
+        self.cmd = ResetCommandTable()
 
 
-# Pretend we have a global table or a variable to track the top of the zone table
-top_of_zone_table = 0
+# Commands taking if_flag plus three arguments; "G" and "R" take two.
+CMD_4ARG = frozenset("MOEPD")
+CMD_3ARG = frozenset("GR")
 
 
-def load_zones(file_obj, zonename):
+def load_zones(lines, zonename, header_only=False):
     """
     Rough Python translation of the CircleMUD load_zones() function.
-    Reads zone information from an open file object (file_obj).
-    """
-    global top_of_zone_table
-
-    # Static-like variable from C:
-    # 'static zone_rnum zone = 0;' 
-    # Python won't keep static across calls in the same way,
-    # but we'll mimic by making it global or using an outer scope tracker.
-    # For demonstration, let's assume we have a global or external
-    # variable that increments each time we load a zone.
-    zone_rnum = top_of_zone_table  
 
-    # Create a new zone data object
+    Parses a zone in a single pass over 'lines', which can be any iterable
+    of text or bytes lines: an open file, a list, or iter(mm.readline, b"")
+    over a memory-mapped file; bytes are decoded as UTF-8, the encoding
+    text-mode reads used. Raises ZoneFormatError on bad input. With
+    header_only, stops after the numeric constants line and leaves the
+    commands unread (cmd is None).
+    """
     zone_data = ZoneData()
-
-    # We'll keep track of how many lines we've read
+    lines = iter(lines)
     line_num = 0
-    num_of_cmds = 0
-
-    # Skip first 3 lines (as in the original C code)
-    for _ in range(3):
-        line, lines_read = get_line(file_obj)
-        line_num += lines_read
-
-    # Count how many commands are in the zone
-    while True:
-        position = file_obj.tell()  # remember file position
-        line, lines_read = get_line(file_obj)
-        if not line:
-            # Reached EOF
-            break
-
-        # We only increment line_num after we confirm there's a line
-        line_num += lines_read
 
-        if ((line[0] in "MOPGERD" and len(line) > 1 and line[1] == ' ')
-                or (line[0] == 'S' and len(line) == 1)):
-            num_of_cmds += 1
-
-        # Move the file pointer back so we can read the lines again
-        file_obj.seek(position)
-        break  # break out of loop so we don't skip reading lines again
-
-    # We need to continue scanning the file to count all commands
-    while True:
-        position = file_obj.tell()
-        line, lines_read = get_line(file_obj)
-        if not line:
-            break
-        line_num += lines_read
-
-        if ((line[0] in "MOPGERD" and len(line) > 1 and line[1] == ' ')
-                or (line[0] == 'S' and len(line) == 1)):
-            num_of_cmds += 1
-
-    # Rewind the file
-    file_obj.seek(0)
-    line_num = 0  # reset line count for our real read
-
-    # If no commands, bail out
-    if num_of_cmds == 0:
-        log("SYSERR: %s is empty!", zonename)
-        exit_with_error(1)
-
-    # In C, we'd do: CREATE(Z.cmd, struct reset_com, num_of_cmds)
-    # In Python, we don't need to allocate upfront.
-
-    # Read the first line (should be '#<zone_number>')
-    line, lines_read = get_line(file_obj)
-    line_num += lines_read
-    if not line:
-        log("SYSERR: Empty file when expecting zone header: %s", zonename)
-        exit_with_error(1)
-
-    # Expecting something like "#123"
-    if not line.startswith("#"):
-        log("SYSERR: Format error in %s, line %d", zonename, line_num)
-        exit_with_error(1)
-
-    # Parse the zone number
-    # In the C code: sscanf(buf, "#%hd", &Z.number)
+    def header_line(what):
+        nonlocal line_num
+        line = next(lines, None)
+        if line is None:
+            raise ZoneFormatError(zonename, line_num,
+                                  f"Unexpected EOF reading {what}")
+        line_num += 1
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        return line.rstrip('\r\n')
+
+    # First line is the zone number, e.g. "#123"
+    line = header_line("zone header")
     try:
-        zone_data.number = int(line[1:])  # skip '#'
-    except ValueError:
-        log("SYSERR: Format error in %s, line %d", zonename, line_num)
-        exit_with_error(1)
-
-    # Next line is the zone name (may have a '~' to strip)
-    line, lines_read = get_line(file_obj)
-    line_num += lines_read
-    if line is None:
-        log("SYSERR: Unexpected EOF reading zone name in %s", zonename)
-        exit_with_error(1)
-
-    # If there's a '~', strip it
+        if not line.startswith("#"):
+            raise ValueError
+        zone_data.number = int(line[1:].split()[0])
+    except (IndexError, ValueError):
+        raise ZoneFormatError(zonename, line_num, "Format error in zone header")
+
+    # Next line is the zone name, terminated by '~'
+    line = header_line("zone name")
     idx = line.find('~')
     if idx != -1:
         line = line[:idx]
     zone_data.name = line
 
-    # Next line should have 4 numeric constants: bot, top, lifespan, reset_mode
-    line, lines_read = get_line(file_obj)
-    line_num += lines_read
-    if line is None:
-        log("SYSERR: Unexpected EOF reading numeric constants in %s", zonename)
-        exit_with_error(1)
-
-    # C code: sscanf(buf, " %hd %hd %d %d ", &Z.bot, &Z.top, &Z.lifespan, &Z.reset_mode)
+    # Then: bot, top, lifespan, reset_mode
+    line = header_line("numeric constants")
     try:
         parts = line.split()
         zone_data.bot = int(parts[0])
@@ -189,134 +201,148 @@ def load_zones(file_obj, zonename):
         zone_data.lifespan = int(parts[2])
         zone_data.reset_mode = int(parts[3])
     except (IndexError, ValueError):
-        log("SYSERR: Format error in numeric constant line of %s", zonename)
-        exit_with_error(1)
+        raise ZoneFormatError(zonename, line_num,
+                              "Format error in numeric constant line")
 
     if zone_data.bot > zone_data.top:
-        log("SYSERR: Zone %d bottom (%d) > top (%d).", 
-            zone_data.number, zone_data.bot, zone_data.top)
-        exit_with_error(1)
-
-    # Now read the commands
-    cmd_no = 0
-    while True:
-        line, lines_read = get_line(file_obj)
-        if line is None:
-            # Reached EOF unexpectedly
-            log("SYSERR: Format error in %s - premature end of file", zonename)
-            exit_with_error(1)
-        line_num += lines_read
-
-        line = skip_spaces(line)
-
-        if not line:
-            # empty line or comment, just skip
+        raise ZoneFormatError(
+            zonename, line_num,
+            f"Zone {zone_data.number} bottom ({zone_data.bot}) > top ({zone_data.top})")
+
+    if header_only:
+        zone_data.cmd = None
+        return zone_data
+
+    # Now the commands, up to 'S' or '$'
+    add_cmd = zone_data.cmd.append
+    decode = None
+    for line in lines:
+        line_num += 1
+        if decode is None:
+            decode = isinstance(line, bytes)
+        if decode:
+            line = line.decode('utf-8', 'replace')
+        line = line.strip()
+
+        # Empty lines and '*' comments
+        if not line or line[0] == '*':
             continue
 
         cmd_char = line[0]
-
-        # If line starts with '*', it's a comment
-        if cmd_char == '*':
-            continue
-
-        # If 'S' or '$', we set the command to 'S' and break
-        if cmd_char in ['S', '$']:
-            # This matches the C code: if (ZCMD.command == 'S' || ZCMD.command == '$')
-            # we treat it as a 'S' command and break from reading more commands
-            reset_cmd = ResetCommand()
-            reset_cmd.command = 'S'
-            zone_data.cmd.append(reset_cmd)
+        if cmd_char == 'S' or cmd_char == '$':
+            add_cmd('S', line=line_num)
             break
 
-        # Otherwise, parse the command
-        reset_cmd = ResetCommand()
-        reset_cmd.command = cmd_char
-
-        # The rest of the line is after the command char
-        args_str = line[1:].strip()
-
-        # The code checks if the command is one that takes 3 arguments vs 4
-        # In the C code, 3-arg commands are "G E R" etc., 4-arg commands are "M O P D"
-        # Actually, the snippet says: if (strchr("MOEPD", ZCMD.command) == NULL) ...
-        # i.e. if command is NOT in "MOEPD", it uses the 3-arg version,
-        # else it uses the 4-arg version.
-        '''
-        if cmd_char not in "MOEPD":
-            # 3-arg command
-            try:
-                # Format: if_flag arg1 arg2
-                parts = args_str.split()
-                reset_cmd.if_flag = int(parts[0])
-                reset_cmd.arg1 = int(parts[1])
-                reset_cmd.arg2 = int(parts[2])
-            except (IndexError, ValueError):
-                log("SYSERR: Format error in %s, line %d: '%s'", zonename, line_num, line)
-                exit_with_error(1)
-        else:
-            # 4-arg command
-            try:
-                # Format: if_flag arg1 arg2 arg3
-                parts = args_str.split()
-                reset_cmd.if_flag = int(parts[0])
-                reset_cmd.arg1 = int(parts[1])
-                reset_cmd.arg2 = int(parts[2])
-                reset_cmd.arg3 = int(parts[3])
-            except (IndexError, ValueError):
-                log("SYSERR: Format error in %s, line %d: '%s'", zonename, line_num, line)
-                exit_with_error(1)
-
-        reset_cmd.line = line_num
-        zone_data.cmd.append(reset_cmd)
-        cmd_no += 1
-        '''
-        
-        import re
-
-        if cmd_char in "MOEPD":
-            # Expect exactly 4 integers + optional trailing text
-            # We'll use a regex to capture up to 4 integers, plus the leftover
-            match = re.match(r'^\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)(.*)$', args_str)
-            if not match:
-                log("SYSERR: Format error in %s, line %d: '%s'", zonename, line_num, line)
-                exit_with_error(1)
-
-            reset_cmd.if_flag = int(match.group(1))
-            reset_cmd.arg1   = int(match.group(2))
-            reset_cmd.arg2   = int(match.group(3))
-            reset_cmd.arg3   = int(match.group(4))
-
-            # leftover is group(5)
-            leftover = match.group(5).strip()
-            reset_cmd.command_comment = leftover  # store e.g. "Puff"
+        # "M 0 900 3 915   Homba": command, if_flag, args, then a comment.
+        if cmd_char in CMD_4ARG:
+            parts = line.split(None, 5)
+            nargs = 5
+        elif cmd_char in CMD_3ARG:
+            parts = line.split(None, 4)
+            nargs = 4
         else:
-            # Expect exactly 3 integers + optional trailing text
-            match = re.match(r'^\s*(\d+)\s+(\d+)\s+(\d+)(.*)$', args_str)
-            if not match:
-                log("SYSERR: Format error in %s, line %d: '%s'", zonename, line_num, line)
-                exit_with_error(1)
-
-            reset_cmd.if_flag = int(match.group(1))
-            reset_cmd.arg1   = int(match.group(2))
-            reset_cmd.arg2   = int(match.group(3))
-
-            # leftover is group(4)
-            leftover = match.group(4).strip()
-            reset_cmd.command_comment = leftover
-
-        zone_data.cmd.append(reset_cmd)
-        cmd_no += 1
-
-    # We expect num_of_cmds to match cmd_no + 1
-    # (the +1 presumably for the final 'S' command)
-    if num_of_cmds != cmd_no + 1:
-        log("SYSERR: Zone command count mismatch for %s. Estimated: %d, Actual: %d",
-            zonename, num_of_cmds, cmd_no + 1)
-        exit_with_error(1)
-
-    # Finally, increment our "top_of_zone_table"
-    top_of_zone_table = zone_rnum + 1
-
-    # Return the zone data (or you could store it globally, etc.)
+            raise ZoneFormatError(zonename, line_num,
+                                  f"Unknown zone command '{cmd_char}'")
+        if len(parts[0]) != 1 or len(parts) < nargs:
+            raise ZoneFormatError(zonename, line_num, f"Format error: '{line}'")
+
+        try:
+            if_flag = int(parts[1])
+            arg1 = int(parts[2])
+            arg2 = int(parts[3])
+            arg3 = int(parts[4]) if nargs == 5 else 0
+        except ValueError:
+            raise ZoneFormatError(zonename, line_num, f"Format error: '{line}'")
+        try:
+            add_cmd(cmd_char, if_flag, arg1, arg2, arg3, line_num,
+                    parts[nargs] if len(parts) > nargs else "")
+        except OverflowError:
+            # The columns are C ints; the zone is dropped, so the partly
+            # appended row does not matter.
+            raise ZoneFormatError(zonename, line_num,
+                                  f"Argument out of range: '{line}'")
+    else:
+        if not zone_data.cmd:
+            raise ZoneFormatError(zonename, line_num, "Zone file is empty")
+        raise ZoneFormatError(zonename, line_num, "Premature end of file")
+
+    return zone_data
+
+
+# Long command names used by the YAML converter.
+COMMAND_NAMES = {
+    "M": "spawn_mob",
+    "O": "spawn_object",
+    "G": "give_object",
+    "E": "equip_mob",
+    "P": "put_object",
+    "D": "door_state",
+    "R": "remove_object",
+}
+COMMAND_LETTERS = {name: letter for letter, name in COMMAND_NAMES.items()}
+
+# Converter keys holding arg1, arg2 and arg3 for each command.
+COMMAND_ARG_KEYS = {
+    "M": ("mob", "max_existing", "room"),
+    "O": ("obj", "max_existing", "room"),
+    "G": ("obj", "max_existing", None),
+    "E": ("obj", "max_existing", "eq_pos"),
+    "P": ("obj", "max_existing", "container"),
+    "D": ("room", "exit", "state"),
+    "R": ("room", "obj", None),
+}
+
+
+def zone_from_dict(data, zonename):
+    """
+    Build a ZoneData from the dict written by the JSON5 or YAML converters.
+    Raises ZoneFormatError on bad input; line numbers are command indexes.
+    """
+    if not isinstance(data, dict):
+        raise ZoneFormatError(zonename, 0, "Zone file is empty or not a mapping")
+    zone_data = ZoneData()
+    try:
+        zone_data.number = int(data["number"])
+        zone_data.name = str(data["name"])
+        zone_data.bot = int(data["bot"])
+        zone_data.top = int(data["top"])
+        zone_data.lifespan = int(data["lifespan"])
+        zone_data.reset_mode = int(data["reset_mode"])
+        commands = data["cmd"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ZoneFormatError(zonename, 0, f"Bad zone header field {e}")
+
+    if zone_data.bot > zone_data.top:
+        raise ZoneFormatError(
+            zonename, 0,
+            f"Zone {zone_data.number} bottom ({zone_data.bot}) > top ({zone_data.top})")
+
+    if commands is None:
+        commands = ()
+    elif not isinstance(commands, list):
+        raise ZoneFormatError(zonename, 0, "Zone commands are not a list")
+
+    for index, entry in enumerate(commands, 1):
+        if not isinstance(entry, dict):
+            raise ZoneFormatError(zonename, index,
+                                  "Zone command is not a mapping")
+        try:
+            command = entry["command"]
+            letter = COMMAND_LETTERS.get(command, command)
+            if letter == "S":
+                break
+            keys = COMMAND_ARG_KEYS[letter]
+            zone_data.cmd.append(
+                letter, int(entry.get("if_flag", 0)), int(entry[keys[0]]),
+                int(entry[keys[1]]),
+                int(entry[keys[2]]) if keys[2] is not None else 0, index)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ZoneFormatError(zonename, index, f"Bad zone command {e}")
+        except OverflowError:
+            raise ZoneFormatError(zonename, index,
+                                  "Zone command argument out of range")
+
+    zone_data.cmd.append('S')
     return zone_data
 
 
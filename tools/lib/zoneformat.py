@@ -0,0 +1,211 @@
+"""
+Zone file formats behind one load_zone(path): the original .zon text and
+the JSON5 and YAML the converters write.
+
+Each format is registered with the extensions it owns and a test for
+recognising it from a file's first bytes, used when the name says
+nothing. The JSON5 and YAML readers decode with the fastest parser
+installed and hand the result to zone_from_dict(), so every format comes
+out as the same ZoneData the .zon parser builds. Writing uses one fixed
+layout per format, whatever is installed.
+"""
+import json
+import os
+import re
+
+from lib.zone import ZoneFormatError, load_zones, zone_from_dict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyjson5
+except ImportError:
+    pyjson5 = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# How much of a file sniffing looks at.
+SNIFF_BYTES = 512
+
+NO_YAML = "PyYAML is not installed"
+
+# JSON5 decoders installed, fastest first. orjson and json read only
+# plain JSON, which is all the converter writes; pyjson5 also reads
+# comments, trailing commas and the rest of hand-written JSON5.
+JSON5_DECODERS = {}
+if orjson is not None:
+    JSON5_DECODERS["orjson"] = orjson.loads
+if pyjson5 is not None:
+    JSON5_DECODERS["pyjson5"] = pyjson5.decode_buffer
+JSON5_DECODERS["json"] = json.loads
+
+# YAML loaders installed, fastest first: libyaml's, then pure Python.
+YAML_LOADERS = {}
+if yaml is not None:
+    if hasattr(yaml, "CSafeLoader"):
+        YAML_LOADERS["CSafeLoader"] = yaml.CSafeLoader
+    YAML_LOADERS["SafeLoader"] = yaml.SafeLoader
+
+_json5_backend = next(iter(JSON5_DECODERS))
+_json5_decode = JSON5_DECODERS[_json5_backend]
+_yaml_backend = next(iter(YAML_LOADERS), None)
+
+
+def decode_json5(data):
+    """
+    Decode JSON5 bytes with the fastest decoder installed, retrying with
+    pyjson5 (if there is one) what the plain JSON decoders refuse.
+    Raises ValueError.
+    """
+    try:
+        return _json5_decode(data)
+    except ValueError:
+        if pyjson5 is None or _json5_backend == "pyjson5":
+            raise
+    return pyjson5.decode_buffer(data)
+
+
+def encode_json5(data):
+    """
+    Always the json module's layout (four-space indent, as the shipped
+    files have), so the output does not depend on what is installed.
+    """
+    return json.dumps(data, indent=4)
+
+
+def decode_yaml(data):
+    """
+    Decode YAML bytes with the fastest loader installed. Raises
+    ValueError, also when PyYAML is missing.
+    """
+    if yaml is None:
+        raise ValueError(NO_YAML)
+    try:
+        return yaml.load(data, Loader=YAML_LOADERS[_yaml_backend])
+    except yaml.YAMLError as e:
+        raise ValueError(str(e)) from None
+
+
+def encode_yaml(data):
+    """
+    Encode with libyaml's dumper if there is one. Raises ValueError when
+    PyYAML is missing.
+    """
+    if yaml is None:
+        raise ValueError(NO_YAML)
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    return yaml.dump(data, Dumper=dumper, sort_keys=False)
+
+
+class ZoneFormat:
+    """
+    One on-disk zone format: its extensions, how to recognise it, and how
+    to read it into a ZoneData. Formats that are a serialised dict (JSON5,
+    YAML) also have decode and encode, which the converters use. backend
+    is None when no parser is installed; missing then says why.
+    """
+    __slots__ = ('name', 'extensions', 'backend', 'sniff', 'read', 'decode',
+                 'encode', 'missing')
+
+    def __init__(self, name, extensions, backend, sniff, read=None,
+                 decode=None, encode=None, missing=None):
+        self.name = name
+        self.extensions = extensions
+        self.backend = backend
+        self.sniff = sniff
+        self.read = read or self._read_dict
+        self.decode = decode
+        self.encode = encode
+        self.missing = missing or f"No {name} parser is installed"
+
+    def __repr__(self):
+        return f"<ZoneFormat {self.name} ({self.backend})>"
+
+    def _read_dict(self, f, path, header_only=False):
+        if self.backend is None:
+            raise ZoneFormatError(path, 0, self.missing)
+        try:
+            data = self.decode(f.read())
+        except ValueError as e:
+            raise ZoneFormatError(path, 0, f"Bad {self.name.upper()}: {e}")
+        return zone_from_dict(data, path)
+
+
+ZONE_FORMATS = {}      # name -> ZoneFormat, in sniffing order
+ZONE_EXTENSIONS = {}   # ".ext" -> ZoneFormat
+
+
+def register_format(fmt):
+    """
+    Add a format, taking over any extension another format had.
+    """
+    ZONE_FORMATS[fmt.name] = fmt
+    for extension in fmt.extensions:
+        ZONE_EXTENSIONS[extension] = fmt
+    return fmt
+
+
+def sniff_format(head):
+    """
+    The format whose sniff test the first bytes of a file pass, or None.
+    """
+    for fmt in ZONE_FORMATS.values():
+        if fmt.sniff(head):
+            return fmt
+    return None
+
+
+def format_for(path, head=None):
+    """
+    The format of the file at path: by extension, else by sniffing head
+    (the file's first bytes). Returns None if neither tells.
+    """
+    fmt = ZONE_EXTENSIONS.get(os.path.splitext(path)[1])
+    if fmt is None and head is not None:
+        fmt = sniff_format(head)
+    return fmt
+
+
+def load_zone(path, header_only=False):
+    """
+    Read the zone file at path in whatever format it is. Raises
+    ZoneFormatError (or OSError). With header_only, formats that can stop
+    after the header (.zon) leave cmd as None; the others read the whole
+    file anyway.
+    """
+    with open(path, 'rb') as f:
+        fmt = format_for(path, f.peek(SNIFF_BYTES)[:SNIFF_BYTES])
+        if fmt is None:
+            raise ZoneFormatError(path, 0, "Unknown zone file format")
+        return fmt.read(f, path, header_only)
+
+
+_ZON_HEAD = re.compile(rb"\s*#\d")
+_JSON_HEAD = re.compile(rb"\s*(\{|//|/\*)")
+
+
+def _read_zon(f, path, header_only=False):
+    return load_zones(f, path, header_only)
+
+
+register_format(ZoneFormat(
+    "zon", (".zon",), "load_zones",
+    lambda head: _ZON_HEAD.match(head) is not None,
+    read=_read_zon))
+
+register_format(ZoneFormat(
+    "json5", (".json5",), _json5_backend,
+    lambda head: _JSON_HEAD.match(head) is not None,
+    decode=decode_json5, encode=encode_json5))
+
+# Last, since it takes any mapping that reached it.
+register_format(ZoneFormat(
+    "yaml", (".yaml", ".yml"), _yaml_backend,
+    lambda head: b":" in head,
+    decode=decode_yaml, encode=encode_yaml, missing=NO_YAML))
@@ -0,0 +1,99 @@
+"""
+Vnum lookups for the whole world (CircleMUD's real_zone()/real_room()
+family), answered from one index built at boot.
+
+Zone ranges are kept sorted by bottom vnum, so vnum -> zone is a binary
+search. Rooms and prototypes are looked up by vnum in World's own dicts.
+"""
+from bisect import bisect_right
+
+
+class ZoneOverlapError(ValueError):
+    """
+    Raised when a zone's vnum range overlaps a zone already in the index.
+    """
+    def __init__(self, zone, other):
+        self.zone = zone
+        self.other = other
+        super().__init__(
+            f"Zone {zone.number} ({zone.bot}-{zone.top}) overlaps "
+            f"zone {other.number} ({other.bot}-{other.top})")
+
+
+class VnumIndex:
+    def __init__(self):
+        self.bots = []        # bottom vnum of each zone, ascending
+        self.zones = []       # the zones, in the same order
+        self.by_number = {}   # zone number -> zone
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _overlap(self, zone, ignore=None):
+        """
+        The zone in the index whose range overlaps zone's, if any.
+        """
+        i = bisect_right(self.bots, zone.top)
+        # Only the nearest zones starting at or below zone.top can overlap.
+        while i > 0:
+            i -= 1
+            other = self.zones[i]
+            if other is ignore:
+                continue
+            if other.top >= zone.bot:
+                return other
+            break
+        return None
+
+    def add_zone(self, zone):
+        """
+        Add a zone, refusing (ZoneOverlapError) one whose range overlaps a
+        zone already present or whose number is already taken.
+        """
+        if zone.number in self.by_number:
+            raise ZoneOverlapError(zone, self.by_number[zone.number])
+        other = self._overlap(zone)
+        if other is not None:
+            raise ZoneOverlapError(zone, other)
+        i = bisect_right(self.bots, zone.bot)
+        self.bots.insert(i, zone.bot)
+        self.zones.insert(i, zone)
+        self.by_number[zone.number] = zone
+
+    def remove_zone(self, number):
+        zone = self.by_number.pop(number, None)
+        if zone is None:
+            return None
+        i = self.zones.index(zone)
+        del self.bots[i]
+        del self.zones[i]
+        return zone
+
+    def replace_zone(self, zone):
+        """
+        Swap in a reloaded zone with the same number. The new range is
+        checked against every other zone first, so on ZoneOverlapError the
+        index still holds the old zone. Returns the zone that was replaced.
+        """
+        old = self.by_number.get(zone.number)
+        other = self._overlap(zone, ignore=old)
+        if other is not None:
+            raise ZoneOverlapError(zone, other)
+        if old is not None:
+            self.remove_zone(zone.number)
+        self.add_zone(zone)
+        return old
+
+    def zone_for(self, vnum):
+        """
+        The zone whose range holds vnum, or None.
+        """
+        i = bisect_right(self.bots, vnum) - 1
+        if i >= 0:
+            zone = self.zones[i]
+            if vnum <= zone.top:
+                return zone
+        return None
+
+    def real_zone(self, number):
+        return self.by_number.get(number)
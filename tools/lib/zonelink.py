@@ -0,0 +1,214 @@
+"""
+Zone linker: the checks CircleMUD's reset_zone() only makes (or never
+makes) while a zone resets, done once when it is loaded.
+
+load_zones() checks syntax and the vnum range. link_zone() then checks
+each reset command against the rest of the world:
+
+  * mob and object vnums name a prototype (with no prototype files yet,
+    a vnum some zone's range holds), rooms lie in a zone, preferably this
+    one
+  * G and E follow an M, and P's container is loaded somewhere
+  * if_flag chains start after a command that can succeed
+  * wear positions, directions and door states are in range
+
+Every problem is collected, not just the first. Errors disable the
+command, and the if_flag commands that depend on it, as CircleMUD does
+with ZCMD.command = '*'. Warnings are only reported.
+
+What survives is a list of (command, arg1, arg2, arg3, on_fail) steps,
+with vnums resolved to handles by resolvers[kind](vnum) and on_fail
+the position of the step to continue from when this one fails: the next
+step that does not depend on it. A reset then never looks a vnum up or
+checks an if_flag.
+"""
+from collections import namedtuple
+
+ERROR = "error"
+WARNING = "warning"
+
+# From src/world.py; the server checks these again on its side.
+NUM_WEARS = 18
+NUM_OF_DIRS = 6
+NUM_DOOR_STATES = 3   # open, closed, locked
+
+# The kind of each of arg1, arg2 and arg3 that names a room or prototype.
+# R's object is matched against the room's contents by vnum, so stays one.
+ARG_KINDS = {
+    'M': ('mob', None, 'room'),
+    'O': ('obj', None, 'room'),
+    'G': ('obj', None, None),
+    'E': ('obj', None, None),
+    'P': ('obj', None, 'obj'),
+    'D': ('room', None, None),
+    'R': ('room', None, None),
+}
+
+# Commands that load an object, and so can supply a P's container.
+OBJ_LOADERS = frozenset("OGEP")
+
+
+class LinkProblem(namedtuple("LinkProblem", "zone line severity message")):
+    """
+    One thing wrong with a zone's reset commands. line is the source line
+    (or command index for JSON5/YAML zones).
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"zone {self.zone}, line {self.line}: {self.severity}: {self.message}"
+
+
+def loaded_objects(zones):
+    """
+    Every object vnum some O, G, E or P command in zones loads: the
+    containers a P command may find in play.
+    """
+    loaded = set()
+    for zone in zones:
+        table = zone.cmd
+        # Only two columns: cheaper than a five-field row per command.
+        for command, arg1 in zip(str(table.command, 'latin-1'), table.arg1):
+            if command in OBJ_LOADERS:
+                loaded.add(arg1)
+    return loaded
+
+
+def prototype_checks(index):
+    """
+    kind -> exists(vnum) for mobs and objects. With no prototype files
+    yet, any vnum inside a zone exists.
+    """
+    def in_a_zone(vnum):
+        return index.zone_for(vnum) is not None
+
+    return {'mob': in_a_zone, 'obj': in_a_zone}
+
+
+def link_zone(zone, index, resolvers=None, loaded=None, checks=None):
+    """
+    Check zone's commands against the VnumIndex of the world. Returns
+    (steps, problems). loaded is loaded_objects() of the whole world;
+    without it, a P whose container no earlier command of this zone loads
+    is only warned about. checks is prototype_checks(index), if at hand.
+    """
+    if checks is None:
+        checks = prototype_checks(index)
+    problems = []
+    kept = []           # [command, arg1, arg2, arg3, on_fail]
+    flags = []          # if_flag of each kept command
+    last_ok = False     # can the previous command succeed?
+    have_mob = False
+    zone_objs = set()
+    bot = zone.bot
+    top = zone.top
+
+    def problem(severity, line, message):
+        problems.append(LinkProblem(zone.number, line, severity, message))
+
+    lines = zone.cmd.line
+    for i, (command, if_flag, arg1, arg2, arg3) in enumerate(zone.cmd.rows()):
+        if command == 'S':
+            break
+        errors = []
+        kinds = ARG_KINDS.get(command)
+        if kinds is None:
+            errors.append(f"unknown command '{command}'")
+            kinds = (None, None, None)
+
+        if if_flag:
+            if if_flag != 1:
+                problem(WARNING, lines[i], f"if_flag {if_flag} is not 0 or 1; "
+                                           f"taken as 1")
+            if i == 0:
+                errors.append("if_flag set on the first command; it never runs")
+            elif not last_ok:
+                errors.append("depends on a disabled command; it never runs")
+
+        kind = kinds[0]
+        if kind == 'room':
+            if not bot <= arg1 <= top:
+                _check_room(zone, index, arg1, lines[i], errors, problem)
+        elif kind is not None and not checks[kind](arg1):
+            errors.append(f"{kind} {arg1} does not exist")
+        kind = kinds[2]
+        if kind == 'room':
+            if not bot <= arg3 <= top:
+                _check_room(zone, index, arg3, lines[i], errors, problem)
+        elif kind is not None and not checks[kind](arg3):
+            errors.append(f"{kind} {arg3} does not exist")
+
+        if command in "MOGEP":
+            if arg2 <= 0:
+                problem(WARNING, lines[i], f"max_existing is {arg2}; the "
+                                           f"command never loads anything")
+            if command == 'P':
+                if arg3 not in zone_objs:
+                    if loaded is None:
+                        problem(WARNING, lines[i], f"container obj {arg3} is "
+                                f"not loaded earlier in this zone")
+                    elif arg3 not in loaded:
+                        errors.append(f"container obj {arg3} is never loaded")
+            elif command in "GE":
+                if not have_mob:
+                    errors.append("no M command before it to give the object to")
+                elif not if_flag:
+                    problem(WARNING, lines[i], "if_flag is 0: runs even when "
+                                               "the mob before it was not loaded")
+                if command == 'E' and not 0 <= arg3 < NUM_WEARS:
+                    errors.append(f"invalid equipment pos number {arg3}")
+        elif command == 'D':
+            if not 0 <= arg2 < NUM_OF_DIRS:
+                errors.append(f"door does not exist in room {arg1} (direction {arg2})")
+            if not 0 <= arg3 < NUM_DOOR_STATES:
+                errors.append(f"invalid door state {arg3}")
+
+        if errors:
+            for message in errors:
+                problem(ERROR, lines[i], f"{message}; cmd disabled")
+            last_ok = False
+            continue
+        if command == 'M':
+            have_mob = True
+        elif command in OBJ_LOADERS:
+            zone_objs.add(arg1)
+        if resolvers is not None:
+            if kinds[0] is not None:
+                arg1 = resolvers[kinds[0]](arg1)
+            if kinds[2] is not None:
+                arg3 = resolvers[kinds[2]](arg3)
+        kept.append([command, arg1, arg2, arg3, 0])
+        flags.append(if_flag)
+        last_ok = True
+
+    # A failed step skips every if_flag step after it: on_fail is the
+    # first later step without one.
+    on_fail = len(kept)
+    for position in range(len(kept) - 1, -1, -1):
+        kept[position][4] = on_fail
+        if not flags[position]:
+            on_fail = position
+    return [tuple(step) for step in kept], problems
+
+
+def _check_room(zone, index, vnum, line, errors, problem):
+    if index.zone_for(vnum) is None:
+        errors.append(f"room {vnum} is in no zone")
+    else:
+        problem(WARNING, line, f"room {vnum} is outside the zone "
+                               f"({zone.bot}-{zone.top})")
+
+
+def link_world(zones, index, resolvers=None):
+    """
+    link_zone() for every zone. Returns ({zone number: steps}, problems).
+    """
+    loaded = loaded_objects(zones)
+    checks = prototype_checks(index)
+    programs = {}
+    problems = []
+    for zone in zones:
+        programs[zone.number], zone_problems = link_zone(zone, index, resolvers,
+                                                         loaded, checks)
+        problems.extend(zone_problems)
+    return programs, problems
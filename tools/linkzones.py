@@ -0,0 +1,40 @@
+import argparse
+import sys
+
+from lib.world import ZONE_DIR, boot_world
+from lib.zonelink import ERROR, link_world
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the reset commands of every zone under a directory "
+                    "against the rest of the world, and list every problem.")
+    parser.add_argument("root", nargs="?", default=ZONE_DIR)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="parser processes (default: one per CPU)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="list errors only, not warnings")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit non-zero on warnings too")
+    args = parser.parse_args()
+
+    zone_table, report = boot_world(args.root, args.workers)
+    for path, message in report.errors:
+        print(f"SYSERR: {message}")
+    paths = {number: path for path, number, ncmds, seconds in report.zones}
+    programs, problems = link_world(zone_table, report.index)
+
+    errors = sum(problem.severity == ERROR for problem in problems)
+    for problem in problems:
+        if problem.severity == ERROR or not args.quiet:
+            print(f"{paths[problem.zone]}:{problem.line}: {problem.severity}: "
+                  f"{problem.message}")
+    commands = sum(len(zone.cmd) for zone in zone_table)
+    print(f"Linked {len(zone_table)} zones, {commands} commands: {errors} errors, "
+          f"{len(problems) - errors} warnings; {len(report.errors)} files skipped.")
+    if report.errors or errors or (args.strict and problems):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+
+from lib.loadtest import (HOST, MIXES, PORT, free_port, parse_mix,
+                          raise_file_limit, report, start_server, swarm)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test a server over the loopback: connect a swarm "
+                    "of simulated players, drive a command mix at a fixed "
+                    "rate, and write latency, throughput, connection and "
+                    "memory figures as JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("-p", "--port", type=int, default=None,
+                        help=f"server port (default: {PORT}, or a free one "
+                             f"with --spawn)")
+    parser.add_argument("-c", "--clients", type=int, default=200)
+    parser.add_argument("-t", "--seconds", type=float, default=30.0,
+                        help="how long to send once every client is in")
+    parser.add_argument("--ramp", type=float, default=5.0,
+                        help="seconds over which the clients connect")
+    parser.add_argument("-r", "--rate", type=float, default=1.0,
+                        help="commands per second per client (the server "
+                             "throttles a client past 5)")
+    parser.add_argument("-m", "--mix", default="social",
+                        help=f"{', '.join(MIXES)}, or command=weight,... "
+                             f"(default: social)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--spawn", action="store_true",
+                        help="start src/circlemud.py for the run and stop "
+                             "it afterwards")
+    parser.add_argument("--server-args", default="",
+                        help="extra arguments for the spawned server, e.g. "
+                             "\"--shards 2\"")
+    parser.add_argument("--pid", type=int, default=None,
+                        help="server process to sample RSS from (implied "
+                             "by --spawn)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the JSON here instead of stdout")
+    parser.add_argument("--p99-budget-ms", type=float, default=None,
+                        help="exit 1 if p99 latency is over this")
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.clients < 1 or args.rate <= 0:
+        parser.error("--clients and --rate must be positive")
+    if args.server_args and not args.spawn:
+        parser.error("--server-args needs --spawn")
+
+    limit = raise_file_limit(args.clients + 64)
+    if limit < args.clients + 64:
+        print(f"WARNING: open file limit {limit} is below what "
+              f"{args.clients} clients need", file=sys.stderr)
+
+    port = args.port or (free_port() if args.spawn else PORT)
+    server = None
+    pid = args.pid
+    if args.spawn:
+        try:
+            server = start_server(port, args.server_args.split())
+        except RuntimeError as e:
+            print(f"SYSERR: {e}", file=sys.stderr)
+            sys.exit(1)
+        pid = server.pid
+    config = {
+        "host": args.host, "port": port, "clients": args.clients,
+        "seconds": args.seconds, "ramp": args.ramp, "rate": args.rate,
+        "mix": mix, "seed": args.seed, "spawned": args.spawn,
+        "server_args": args.server_args, "python": platform.python_version(),
+    }
+    try:
+        stats, wall = asyncio.run(swarm(args.host, port, args.clients,
+                                        args.seconds, args.rate, mix,
+                                        args.ramp, args.seed, pid))
+    except KeyboardInterrupt:
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    results = report(stats, wall, usage.ru_utime + usage.ru_stime, pid, config)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    latency = results["latency_ms"]["all"]
+    print(f"{results['connect']['connected']}/{args.clients} connected, "
+          f"{results['commands']['answered']} answered "
+          f"({results['commands']['per_second']}/s), "
+          f"p50 {latency.get('p50')} ms, p99 {latency.get('p99')} ms, "
+          f"p999 {latency.get('p999')} ms", file=sys.stderr)
+    failed = False
+    if results["connect"]["failed"]:
+        print(f"FAIL: {results['connect']['failed']} clients could not connect",
+              file=sys.stderr)
+        failed = True
+    if (args.p99_budget_ms is not None
+            and (latency.get("p99") is None or latency["p99"] > args.p99_budget_ms)):
+        print(f"FAIL: p99 over the {args.p99_budget_ms:.0f} ms budget",
+              file=sys.stderr)
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()